@@ -0,0 +1,93 @@
+import math
+import logging
+import statistics
+
+from dataclasses import dataclass
+from typing import Iterable, Sequence
+
+
+# Two-sided 95% quantiles of Student's t-distribution for 1 to 30 degrees of freedom
+T_QUANTILES_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+Z_QUANTILE_95 = 1.960
+
+
+@dataclass
+class ConvergenceCriteria:
+    # Stop once the 95% confidence interval half-width is below this fraction of the mean
+    target_relative_error: float = 0.02
+    min_time: float = 5
+    max_time: float = 60
+
+
+@dataclass
+class AdaptiveResult:
+    samples: list[Sequence[float]]
+    # Seconds actually spent measuring
+    duration: float
+    means: list[float]
+    # Half-widths of the 95% confidence intervals of the means
+    half_widths: list[float]
+    converged: bool
+
+    @property
+    def relative_errors(self) -> list[float]:
+        return [relative_error(mean, half_width) for mean, half_width in zip(self.means, self.half_widths)]
+
+
+def relative_error(mean: float, half_width: float) -> float:
+    return half_width / abs(mean) if mean else math.inf
+
+
+def confidence_interval(values: Sequence[float]) -> tuple[float, float]:
+    """Return (mean, half-width of the 95% confidence interval of the mean)."""
+    mean = statistics.fmean(values)
+    if len(values) < 2:
+        return mean, math.inf
+
+    degrees_of_freedom = len(values) - 1
+    quantile = T_QUANTILES_95[degrees_of_freedom - 1] if degrees_of_freedom <= len(T_QUANTILES_95) else Z_QUANTILE_95
+    return mean, quantile * statistics.stdev(values) / math.sqrt(len(values))
+
+
+def summarize(samples: list[Sequence[float]]) -> tuple[list[float], list[float]]:
+    intervals = [confidence_interval(metric) for metric in zip(*samples)]
+    return [mean for mean, _ in intervals], [half_width for _, half_width in intervals]
+
+
+def collect_until_converged(samples: Iterable[tuple[float, Sequence[float]]], criteria: ConvergenceCriteria) -> AdaptiveResult:
+    """Consume (window duration, metric values) samples until every metric's mean has converged.
+
+    Consumption stops early once `min_time` has passed and the relative error of every metric is
+    below the target, or unconditionally once `max_time` is reached. As the samples are pulled
+    lazily, a generator that starts a measurement per window is never asked for more windows
+    than needed.
+    """
+    collected: list[Sequence[float]] = []
+    duration = 0.0
+    converged = False
+
+    for window_duration, values in samples:
+        collected.append(values)
+        duration += window_duration
+
+        means, half_widths = summarize(collected)
+        errors = [relative_error(mean, half_width) for mean, half_width in zip(means, half_widths)]
+        logging.debug(f"  Adaptive window {len(collected)} after {duration:.1f}s: relative errors {errors}")
+
+        if duration >= criteria.min_time and all(error <= criteria.target_relative_error for error in errors):
+            converged = True
+            break
+        if duration >= criteria.max_time:
+            break
+
+    if not collected:
+        raise ValueError("No samples were measured")
+
+    means, half_widths = summarize(collected)
+    if not converged:
+        logging.warning(f"Measurement did not converge to {criteria.target_relative_error:.1%} within {criteria.max_time}s")
+    return AdaptiveResult(collected, duration, means, half_widths, converged)
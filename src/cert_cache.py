@@ -0,0 +1,121 @@
+import re
+import json
+import base64
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+
+from pathlib import Path
+from typing import Callable, Tuple
+
+
+CACHE_ENTRY_FILES = ["ca.key", "ca.crt", "server.key", "server.crt"]
+# Intermediate certificates sent along with the server certificate, only chains deeper than two have it
+CACHE_CHAIN_FILE = "chain.crt"
+PEM_CERTIFICATE_REGEX = r"-----BEGIN CERTIFICATE-----(.*?)-----END CERTIFICATE-----"
+# Client certificate for mutual TLS and the CA certificates the server verifies it with, only in client auth entries
+CACHE_CLIENT_KEY_FILE = "client.key"
+CACHE_CLIENT_CERT_FILE = "client.crt"
+CACHE_CLIENT_CA_FILE = "client_ca.crt"
+CACHE_CLIENT_FILES = [CACHE_CLIENT_KEY_FILE, CACHE_CLIENT_CERT_FILE, CACHE_CLIENT_CA_FILE]
+CACHE_META_FILE = "meta.json"
+
+
+def der_certificate_sizes(path: Path) -> list[int]:
+    """DER sizes of the certificates in a PEM file, i.e. their size in the TLS Certificate message."""
+    if not path.is_file():
+        return []
+    return [len(base64.b64decode(body)) for body in re.findall(PEM_CERTIFICATE_REGEX, path.read_text(), re.DOTALL)]
+
+
+class CertificateCache:
+    """On-disk cache for certificate chains, keyed by everything that influences the generated chain.
+
+    An entry is identified by the sha256 of the signature algorithm (or chain), a fingerprint of the OpenSSL
+    build/provider setup and the contents of the files used during generation (e.g. `cert.cnf`).
+    Entries are generated into a temporary directory and renamed into place, so an interrupted
+    generation never leaves a half written entry behind.
+    """
+
+    def __init__(self, cache_dir: Path, build_fingerprint: str, key_files: list[Path], regenerate: bool = False):
+        self.cache_dir = cache_dir
+        self.build_fingerprint = build_fingerprint
+        self.key_files = key_files
+        self.regenerate = regenerate
+
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        # Keys that have been (re)generated during this run, so --regen-certs only regenerates once
+        self._fresh_keys: set[str] = set()
+
+    def cache_key(self, sig_alg: str, client_auth: bool = False) -> str:
+        key_material = {
+            "sig_alg": sig_alg,
+            "build": self.build_fingerprint,
+            "files": {str(path): path.read_text() for path in self.key_files},
+        }
+        # Only added when set, so the keys of the server auth only entries stay the same
+        if client_auth:
+            key_material["client_auth"] = True
+        return hashlib.sha256(json.dumps(key_material, sort_keys=True).encode()).hexdigest()
+
+    def entry_path(self, sig_alg: str, client_auth: bool = False) -> Path:
+        return self.cache_dir / self.cache_key(sig_alg, client_auth)
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _is_complete(self, entry: Path, files: list[str]) -> bool:
+        return all((entry / name).is_file() and (entry / name).stat().st_size > 0 for name in files)
+
+    def get(self, sig_alg: str, generate: Callable[[Path], None], client_auth: bool = False) -> Tuple[Path, Path]:
+        """Return (server key, server certificate) for sig_alg, calling generate(directory) on a cache miss.
+
+        With client_auth the entry also holds a client certificate (CACHE_CLIENT_FILES) next to the server certificate.
+        """
+        key = self.cache_key(sig_alg, client_auth)
+        entry = self.cache_dir / key
+        files = CACHE_ENTRY_FILES + CACHE_CLIENT_FILES if client_auth else CACHE_ENTRY_FILES
+
+        with self._lock_for(key):
+            stale = self.regenerate and key not in self._fresh_keys
+            if stale or not self._is_complete(entry, files):
+                logging.info(f"Certificate cache miss for {sig_alg} ({key[:12]}), generating certificates")
+                self._generate(sig_alg, entry, generate, files)
+                self._fresh_keys.add(key)
+            else:
+                logging.debug(f"Certificate cache hit for {sig_alg} ({key[:12]})")
+
+        return entry / "server.key", entry / "server.crt"
+
+    def _generate(self, sig_alg: str, entry: Path, generate: Callable[[Path], None], files: list[str]):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=".staging-", dir=self.cache_dir))
+        try:
+            generate(staging)
+            if not self._is_complete(staging, files):
+                raise RuntimeError(f"Certificate generation for {sig_alg} did not produce {files}")
+
+            (staging / CACHE_META_FILE).write_text(json.dumps({
+                "sig_alg": sig_alg,
+                "build": self.build_fingerprint,
+            }, indent=2))
+
+            if entry.exists():
+                shutil.rmtree(entry)
+            staging.rename(entry)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def invalidate(self, sig_alg: str | None = None):
+        """Remove the entry for sig_alg, or the whole cache if no algorithm is given."""
+        if sig_alg is None:
+            logging.info(f"Clearing certificate cache {self.cache_dir}")
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            return
+
+        for client_auth in (False, True):
+            shutil.rmtree(self.entry_path(sig_alg, client_auth), ignore_errors=True)
@@ -1,36 +1,79 @@
 #!/bin/bash
 set -e
 
-# export CA_KEY_PATH=./tmp/ca.key
-# export CA_CERT_PATH=./tmp/ca.crt
-# export CERT_PRIV_KEY_PATH=./tmp/server.key
-# export CERT_REQUEST_PATH=./tmp/server.csr
-# export CERT_PATH=./tmp/server.crt
-# export SIG_ALG=rsa:15360
-# export USE_OSSL35=1
-
-if [ "${USE_OSSL35:-0}" = "1" ]; then
-    : "Using OpenSSL 3.5 from $HOME/openssl-3.5"
-    export PATH="$HOME/openssl-3.5/bin:$PATH"
-    export LD_LIBRARY_PATH="$HOME/openssl-3.5/lib:$LD_LIBRARY_PATH"
-    >&2 echo "USE_OSSL35 set: prepended $HOME/openssl-3.5 to PATH and LD_LIBRARY_PATH"
-fi
+# export CERT_DIR=./tmp
+# export CHAIN_ALGS="rsa:3072 mldsa44 mldsa44"
+# export CLIENT_CERT=1
+
+# CHAIN_ALGS are the key algorithms from the root CA down to the server certificate, at least two.
+# Every level uses the -newkey syntax (e.g. rsa:3072, mldsa44), ECDSA keys are given as ecdsa:<curve>.
+read -r -a ALGS <<< "$CHAIN_ALGS"
+DEPTH=${#ALGS[@]}
+
+newkey_args() {
+    case "$1" in
+        ecdsa:*) echo "-newkey ec -pkeyopt ec_paramgen_curve:${1#ecdsa:}" ;;
+        *) echo "-newkey $1" ;;
+    esac
+}
 
 # Create CA
-openssl req -x509 -new -newkey $SIG_ALG \
-    -keyout $CA_KEY_PATH \
-    -out $CA_CERT_PATH -noenc \
+openssl req -x509 -new $(newkey_args "${ALGS[0]}") \
+    -keyout "$CERT_DIR/ca.key" \
+    -out "$CERT_DIR/ca.crt" -noenc \
     -subj "/CN=pqc-tls-performance-CA" -days 365
 
+ISSUER_KEY="$CERT_DIR/ca.key"
+ISSUER_CERT="$CERT_DIR/ca.crt"
+INTERMEDIATES=()
+
+# Create the intermediate CAs, the chain file lists them from the server certificate's issuer upwards
+for ((i = 1; i < DEPTH - 1; i++)); do
+    openssl req -new $(newkey_args "${ALGS[$i]}") \
+        -keyout "$CERT_DIR/intermediate_$i.key" \
+        -out "$CERT_DIR/intermediate_$i.csr" -noenc \
+        -subj "/CN=pqc-tls-performance-intermediate-$i"
+
+    openssl x509 -req -in "$CERT_DIR/intermediate_$i.csr" \
+        -out "$CERT_DIR/intermediate_$i.crt" -CA "$ISSUER_CERT" \
+        -CAkey "$ISSUER_KEY" -CAcreateserial \
+        -days 365 -extfile cert.cnf \
+        -extensions v3_intermediate_ca
+
+    INTERMEDIATES=("$CERT_DIR/intermediate_$i.crt" "${INTERMEDIATES[@]}")
+    ISSUER_KEY="$CERT_DIR/intermediate_$i.key"
+    ISSUER_CERT="$CERT_DIR/intermediate_$i.crt"
+done
+if [ ${#INTERMEDIATES[@]} -gt 0 ]; then
+    cat "${INTERMEDIATES[@]}" > "$CERT_DIR/chain.crt"
+fi
+
 # Create certificate request
-openssl req -new -newkey $SIG_ALG \
-    -keyout $CERT_PRIV_KEY_PATH \
-    -out $CERT_REQUEST_PATH -noenc \
+openssl req -new $(newkey_args "${ALGS[$((DEPTH - 1))]}") \
+    -keyout "$CERT_DIR/server.key" \
+    -out "$CERT_DIR/server.csr" -noenc \
     -subj "/CN=localhost"
 
-# Sign certificate request with CA
-openssl x509 -req -in $CERT_REQUEST_PATH \
-    -out $CERT_PATH -CA $CA_CERT_PATH \
-    -CAkey $CA_KEY_PATH -CAcreateserial \
+# Sign certificate request with the last CA
+openssl x509 -req -in "$CERT_DIR/server.csr" \
+    -out "$CERT_DIR/server.crt" -CA "$ISSUER_CERT" \
+    -CAkey "$ISSUER_KEY" -CAcreateserial \
     -days 365 -extfile cert.cnf \
     -extensions v3_req
+
+if [ "${CLIENT_CERT:-0}" = "1" ]; then
+    # Client certificate for mutual TLS, same algorithm and issuer as the server certificate
+    openssl req -new $(newkey_args "${ALGS[$((DEPTH - 1))]}") \
+        -keyout "$CERT_DIR/client.key" \
+        -out "$CERT_DIR/client.csr" -noenc \
+        -subj "/CN=pqc-tls-performance-client"
+
+    openssl x509 -req -in "$CERT_DIR/client.csr" \
+        -out "$CERT_DIR/client.crt" -CA "$ISSUER_CERT" \
+        -CAkey "$ISSUER_KEY" -CAcreateserial \
+        -days 365 -extfile cert.cnf \
+        -extensions v3_client
+
+    # s_time can't send intermediates, so the server trusts the whole chain
+    cat "${INTERMEDIATES[@]}" "$CERT_DIR/ca.crt" > "$CERT_DIR/client_ca.crt"
+fi
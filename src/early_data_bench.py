@@ -0,0 +1,177 @@
+"""Resumed TLS 1.3 handshakes sending their request as 0-RTT data, all from a single process.
+
+Started through OpenSslRunner like the openssl processes of the measurement, so libssl.so.3 and the providers are
+loaded from the same OpenSSL installation and config. One full handshake gets a session ticket, every following
+connection resumes it and sends the request as early data. Prints the connections, how many of them had their early
+data accepted, and the wall clock and user CPU time they took as JSON.
+"""
+import sys
+import json
+import os
+import ctypes
+import socket
+import select
+import argparse
+
+from time import perf_counter
+
+from evp_bench import EvpError, LibCrypto
+
+
+LIBSSL = "libssl.so.3"
+# Macros of ssl.h that are SSL_CTX_ctrl calls
+SSL_CTRL_SET_GROUPS_LIST = 92
+SSL_CTRL_SET_MIN_PROTO_VERSION = 123
+SSL_CTRL_SET_MAX_PROTO_VERSION = 124
+TLS1_3_VERSION = 0x0304
+SSL_EARLY_DATA_ACCEPTED = 2
+SSL_ERROR_WANT_READ = 2
+REQUEST = b"GET / HTTP/1.0\r\n\r\n"
+TICKET_TIMEOUT = 5
+
+
+class LibSsl:
+    """The few libssl functions the client needs, declared for ctypes."""
+
+    def __init__(self, path: str = LIBSSL):
+        self.lib = ctypes.CDLL(path)
+        p, i, s = ctypes.c_void_p, ctypes.c_int, ctypes.c_size_t
+        self._declare("TLS_client_method", [], p)
+        self._declare("SSL_CTX_new", [p], p)
+        self._declare("SSL_CTX_free", [p], None)
+        self._declare("SSL_CTX_ctrl", [p, i, ctypes.c_long, p], ctypes.c_long)
+        self._declare("SSL_new", [p], p)
+        self._declare("SSL_free", [p], None)
+        self._declare("SSL_set_fd", [p, i], i)
+        self._declare("SSL_set_session", [p, p], i)
+        self._declare("SSL_get1_session", [p], p)
+        self._declare("SSL_SESSION_free", [p], None)
+        self._declare("SSL_SESSION_is_resumable", [p], i)
+        self._declare("SSL_SESSION_get_max_early_data", [p], ctypes.c_uint32)
+        self._declare("SSL_connect", [p], i)
+        self._declare("SSL_write_early_data", [p, ctypes.c_char_p, s, ctypes.POINTER(s)], i)
+        self._declare("SSL_get_early_data_status", [p], i)
+        self._declare("SSL_read", [p, ctypes.c_char_p, i], i)
+        self._declare("SSL_get_error", [p, i], i)
+        self._declare("SSL_shutdown", [p], i)
+
+    def _declare(self, name: str, argtypes: list, restype):
+        function = getattr(self.lib, name)
+        function.argtypes = argtypes
+        function.restype = restype
+        setattr(self, name, function)
+
+
+class EarlyDataClient:
+    def __init__(self, ssl: LibSsl, crypto: LibCrypto, host: str, port: int, groups: str):
+        self.ssl = ssl
+        self.crypto = crypto
+        self.address = (host, port)
+        self.ctx = crypto.check(ssl.SSL_CTX_new(ssl.TLS_client_method()), "SSL_CTX_new")
+        self.session = None
+        try:
+            crypto.check(ssl.SSL_CTX_ctrl(self.ctx, SSL_CTRL_SET_MIN_PROTO_VERSION, TLS1_3_VERSION, None), "Setting TLS 1.3")
+            crypto.check(ssl.SSL_CTX_ctrl(self.ctx, SSL_CTRL_SET_MAX_PROTO_VERSION, TLS1_3_VERSION, None), "Setting TLS 1.3")
+            # The key share has to be for the server's group right away, a HelloRetryRequest rejects the early data
+            crypto.check(ssl.SSL_CTX_ctrl(self.ctx, SSL_CTRL_SET_GROUPS_LIST, 0, ctypes.c_char_p(groups.encode())), f"Setting the groups {groups}")
+        except EvpError:
+            ssl.SSL_CTX_free(self.ctx)
+            raise
+
+    def close(self):
+        if self.session:
+            self.ssl.SSL_SESSION_free(self.session)
+        self.ssl.SSL_CTX_free(self.ctx)
+
+    def fetch_ticket(self):
+        """Full handshake, kept open until the server's session ticket arrived."""
+        ssl, crypto = self.ssl, self.crypto
+        with socket.create_connection(self.address) as sock:
+            connection = crypto.check(ssl.SSL_new(self.ctx), "SSL_new")
+            try:
+                crypto.check(ssl.SSL_set_fd(connection, sock.fileno()), "SSL_set_fd")
+                crypto.check(ssl.SSL_connect(connection), "Full handshake")
+                # TLS 1.3 tickets arrive after the handshake, SSL_read processes them while there is no data to read
+                sock.setblocking(False)
+                buffer = ctypes.create_string_buffer(4096)
+                deadline = perf_counter() + TICKET_TIMEOUT
+                while perf_counter() < deadline:
+                    result = ssl.SSL_read(connection, buffer, len(buffer))
+                    session = ssl.SSL_get1_session(connection)
+                    if session and ssl.SSL_SESSION_is_resumable(session):
+                        if not ssl.SSL_SESSION_get_max_early_data(session):
+                            ssl.SSL_SESSION_free(session)
+                            raise EvpError("The server doesn't accept early data with its tickets")
+                        self.session = session
+                        # Freed without a shutdown the connection counts as failed, which makes its session not resumable
+                        ssl.SSL_shutdown(connection)
+                        return
+                    if session:
+                        ssl.SSL_SESSION_free(session)
+                    if result <= 0 and ssl.SSL_get_error(connection, result) != SSL_ERROR_WANT_READ:
+                        crypto.check(result, "Waiting for a session ticket")
+                    select.select([sock], [], [], max(0, deadline - perf_counter()))
+                raise EvpError(f"No session ticket within {TICKET_TIMEOUT}s")
+            finally:
+                ssl.SSL_free(connection)
+
+    def connect_with_early_data(self) -> bool:
+        """Resume the session sending the request as 0-RTT data, returns whether the server accepted it."""
+        ssl, crypto = self.ssl, self.crypto
+        with socket.create_connection(self.address) as sock:
+            connection = crypto.check(ssl.SSL_new(self.ctx), "SSL_new")
+            try:
+                crypto.check(ssl.SSL_set_fd(connection, sock.fileno()), "SSL_set_fd")
+                crypto.check(ssl.SSL_set_session(connection, self.session), "SSL_set_session")
+                written = ctypes.c_size_t()
+                crypto.check(ssl.SSL_write_early_data(connection, REQUEST, len(REQUEST), ctypes.byref(written)), "SSL_write_early_data")
+                crypto.check(ssl.SSL_connect(connection), "Resumed handshake")
+                accepted = ssl.SSL_get_early_data_status(connection) == SSL_EARLY_DATA_ACCEPTED
+                ssl.SSL_shutdown(connection)
+                return accepted
+            finally:
+                ssl.SSL_free(connection)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure resumed TLS 1.3 handshakes with 0-RTT data from a single process.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=4433)
+    parser.add_argument("--groups", required=True, help="Groups offered by the client, the first one gets a key share")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--libssl", default=LIBSSL, help="libssl to load, found by the dynamic loader like the one of the openssl binary")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        ssl = LibSsl(args.libssl)
+        # libssl already loaded its libcrypto, this only declares the error functions
+        crypto = LibCrypto()
+    except OSError as e:
+        print(f"Could not load {args.libssl}: {e}", file=sys.stderr)
+        exit(1)
+
+    try:
+        client = EarlyDataClient(ssl, crypto, args.host, args.port, args.groups)
+        try:
+            client.fetch_ticket()
+            connections = accepted = 0
+            user_start, start = os.times().user, perf_counter()
+            while perf_counter() - start < args.seconds:
+                accepted += client.connect_with_early_data()
+                connections += 1
+            real_seconds, user_seconds = perf_counter() - start, os.times().user - user_start
+        finally:
+            client.close()
+    except (EvpError, OSError) as e:
+        print(f"Early data measurement failed: {e}", file=sys.stderr)
+        exit(1)
+
+    json.dump({
+        "connections": connections,
+        "accepted": accepted,
+        "real_seconds": real_seconds,
+        "user_seconds": user_seconds
+    }, sys.stdout)
@@ -0,0 +1,300 @@
+"""In-process microbenchmark of the KEM and signature operations of libcrypto through the EVP API.
+
+Run through src/evp_bench.sh, so libcrypto.so.3 and the providers are loaded from the same OpenSSL
+installation and config as the openssl processes of the measurement. Prints the results as JSON.
+"""
+import sys
+import json
+import math
+import ctypes
+import argparse
+
+from time import perf_counter_ns
+from dataclasses import dataclass, field, asdict
+from typing import Callable
+
+from load_generator import percentile
+
+
+LIBCRYPTO = "libcrypto.so.3"
+OPERATIONS = {
+    "kem": ["keygen", "encaps", "decaps"],
+    "sig": ["keygen", "sign", "verify"],
+}
+DEFAULT_BATCH_SIZE = 64
+# Histogram buckets grow by a factor of 2^(1/4), about 19% per bucket
+BUCKETS_PER_OCTAVE = 4
+PERCENTILES = [50, 90, 99, 99.9]
+# Like openssl speed, signatures are over a digest sized message
+MESSAGE = bytes(32)
+# Key types that only encapsulate with an explicit KEM operation, e.g. classical ECDH as DHKEM (RFC 9180)
+KEM_OPERATIONS = {"RSA": b"RSASVE", "EC": b"DHKEM", "X25519": b"DHKEM", "X448": b"DHKEM"}
+
+
+class EvpError(Exception):
+    pass
+
+
+class LibCrypto:
+    """The few EVP functions the benchmark needs, declared for ctypes."""
+
+    def __init__(self, path: str = LIBCRYPTO):
+        self.lib = ctypes.CDLL(path)
+        p, i, s = ctypes.c_void_p, ctypes.c_int, ctypes.c_size_t
+        size_p = ctypes.POINTER(s)
+        self._declare("OpenSSL_version", [i], ctypes.c_char_p)
+        self._declare("ERR_get_error", [], ctypes.c_ulong)
+        self._declare("ERR_error_string_n", [ctypes.c_ulong, ctypes.c_char_p, s], None)
+        self._declare("EVP_PKEY_CTX_new_from_name", [p, ctypes.c_char_p, ctypes.c_char_p], p)
+        self._declare("EVP_PKEY_CTX_new_from_pkey", [p, p, ctypes.c_char_p], p)
+        self._declare("EVP_PKEY_CTX_free", [p], None)
+        self._declare("EVP_PKEY_keygen_init", [p], i)
+        self._declare("EVP_PKEY_generate", [p, ctypes.POINTER(p)], i)
+        self._declare("EVP_PKEY_free", [p], None)
+        self._declare("EVP_PKEY_get0_type_name", [p], ctypes.c_char_p)
+        self._declare("EVP_PKEY_CTX_set_kem_op", [p, ctypes.c_char_p], i)
+        self._declare("EVP_PKEY_encapsulate_init", [p, p], i)
+        self._declare("EVP_PKEY_encapsulate", [p, ctypes.c_char_p, size_p, ctypes.c_char_p, size_p], i)
+        self._declare("EVP_PKEY_decapsulate_init", [p, p], i)
+        self._declare("EVP_PKEY_decapsulate", [p, ctypes.c_char_p, size_p, ctypes.c_char_p, s], i)
+        self._declare("EVP_MD_CTX_new", [], p)
+        self._declare("EVP_MD_CTX_free", [p], None)
+        self._declare("EVP_DigestSignInit_ex", [p, p, ctypes.c_char_p, p, ctypes.c_char_p, p, p], i)
+        self._declare("EVP_DigestSign", [p, ctypes.c_char_p, size_p, ctypes.c_char_p, s], i)
+        self._declare("EVP_DigestVerifyInit_ex", [p, p, ctypes.c_char_p, p, ctypes.c_char_p, p, p], i)
+        self._declare("EVP_DigestVerify", [p, ctypes.c_char_p, s, ctypes.c_char_p, s], i)
+
+    def _declare(self, name: str, argtypes: list, restype):
+        function = getattr(self.lib, name)
+        function.argtypes = argtypes
+        function.restype = restype
+        setattr(self, name, function)
+
+    def version(self) -> str:
+        return self.OpenSSL_version(0).decode()
+
+    def check(self, result, what: str):
+        """Raise with the OpenSSL error queue if a call returned 0/NULL (or a negative value)."""
+        if result is None or (isinstance(result, int) and result <= 0):
+            errors = []
+            while code := self.ERR_get_error():
+                buffer = ctypes.create_string_buffer(256)
+                self.ERR_error_string_n(code, buffer, len(buffer))
+                errors.append(buffer.value.decode())
+            raise EvpError(f"{what} failed" + (f": {'; '.join(errors)}" if errors else ""))
+        return result
+
+
+class Algorithm:
+    """The operations of one algorithm, every operation includes creating and freeing its contexts like a TLS stack does per handshake."""
+
+    def __init__(self, crypto: LibCrypto, name: str, kind: str):
+        self.crypto = crypto
+        self.name = name.encode()
+        self.kind = kind
+        # The key the encaps/decaps and sign/verify operations use
+        self.pkey = self._generate()
+        self.operations: dict[str, Callable[[], None]] = {"keygen": self.keygen}
+        try:
+            if kind == "kem":
+                self.kem_op = KEM_OPERATIONS.get(crypto.EVP_PKEY_get0_type_name(self.pkey).decode())
+                self._prepare_kem()
+                self.operations.update(encaps=self.encaps, decaps=self.decaps)
+            else:
+                self._prepare_sig()
+                self.operations.update(sign=self.sign, verify=self.verify)
+        except EvpError:
+            self.close()
+            raise
+
+    def close(self):
+        self.crypto.EVP_PKEY_free(self.pkey)
+
+    def _generate(self) -> ctypes.c_void_p:
+        crypto = self.crypto
+        ctx = crypto.check(crypto.EVP_PKEY_CTX_new_from_name(None, self.name, None), f"Creating a {self.name.decode()} context")
+        try:
+            crypto.check(crypto.EVP_PKEY_keygen_init(ctx), "EVP_PKEY_keygen_init")
+            pkey = ctypes.c_void_p()
+            crypto.check(crypto.EVP_PKEY_generate(ctx, ctypes.byref(pkey)), "EVP_PKEY_generate")
+            return pkey
+        finally:
+            crypto.EVP_PKEY_CTX_free(ctx)
+
+    def keygen(self):
+        self.crypto.EVP_PKEY_free(self._generate())
+
+    def _kem_context(self, init) -> ctypes.c_void_p:
+        crypto = self.crypto
+        ctx = crypto.check(crypto.EVP_PKEY_CTX_new_from_pkey(None, self.pkey, None), "EVP_PKEY_CTX_new_from_pkey")
+        try:
+            crypto.check(init(ctx, None), init.__name__)
+            if self.kem_op:
+                crypto.check(crypto.EVP_PKEY_CTX_set_kem_op(ctx, self.kem_op), "EVP_PKEY_CTX_set_kem_op")
+        except EvpError:
+            crypto.EVP_PKEY_CTX_free(ctx)
+            raise
+        return ctx
+
+    def _prepare_kem(self):
+        crypto = self.crypto
+        ctx = self._kem_context(crypto.EVP_PKEY_encapsulate_init)
+        try:
+            self.ciphertext_length, self.secret_length = ctypes.c_size_t(), ctypes.c_size_t()
+            crypto.check(crypto.EVP_PKEY_encapsulate(ctx, None, ctypes.byref(self.ciphertext_length), None, ctypes.byref(self.secret_length)), "EVP_PKEY_encapsulate")
+            self.ciphertext = ctypes.create_string_buffer(self.ciphertext_length.value)
+            self.secret = ctypes.create_string_buffer(self.secret_length.value)
+        finally:
+            crypto.EVP_PKEY_CTX_free(ctx)
+        # decaps needs a real ciphertext
+        self.encaps()
+
+    def encaps(self):
+        crypto = self.crypto
+        ctx = self._kem_context(crypto.EVP_PKEY_encapsulate_init)
+        try:
+            ciphertext_length, secret_length = ctypes.c_size_t(len(self.ciphertext)), ctypes.c_size_t(len(self.secret))
+            crypto.check(crypto.EVP_PKEY_encapsulate(ctx, self.ciphertext, ctypes.byref(ciphertext_length), self.secret, ctypes.byref(secret_length)), "EVP_PKEY_encapsulate")
+            self.ciphertext_length = ciphertext_length
+        finally:
+            crypto.EVP_PKEY_CTX_free(ctx)
+
+    def decaps(self):
+        crypto = self.crypto
+        ctx = self._kem_context(crypto.EVP_PKEY_decapsulate_init)
+        try:
+            secret_length = ctypes.c_size_t(len(self.secret))
+            crypto.check(crypto.EVP_PKEY_decapsulate(ctx, self.secret, ctypes.byref(secret_length), self.ciphertext, self.ciphertext_length.value), "EVP_PKEY_decapsulate")
+        finally:
+            crypto.EVP_PKEY_CTX_free(ctx)
+
+    def _prepare_sig(self):
+        crypto = self.crypto
+        ctx = crypto.check(crypto.EVP_MD_CTX_new(), "EVP_MD_CTX_new")
+        try:
+            crypto.check(crypto.EVP_DigestSignInit_ex(ctx, None, None, None, None, self.pkey, None), "EVP_DigestSignInit_ex")
+            signature_length = ctypes.c_size_t()
+            crypto.check(crypto.EVP_DigestSign(ctx, None, ctypes.byref(signature_length), MESSAGE, len(MESSAGE)), "EVP_DigestSign")
+            self.signature = ctypes.create_string_buffer(signature_length.value)
+        finally:
+            crypto.EVP_MD_CTX_free(ctx)
+        # verify needs a real signature
+        self.sign()
+
+    def sign(self):
+        crypto = self.crypto
+        ctx = crypto.check(crypto.EVP_MD_CTX_new(), "EVP_MD_CTX_new")
+        try:
+            # Without a digest name every signature algorithm uses its default, the pure ones none
+            crypto.check(crypto.EVP_DigestSignInit_ex(ctx, None, None, None, None, self.pkey, None), "EVP_DigestSignInit_ex")
+            signature_length = ctypes.c_size_t(len(self.signature))
+            crypto.check(crypto.EVP_DigestSign(ctx, self.signature, ctypes.byref(signature_length), MESSAGE, len(MESSAGE)), "EVP_DigestSign")
+            self.signature_length = signature_length.value
+        finally:
+            crypto.EVP_MD_CTX_free(ctx)
+
+    def verify(self):
+        crypto = self.crypto
+        ctx = crypto.check(crypto.EVP_MD_CTX_new(), "EVP_MD_CTX_new")
+        try:
+            crypto.check(crypto.EVP_DigestVerifyInit_ex(ctx, None, None, None, None, self.pkey, None), "EVP_DigestVerifyInit_ex")
+            crypto.check(crypto.EVP_DigestVerify(ctx, self.signature, self.signature_length, MESSAGE, len(MESSAGE)), "EVP_DigestVerify")
+        finally:
+            crypto.EVP_MD_CTX_free(ctx)
+
+
+@dataclass
+class OperationResult:
+    # Operations per second of the batches, the timer overhead is spread over a whole batch
+    operations_per_second: float
+    # Individually timed operations
+    operations: int
+    mean_us: float
+    max_us: float
+    percentiles_us: dict[str, float]
+    # (lower bound in µs, count) of the non-empty buckets
+    histogram: list[tuple[float, int]] = field(default_factory=list)
+
+
+def histogram(latencies_ns: list[int]) -> list[tuple[float, int]]:
+    counts: dict[int, int] = {}
+    for latency in latencies_ns:
+        bucket = math.floor(math.log2(max(latency, 1)) * BUCKETS_PER_OCTAVE)
+        counts[bucket] = counts.get(bucket, 0) + 1
+    return [(2 ** (bucket / BUCKETS_PER_OCTAVE) / 1000, count) for bucket, count in sorted(counts.items())]
+
+
+def benchmark_operation(operation: Callable[[], None], seconds: float, batch_size: int) -> OperationResult:
+    """Time single operations for the first half of `seconds` and batches of `batch_size` operations for the second half."""
+    latencies = []
+    deadline = perf_counter_ns() + int(seconds * 1e9 / 2)
+    while (start := perf_counter_ns()) < deadline:
+        operation()
+        latencies.append(perf_counter_ns() - start)
+
+    # Slow operations (e.g. RSA keygen) get smaller batches, so the deadline is checked often enough
+    mean_ns = sum(latencies) / len(latencies)
+    batch_size = max(1, min(batch_size, int(seconds * 1e9 / 2 / mean_ns / 10)))
+
+    batch_operations = 0
+    batch_start = perf_counter_ns()
+    deadline = batch_start + int(seconds * 1e9 / 2)
+    while perf_counter_ns() < deadline:
+        for _ in range(batch_size):
+            operation()
+        batch_operations += batch_size
+    batch_time = perf_counter_ns() - batch_start
+
+    ordered = sorted(latencies)
+    return OperationResult(
+        batch_operations / batch_time * 1e9,
+        len(ordered),
+        sum(ordered) / len(ordered) / 1000,
+        ordered[-1] / 1000,
+        {f"p{q:g}": percentile(ordered, q) / 1000 for q in PERCENTILES},
+        histogram(ordered)
+    )
+
+
+def benchmark_algorithm(crypto: LibCrypto, name: str, kind: str, seconds: float, batch_size: int) -> dict:
+    """Benchmark every operation of an algorithm for `seconds`, errors are reported instead of raised."""
+    try:
+        algorithm = Algorithm(crypto, name, kind)
+    except EvpError as e:
+        return {"error": str(e)}
+
+    try:
+        # Warm up the code paths and caches before timing
+        for operation in algorithm.operations.values():
+            operation()
+        return {
+            operation: asdict(benchmark_operation(algorithm.operations[operation], seconds, batch_size))
+            for operation in OPERATIONS[kind]
+        }
+    except EvpError as e:
+        return {"error": str(e)}
+    finally:
+        algorithm.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark KEM and signature operations through the EVP API of libcrypto.")
+    parser.add_argument("--kind", choices=list(OPERATIONS), required=True)
+    parser.add_argument("--seconds", type=float, default=10, help="Seconds per operation, half timed individually and half in batches")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--libcrypto", default=LIBCRYPTO, help="libcrypto to load, found by the dynamic loader like the one of the openssl binary")
+    parser.add_argument("algorithms", nargs="+")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        crypto = LibCrypto(args.libcrypto)
+    except OSError as e:
+        print(f"Could not load {args.libcrypto}: {e}", file=sys.stderr)
+        exit(1)
+
+    print(f"Benchmarking with {crypto.version()}", file=sys.stderr)
+    results = {name: benchmark_algorithm(crypto, name, args.kind, args.seconds, args.batch_size) for name in args.algorithms}
+    json.dump({"version": crypto.version(), "algorithms": results}, sys.stdout)
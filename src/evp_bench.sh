@@ -0,0 +1,11 @@
+#!/bin/bash
+set -e
+
+# export KIND=kem
+# export ALG="mlkem512 mlkem768"
+# export TEST_TIME=1
+
+# libcrypto.so.3 is found through LD_LIBRARY_PATH like for the openssl binary, and
+# loads the providers of OPENSSL_CONF. ALG may hold several space separated algorithms.
+${PYTHON:-python3} ./src/evp_bench.py --kind $KIND --seconds $TEST_TIME \
+    ${BATCH_SIZE:+--batch-size $BATCH_SIZE} $ALG
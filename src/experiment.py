@@ -0,0 +1,94 @@
+import tomllib
+
+from pathlib import Path
+from dataclasses import dataclass, field
+
+
+DEFAULT_EXPERIMENT_FILE = Path("./experiments/default.toml")
+# Where an algorithm name is used, providers may know the same algorithm by different names in each
+ALIAS_CONTEXTS = ("tls", "performance")
+ALGORITHM_KINDS = ("kem", "sig")
+
+
+@dataclass(frozen=True)
+class TlsCombination:
+    nist_level: int
+    kem: str
+    sig: str
+
+
+@dataclass
+class Experiment:
+    """The algorithms a run measures, see experiments/default.toml for the file format.
+
+    Algorithms are written with the same name for every provider, `aliases` translates them into the
+    name a provider knows them by, e.g. "mlkem512" into "ML-KEM-512" for `openssl speed` of OpenSSL 3.5.
+    """
+    tls_combinations: list[TlsCombination]
+    performance: dict[str, list[str]]
+    # provider -> context -> name in the experiment -> name of the provider
+    aliases: dict[str, dict[str, dict[str, str]]] = field(default_factory=dict)
+    # The parsed file, stored with the run settings so a resumed run can't silently measure something else
+    definition: dict = field(default_factory=dict)
+
+    @property
+    def nist_levels(self) -> list[int]:
+        return sorted({combination.nist_level for combination in self.tls_combinations})
+
+    def alias(self, provider: str, context: str, name: str) -> str:
+        return self.aliases.get(provider, {}).get(context, {}).get(name, name)
+
+    def performance_algorithms(self, kind: str, provider: str) -> list[str]:
+        """The algorithms of one kind ("kem" or "sig") to benchmark with `openssl speed`, named as the provider knows them."""
+        return [self.alias(provider, "performance", name) for name in self.performance.get(kind, [])]
+
+
+def _string_list(value, where: str) -> list[str]:
+    if not isinstance(value, list) or not all(isinstance(item, str) and item for item in value):
+        raise ValueError(f"{where} must be a list of algorithm names")
+    return value
+
+
+def parse_experiment(definition: dict) -> Experiment:
+    """Expand the [[tls]] blocks of an experiment into its combinations.
+
+    Every block measures each of its KEMs with each of its SIGs. A KEM/SIG pair listed in several
+    blocks is only measured once, at the level of the first block listing it.
+    """
+    combinations: dict[tuple[str, str], TlsCombination] = {}
+    for index, block in enumerate(definition.get("tls", [])):
+        where = f"tls block {index + 1}"
+        level = block.get("nist_level")
+        if not isinstance(level, int):
+            raise ValueError(f"{where} needs an integer nist_level")
+        for kem in _string_list(block.get("kem"), f"{where} kem"):
+            for sig in _string_list(block.get("sig"), f"{where} sig"):
+                combinations.setdefault((kem, sig), TlsCombination(level, kem, sig))
+
+    performance = definition.get("performance", {})
+    unknown_kinds = set(performance) - set(ALGORITHM_KINDS)
+    if unknown_kinds:
+        raise ValueError(f"Unknown performance lists {', '.join(sorted(unknown_kinds))}, expected {', '.join(ALGORITHM_KINDS)}")
+
+    aliases = definition.get("aliases", {})
+    for provider, contexts in aliases.items():
+        unknown_contexts = set(contexts) - set(ALIAS_CONTEXTS)
+        if unknown_contexts:
+            raise ValueError(f"Unknown alias contexts {', '.join(sorted(unknown_contexts))} of {provider}, expected {', '.join(ALIAS_CONTEXTS)}")
+
+    return Experiment(
+        # Ordered by level, so the matrix runs from the fastest to the slowest algorithms like before
+        sorted(combinations.values(), key=lambda combination: combination.nist_level),
+        {kind: _string_list(algs, f"performance {kind}") for kind, algs in performance.items()},
+        aliases,
+        definition
+    )
+
+
+def load_experiment(path: Path) -> Experiment:
+    with open(path, "rb") as experiment_file:
+        try:
+            definition = tomllib.load(experiment_file)
+        except tomllib.TOMLDecodeError as e:
+            raise ValueError(f"{path} is not valid TOML: {e}")
+    return parse_experiment(definition)
@@ -0,0 +1,134 @@
+import re
+
+from dataclasses import dataclass, field
+
+
+# ">>> TLS 1.3, Handshake [length 00dc], ClientHello", followed by the message bytes as indented hex lines
+MSG_LINE_REGEX = r"^(>>>|<<<) \S+ [\d.]+, (\w+) \[length ([0-9a-fA-F]+)\](?:, (\w+))?"
+HEX_LINE_REGEX = r"^\s+((?:[0-9a-fA-F]{2}\s*)+)$"
+
+HANDSHAKE_HEADER_LENGTH = 4
+KEY_SHARE_EXTENSION = 0x0033
+# The random of a HelloRetryRequest, which -msg prints as a ServerHello (RFC 8446 section 4.1.3)
+HELLO_RETRY_REQUEST_RANDOM = bytes.fromhex("cf21ad74e59a6111be1d8c021e65b891c2a211167abb8c5e079e09e2c8a8339c")
+
+
+@dataclass
+class TlsMessage:
+    # "client" or "server", the side that sent the message
+    sender: str
+    content_type: str
+    # The handshake message type, None for other content types
+    name: str | None
+    length: int
+    data: bytes
+
+
+@dataclass
+class HandshakeCapture:
+    messages: list[TlsMessage] = field(default_factory=list)
+
+    def handshake_messages(self) -> list[TlsMessage]:
+        return [message for message in self.messages_until_finished() if message.content_type == "Handshake"]
+
+    def wire_bytes(self, sender: str) -> int:
+        """Bytes sent on the wire by one side until the client Finished, record headers included."""
+        total = 0
+        for message in self.messages_until_finished():
+            if message.sender == sender and message.content_type == "RecordHeader":
+                # The last two bytes of the record header are the record length
+                total += message.length + int.from_bytes(message.data[3:5], "big")
+        return total
+
+    def messages_until_finished(self) -> list[TlsMessage]:
+        """Messages up to the client Finished, session tickets sent afterwards aren't part of the handshake."""
+        for index, message in enumerate(self.messages):
+            if message.sender == "client" and message.name == "Finished":
+                return self.messages[:index + 1]
+        return self.messages
+
+    def message_bytes(self, sender: str) -> dict[str, int]:
+        """Total length of every handshake message type sent by one side, handshake headers included."""
+        sizes: dict[str, int] = {}
+        for message in self.handshake_messages():
+            if message.sender == sender and message.name:
+                sizes[message.name] = sizes.get(message.name, 0) + message.length
+        return sizes
+
+    def hello_retry_requests(self) -> int:
+        return sum(
+            1 for message in self.handshake_messages()
+            if message.name == "ServerHello" and message.data[6:38] == HELLO_RETRY_REQUEST_RANDOM
+        )
+
+    def key_share_bytes(self, sender: str) -> int | None:
+        """Size of the key exchange data in the key share of the last ClientHello or ServerHello."""
+        hello = "ClientHello" if sender == "client" else "ServerHello"
+        messages = [message for message in self.handshake_messages() if message.sender == sender and message.name == hello]
+        if not messages:
+            return None
+        return parse_key_share_length(messages[-1].data, sender == "client")
+
+
+def parse_msg_output(output: str) -> HandshakeCapture:
+    """Parse the output of `openssl s_client -msg` into the messages and their bytes."""
+    capture = HandshakeCapture()
+    current: TlsMessage | None = None
+    hex_bytes: list[str] = []
+
+    def finish():
+        if current is not None:
+            current.data = bytes.fromhex("".join(hex_bytes))
+            capture.messages.append(current)
+
+    for line in output.splitlines():
+        match = re.match(MSG_LINE_REGEX, line)
+        if match:
+            finish()
+            direction, content_type, length, name = match.groups()
+            current = TlsMessage("client" if direction == ">>>" else "server", content_type, name, int(length, 16), b"")
+            hex_bytes = []
+            continue
+
+        hex_match = re.match(HEX_LINE_REGEX, line)
+        if hex_match and current is not None:
+            hex_bytes.extend(hex_match.group(1).split())
+        else:
+            finish()
+            current = None
+    finish()
+    return capture
+
+
+def parse_key_share_length(hello: bytes, is_client_hello: bool) -> int | None:
+    """Sum of the key exchange lengths of all entries in the key_share extension of a hello message."""
+    # Handshake header, legacy version and random
+    offset = HANDSHAKE_HEADER_LENGTH + 2 + 32
+    session_id_length = hello[offset]
+    offset += 1 + session_id_length
+    if is_client_hello:
+        offset += 2 + int.from_bytes(hello[offset:offset + 2], "big")
+        offset += 1 + hello[offset]
+    else:
+        # Cipher suite and legacy compression method
+        offset += 3
+
+    extensions_end = offset + 2 + int.from_bytes(hello[offset:offset + 2], "big")
+    offset += 2
+    while offset + 4 <= extensions_end:
+        extension_type = int.from_bytes(hello[offset:offset + 2], "big")
+        extension_length = int.from_bytes(hello[offset + 2:offset + 4], "big")
+        body = hello[offset + 4:offset + 4 + extension_length]
+        offset += 4 + extension_length
+        if extension_type != KEY_SHARE_EXTENSION:
+            continue
+
+        # The ClientHello carries a list of shares, the ServerHello a single one (a HelloRetryRequest only the group)
+        entries = body[2:] if is_client_hello else body
+        total = 0
+        while len(entries) >= 4:
+            key_exchange_length = int.from_bytes(entries[2:4], "big")
+            total += key_exchange_length
+            entries = entries[4 + key_exchange_length:]
+        return total
+    return None
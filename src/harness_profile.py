@@ -0,0 +1,96 @@
+from time import perf_counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Generator
+
+
+# Where the wall clock time of a measurement goes, everything not in a phase is counted as "other"
+PHASES = ("measurement", "spawn", "certificate", "server_start", "teardown")
+
+
+@dataclass
+class HarnessProfile:
+    """Wall clock time per phase of a measurement, to tell the harness overhead from the time actually measured.
+
+    Phases nest, e.g. spawning the openssl process of a server start, and every second is only counted for the
+    innermost phase, so the phases add up to at most the total.
+    """
+    seconds: dict[str, float] = field(default_factory=lambda: dict.fromkeys(PHASES, 0.0))
+    spawns: int = 0
+    started_at: float = field(default_factory=perf_counter)
+    finished_at: float | None = None
+    # Seconds profiled before the measurement started and charged to it, see charge
+    charged: float = 0.0
+    # [phase, start, seconds spent in nested phases] of the phases currently entered
+    _stack: list[list] = field(default_factory=list)
+
+    @property
+    def total(self) -> float:
+        return (self.finished_at or perf_counter()) - self.started_at + self.charged
+
+    @property
+    def overhead(self) -> float:
+        return self.total - self.seconds["measurement"]
+
+    def enter(self, phase: str):
+        self._stack.append([phase, perf_counter(), 0.0])
+
+    def exit(self):
+        phase, start, nested = self._stack.pop()
+        elapsed = perf_counter() - start
+        self.seconds[phase] += elapsed - nested
+        if phase == "spawn":
+            self.spawns += 1
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def charge(self, other: "HarnessProfile"):
+        """Add the phases of a profile taken before this measurement, e.g. creating the certificate chain it uses."""
+        for phase, seconds in other.seconds.items():
+            self.seconds[phase] += seconds
+        self.spawns += other.spawns
+        self.charged += other.total
+
+    def finish(self):
+        self.finished_at = perf_counter()
+
+    def row(self) -> dict:
+        return {
+            "total_s": f"{self.total:.3f}",
+            **{f"{phase}_s": f"{seconds:.3f}" for phase, seconds in self.seconds.items()},
+            "other_s": f"{self.total - sum(self.seconds.values()):.3f}",
+            "overhead_share": f"{self.overhead / self.total:.4f}" if self.total else "",
+            "spawns": self.spawns
+        }
+
+
+# The profile of the measurement running in this thread, None if the harness isn't profiled
+_current_profile: ContextVar[HarnessProfile | None] = ContextVar("harness_profile", default=None)
+
+
+@contextmanager
+def profiling(profile: HarnessProfile | None) -> Generator[HarnessProfile | None]:
+    """Record the phases entered in this thread into profile until leaving, a None profile records nothing."""
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        if profile is not None:
+            profile.finish()
+
+
+@contextmanager
+def phase(name: str) -> Generator[None]:
+    """Count the time spent inside into phase `name` of the current profile, if there is one."""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+
+    profile.enter(name)
+    try:
+        yield
+    finally:
+        profile.exit()
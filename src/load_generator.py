@@ -0,0 +1,172 @@
+"""Handshake load generator, N concurrent TLS 1.3 handshakes spread over one client process per core.
+
+The client processes run this file as a script, started through OpenSslRunner like the openssl processes of the
+measurement, so Python's ssl module loads libssl.so.3 and the providers from the same OpenSSL installation and config.
+Every process prints the handshake latencies of its own asyncio event loop as JSON.
+"""
+import os
+import ssl
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import subprocess
+
+from pathlib import Path
+from dataclasses import dataclass, field
+
+from openssl_runner import OpenSslError, OpenSslRunner, pinned
+
+
+DEFAULT_CONCURRENCY_LEVELS = [1, 2, 4, 8, 16, 32, 64]
+
+
+@dataclass
+class LoadResult:
+    concurrency: int
+    duration: float
+    handshakes: int
+    errors: int
+    connections_per_second: float
+    latencies_ms: list[float] = field(repr=False)
+
+    def percentile(self, q: float) -> float:
+        return percentile(self.latencies_ms, q)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Linearly interpolated percentile of values, q in [0, 100]."""
+    if not values:
+        return float("nan")
+
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def create_client_context(client_cert: tuple[Path, Path] | None = None) -> ssl.SSLContext:
+    """Client context for the handshakes, presenting the (certificate, key) in client_cert for mutual TLS."""
+    # Like s_time the client doesn't verify the server, only the handshake itself is of interest
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    context.minimum_version = ssl.TLSVersion.TLSv1_3
+    context.maximum_version = ssl.TLSVersion.TLSv1_3
+    if client_cert is not None:
+        context.load_cert_chain(*client_cert)
+    return context
+
+
+async def _handshake_loop(host: str, port: int, context: ssl.SSLContext, deadline: float, latencies: list[float], errors: list[BaseException]):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            _, writer = await asyncio.open_connection(host, port, ssl=context, server_hostname=host)
+        except (OSError, ssl.SSLError) as e:
+            errors.append(e)
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+        # Like s_time, drop the connection without a close_notify so the teardown isn't measured
+        writer.transport.abort()
+
+
+async def _run_handshakes(host: str, port: int, concurrency: int, duration: float, client_cert: tuple[Path, Path] | None) -> tuple[list[float], list[BaseException], float]:
+    context = create_client_context(client_cert)
+    latencies: list[float] = []
+    errors: list[BaseException] = []
+
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*[
+        _handshake_loop(host, port, context, deadline, latencies, errors)
+        for _ in range(concurrency)
+    ])
+    return latencies, errors, time.perf_counter() - start
+
+
+def _handshake_worker(host: str, port: int, concurrency: int, duration: float, client_cert: tuple[Path, Path] | None) -> tuple[list[float], int, float, str | None]:
+    latencies, errors, elapsed = asyncio.run(_run_handshakes(host, port, concurrency, duration, client_cert))
+    return latencies, len(errors), elapsed, repr(errors[0]) if errors else None
+
+
+def split_concurrency(concurrency: int, workers: int) -> list[int]:
+    """Distribute concurrency connections as evenly as possible over at most `workers` processes."""
+    workers = max(1, min(workers, concurrency))
+    return [concurrency // workers + (1 if i < concurrency % workers else 0) for i in range(workers)]
+
+
+def run_load(runner: OpenSslRunner, workers: int, host: str, port: int, concurrency: int, duration: float, cpu_cores: list[int] | None = None, client_cert: tuple[Path, Path] | None = None) -> LoadResult:
+    cert_args = ["--cert", client_cert[0], "--key", client_cert[1]] if client_cert else []
+    processes = [
+        runner.start(
+            pinned([sys.executable, __file__, "--host", host, "--port", port, "--concurrency", worker_concurrency, "--seconds", duration, *cert_args], cpu_cores),
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+        for worker_concurrency in split_concurrency(concurrency, workers)
+    ]
+
+    outputs = []
+    for process in processes:
+        stdout, stderr = process.communicate()
+        outputs.append((process.args, process.returncode, stdout, stderr))
+    for argv, returncode, stdout, stderr in outputs:
+        if returncode != 0:
+            raise OpenSslError(argv, returncode, stdout, stderr)
+
+    latencies: list[float] = []
+    errors = 0
+    connections_per_second = 0.0
+    for _, _, stdout, _ in outputs:
+        worker = json.loads(stdout)
+        latencies.extend(worker["latencies_ms"])
+        errors += worker["errors"]
+        connections_per_second += len(worker["latencies_ms"]) / worker["elapsed"]
+        if worker["first_error"]:
+            logging.warning(f"{worker['errors']} handshakes failed at concurrency {concurrency}, first error: {worker['first_error']}")
+
+    return LoadResult(concurrency, duration, len(latencies), errors, connections_per_second, latencies)
+
+
+def sweep_concurrency(runner: OpenSslRunner, host: str, port: int, concurrency_levels: list[int], duration: float, cpu_cores: list[int] | None = None, client_cert: tuple[Path, Path] | None = None) -> list[LoadResult]:
+    """Run the handshake load generator for every concurrency level against a running server.
+
+    The connections are spread over one process per available client core, each running its own
+    asyncio event loop, so the load generator isn't limited by the GIL. Raises OpenSslError if a process fails,
+    e.g. because the ssl module can't load the client certificate.
+    """
+    workers = len(cpu_cores) if cpu_cores else os.cpu_count() or 1
+
+    results = []
+    for concurrency in concurrency_levels:
+        logging.info(f"Running handshake load with {concurrency} concurrent connections for {duration}s")
+        result = run_load(runner, workers, host, port, concurrency, duration, cpu_cores, client_cert)
+        logging.info(f"  {result.connections_per_second:.2f} connections/s, p50 {result.percentile(50):.2f} ms, p99 {result.percentile(99):.2f} ms")
+        results.append(result)
+
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Open concurrent TLS 1.3 handshakes from a single asyncio event loop.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=4433)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--cert", type=Path, help="Client certificate for mutual TLS")
+    parser.add_argument("--key", type=Path, help="Key of the client certificate")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        latencies, error_count, elapsed, first_error = _handshake_worker(args.host, args.port, args.concurrency, args.seconds, (args.cert, args.key) if args.cert else None)
+    except ssl.SSLError as e:
+        print(f"Could not create the client context: {e}", file=sys.stderr)
+        exit(1)
+
+    json.dump({"latencies_ms": latencies, "errors": error_count, "elapsed": elapsed, "first_error": first_error}, sys.stdout)
@@ -1,81 +1,137 @@
 import os
 import re
+import sys
+import json
 import signal
+import socket
+import random
+import argparse
 import subprocess
-import sys
+import hashlib
 import logging
 import tempfile
 
-from time import sleep
+from time import sleep, perf_counter
 from pathlib import Path
-from contextlib import contextmanager
-from typing import Generator, Tuple
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from datetime import datetime
+from itertools import product
+from dataclasses import dataclass, replace
+from typing import IO, Generator, Iterable, Tuple
 
+from cert_cache import CACHE_CHAIN_FILE, CACHE_CLIENT_CA_FILE, CACHE_CLIENT_CERT_FILE, CACHE_CLIENT_KEY_FILE, CertificateCache, der_certificate_sizes
+from load_generator import DEFAULT_CONCURRENCY_LEVELS, LoadResult, percentile, sweep_concurrency
+from measurement_stream import IntervalSample, parse_s_time_output, parse_s_time_real_time, parse_windows, trim_warmup
+from adaptive import AdaptiveResult, ConvergenceCriteria, collect_until_converged
+from result_store import ResultKey, ResultStore
+from handshake_bytes import parse_msg_output
+from process_stats import ProcessGroupMonitor
+from server_pool import ServerPool
+from openssl_setup import PROVIDER_CONFIGS, OpenSslSetup, provider_setup
+from openssl_runner import OpenSslError, openssl_runner
+from harness_profile import HarnessProfile, phase, profiling
+from network_emulator import NETWORK_PROFILES, NetworkEmulator, NetworkProfile, parse_network_profile
+from speed_output import normalize_algorithm_name, parse_speed_output
+from experiment import DEFAULT_EXPERIMENT_FILE, Experiment, load_experiment
 
-NIST_LEVELS = [1, 3, 5]
 
 TEST_TIME = 60
 
-KEM_ALGS = {
-    1: ["mlkem512", "P-256"], 
-    3: ["mlkem768", "P-384"], 
-    5: ["mlkem1024", "P-521"]
-}
-SIG_ALGS = {
-    1: ["mldsa44", "rsa:3072"],
-    3: ["mldsa65", "rsa:7680"],
-    5: ["mldsa87", "rsa:15360"]
-}
+DEFAULT_PORT = 4433
+# Servers of the other modes of a combination (early data, bulk transfer) listen on the port plus a multiple of this
+SERVER_MODE_PORT_OFFSET = 1000
+# Servers of the providers of a campaign listen on the port plus a multiple of this
+PROVIDER_PORT_OFFSET = 10000
+SERVER_START_TIMEOUT = 60
+SERVER_PROBE_INTERVAL = 0.05
+# Only the end of a server's output is logged, the mTLS server writes its certificate verification of every connection
+SERVER_LOG_TAIL_BYTES = 64 * 1024
+# Minimum of two cores per server/client pair: one for s_server, one for s_time
+DEFAULT_CORES_PER_PAIR = 2
+# Test time per concurrency level of the handshake load sweep
+DEFAULT_LOAD_TEST_TIME = 10
+DEFAULT_NETWORK_TEST_TIME = 10
+# Window length in seconds of adaptive measurements if no --interval is given, also the shortest one allowed:
+# s_time rates are per user CPU second, a shorter window counts too few clock ticks for its mean to converge
+ADAPTIVE_WINDOW = 3
 
-KEM_ALGS_PERFORMANCE = [
-    "mlkem512", "mlkem768", "mlkem1024"
-]
-KEM_ALGS_OSS35_PERFORMANCE = [
-    "ML-KEM-512", "ML-KEM-768", "ML-KEM-1024"
-]
-SIG_ALGS_PERFORMANCE = [
-    "mldsa44", "mldsa65", "mldsa87"
-]
 
 MEASUREMENT_FILTERING_REGEX_TLS = r"\d+\.\d+\s"
-MEASUREMENT_FILTERING_REGEX_KEM = r"((\d|\.)*|\s+){5}$"
 RESULT_FILE_TLS = Path("./results/results_tls.csv")
 RESULT_FILE_KEM_ALG_PERF = Path("./results/results_kem_alg.csv")
 RESULT_FILE_SIG_ALG_PERF = Path("./results/results_sig_alg.csv")
+RESULT_FILE_TLS_LOAD = Path("./results/results_tls_load.csv")
+RESULT_FILE_TLS_TIMESERIES = Path("./results/results_tls_timeseries.csv")
+RESULT_FILE_TLS_BULK = Path("./results/results_tls_bulk.csv")
+RESULT_FILE_TLS_NETWORK = Path("./results/results_tls_network.csv")
+RESULT_FILE_TLS_BYTES = Path("./results/results_tls_bytes.csv")
+RESULT_FILE_ALG_LATENCY = Path("./results/results_alg_latency.csv")
+RESULT_FILE_TLS_HARNESS = Path("./results/results_tls_harness.csv")
+RESULT_DATABASE = Path("./results/results.sqlite")
+# Exports per provider and repetition, in the <provider>_<n> layout of results/raw_data
+RESULT_RUNS_DIR = Path("./results/runs")
+RESULT_FILES = {
+    "tls": RESULT_FILE_TLS,
+    "tls_timeseries": RESULT_FILE_TLS_TIMESERIES,
+    "tls_load": RESULT_FILE_TLS_LOAD,
+    "tls_bulk": RESULT_FILE_TLS_BULK,
+    "tls_network": RESULT_FILE_TLS_NETWORK,
+    "tls_bytes": RESULT_FILE_TLS_BYTES,
+    "tls_harness": RESULT_FILE_TLS_HARNESS,
+    "kem_alg": RESULT_FILE_KEM_ALG_PERF,
+    "sig_alg": RESULT_FILE_SIG_ALG_PERF,
+    "alg_latency": RESULT_FILE_ALG_LATENCY,
+}
+KEM_ALG_METRICS = ["keygens/s", "encaps/s", "decaps/s"]
+SIG_ALG_METRICS = ["keygens/s", "signs/s", "verify/s"]
+# Benchmarks of the algorithms: `openssl speed`, or the in-process EVP benchmark with latency distributions
+ALG_ENGINES = ["speed", "evp"]
+# Command line arguments that don't change what is measured
+NON_MEASUREMENT_ARGS = {"provider", "repetitions", "run_id", "resume", "export_only", "regen_certs", "clear_cert_cache", "parallel", "cores_per_pair", "base_port", "seed", "dry_run", "profile_harness", "export_latest"}
+
+PAYLOAD_DIR = Path("./payloads")
+PAYLOAD_CHUNK_SIZE = 1024 * 1024
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+# Chain shapes list the algorithms from the root CA down to the server certificate,
+# the placeholder stands for the signature algorithm of the combination
+CHAIN_SEPARATOR = ">"
+CHAIN_SHAPE_PLACEHOLDER = "*"
+DEFAULT_CHAIN_SHAPE = "*>*"
+
+CERT_CACHE_DIR = Path("./cert_cache")
+CERT_CONFIG_FILE = Path("./cert.cnf")
+CERT_CREATION_SCRIPT = Path("./src/create_certificate.sh")
+# The Python process of the EVP benchmark, the other measurements start openssl directly
+EARLY_DATA_BENCH = Path("./src/early_data_bench.py")
+EVP_BENCH_SCRIPT = Path("./src/evp_bench.sh")
 
 logging.basicConfig(level=logging.DEBUG)
 
-def create_command_with_env(command: str, env: dict[str, str]) -> str:
-    return f"export {" export ".join([f"{key}={value} &&" for key, value in env.items()])} {command}"
+def run_openssl(openssl: OpenSslSetup, args: list, cpu_cores: list[int] | None = None) -> str:
+    """Return the output of `openssl <args>`, a failing command aborts the run."""
+    try:
+        return openssl_runner(openssl).run(args, cpu_cores).stdout
+    except OpenSslError as e:
+        logging.error(str(e))
+        exit(1)
 
-def create_certificate(sig_alg: str, tmpdir_path: Path, use_openssl_35: bool) -> Tuple[Path, Path]:
-    logging.debug(f"Creating certificate with sig_alg: {sig_alg}")
+def create_certificate(chain: list[str], tmpdir_path: Path, openssl: OpenSslSetup, client_auth: bool = False) -> Tuple[Path, Path]:
+    """Create the chain, with client_auth also a client certificate of the server certificate's algorithm."""
+    logging.debug(f"Creating certificate chain: {CHAIN_SEPARATOR.join(chain)}" + (" with a client certificate" if client_auth else ""))
     server_private_key = tmpdir_path / "server.key"
     server_cert = tmpdir_path / "server.crt"
 
-    command_certificate_creation = create_command_with_env(
-        "bash ./src/create_certificate.sh",
-        {
-            "CA_KEY_PATH": str(tmpdir_path / "ca.key"),
-            "CA_CERT_PATH": str(tmpdir_path / "ca.crt"),
-            "CERT_PRIV_KEY_PATH": str(server_private_key),
-            "CERT_REQUEST_PATH": str(tmpdir_path / "server.csr"),
-            "CERT_PATH": str(server_cert),
-            "SIG_ALG": sig_alg,
-            "USE_OSSL35": int(use_openssl_35)
-        }
-    )
-
-
-    # Run the certificate creation command, suppress output unless DEBUG
-    logging.debug(f"Certificate creation command: {command_certificate_creation}")
+    # Run the certificate creation script, suppress output unless DEBUG
     debug = logging.getLogger().isEnabledFor(logging.DEBUG)
-    result = subprocess.run(
-        command_certificate_creation,
-        shell=True,
-        capture_output=True,
-        text=True
-    )
+    with phase("certificate"):
+        result = openssl_runner(openssl).run_script(
+            CERT_CREATION_SCRIPT,
+            {"CERT_DIR": tmpdir_path, "CHAIN_ALGS": " ".join(chain), "CLIENT_CERT": int(client_auth)},
+            check=False
+        )
     if debug:
         logging.debug(f"Certificate creation stdout:\n{result.stdout}")
         logging.debug(f"Certificate creation stderr:\n{result.stderr}")
@@ -84,156 +140,1076 @@ def create_certificate(sig_alg: str, tmpdir_path: Path, use_openssl_35: bool) ->
 
     return server_private_key, server_cert
 
+def get_openssl_build_info(openssl: OpenSslSetup) -> str:
+    """Describe the OpenSSL build and the providers it loads."""
+    try:
+        runner = openssl_runner(openssl)
+        # Everything that identifies the build and the providers it loads
+        return runner.run(["version", "-a"]).stdout + runner.run(["list", "-providers", "-verbose"]).stdout
+    except (OpenSslError, FileNotFoundError) as e:
+        logging.error(f"Could not determine the OpenSSL build: {e}")
+        exit(1)
+
+def create_certificate_cache(build_info: str, regenerate: bool) -> CertificateCache:
+    # The whole build description is part of the key, so cached certificates are never shared between setups
+    return CertificateCache(
+        CERT_CACHE_DIR,
+        hashlib.sha256(build_info.encode()).hexdigest(),
+        [CERT_CONFIG_FILE, CERT_CREATION_SCRIPT],
+        regenerate=regenerate
+    )
+
+def chain_algorithms(sig: str) -> list[str]:
+    """The algorithms from the root CA down to the server certificate, a plain signature algorithm is a two level chain of it."""
+    if CHAIN_SEPARATOR in sig:
+        return sig.split(CHAIN_SEPARATOR)
+    return [sig, sig]
+
+def chain_key(shape: str, sig_alg: str) -> str:
+    """The SIG a combination is stored under: sig_alg for the default shape, otherwise the resolved chain."""
+    if shape == DEFAULT_CHAIN_SHAPE:
+        return sig_alg
+    return shape.replace(CHAIN_SHAPE_PLACEHOLDER, sig_alg)
+
+def client_credentials(cert_path: Path) -> Tuple[Path, Path]:
+    """(client certificate, client key) next to the server certificate of a client auth cache entry."""
+    return cert_path.with_name(CACHE_CLIENT_CERT_FILE), cert_path.with_name(CACHE_CLIENT_KEY_FILE)
+
+def payload_file_name(size: int) -> str:
+    return f"payload_{size}.bin"
+
+def create_payload_files(sizes: list[int]) -> Path:
+    """Write a random payload file per size once, s_server -WWW then serves them from the page cache."""
+    PAYLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    for size in sizes:
+        path = PAYLOAD_DIR / payload_file_name(size)
+        if path.exists() and path.stat().st_size == size:
+            continue
+
+        logging.info(f"Creating {size} byte payload {path}")
+        with open(path, "wb") as payload_file:
+            for offset in range(0, size, PAYLOAD_CHUNK_SIZE):
+                payload_file.write(os.urandom(min(PAYLOAD_CHUNK_SIZE, size - offset)))
+    return PAYLOAD_DIR
+
+def format_cores(cores: list[int]) -> str:
+    return ",".join(str(core) for core in cores)
+
+def allocate_core_sets(cores_per_pair: int) -> list[Tuple[list[int], list[int]]]:
+    """Split the cores available to this process into disjoint (server, client) core sets."""
+    if cores_per_pair < 2:
+        raise ValueError("At least two cores per server/client pair are required")
+
+    available_cores = sorted(os.sched_getaffinity(0))
+    server_share = cores_per_pair // 2
+
+    core_sets = []
+    for start in range(0, len(available_cores) - cores_per_pair + 1, cores_per_pair):
+        pair_cores = available_cores[start:start + cores_per_pair]
+        core_sets.append((pair_cores[:server_share], pair_cores[server_share:]))
+
+    return core_sets
+
 @contextmanager
-def start_server(kem_alg: str, sig_alg: str, use_openssl_35: bool) -> Generator[subprocess.Popen]:
-    with tempfile.TemporaryDirectory() as tmpdirname:
-        tmpdir_path = Path(tmpdirname)
+def start_server(kem_alg: str, sig_alg: str, openssl: OpenSslSetup, cert_cache: CertificateCache, port: int = DEFAULT_PORT, cpu_cores: list[int] | None = None, early_data: bool = False, document_root: Path | None = None, ktls: bool = False, client_auth: bool = False) -> Generator[subprocess.Popen]:
+    """Start s_server, sig_alg is either a signature algorithm or a whole chain as in chain_algorithms.
 
-        key_path, cert_path = create_certificate(sig_alg, tmpdir_path, use_openssl_35)
+    With client_auth the server requires a client certificate issued by the CA of its own chain.
+    """
+    with phase("certificate"):
+        key_path, cert_path = cert_cache.get(sig_alg, lambda cache_entry: create_certificate(chain_algorithms(sig_alg), cache_entry, openssl, client_auth), client_auth)
+    chain_path = cert_path.with_name(CACHE_CHAIN_FILE)
 
-        command_start_server = create_command_with_env(
-            "bash ./src/start_server.sh",
-            {
-                "KEM_ALG": kem_alg,
-                "CERT_PATH": str(cert_path.absolute()),
-                "KEY_PATH": str(key_path.absolute()),
-                "USE_OSSL35": int(use_openssl_35)
-            }
-        )
+    if port_in_use(port):
+        # The probe would handshake with whatever listens there, and the measurements would run against it
+        logging.error(f"Port {port} is already in use, e.g. by a server left over from an aborted run")
+        exit(1)
 
-        logging.debug(f"Starting server with (kem_alg | sig_alg): ({kem_alg} | {sig_alg})")
-        logging.debug(f"Server command: {command_start_server}")
-        process = subprocess.Popen(
-            command_start_server,
-            shell=True,
+    logging.debug(f"Starting server with (kem_alg | sig_alg): ({kem_alg} | {sig_alg}) on port {port}")
+    # The server output goes to a file instead of a pipe nobody reads while the server runs,
+    # a server writing per connection would block on the full pipe in the middle of a measurement
+    server_log = tempfile.TemporaryFile(prefix="s_server-")
+    with phase("server_start"):
+        process = openssl_runner(openssl).popen(
+            server_arguments(kem_alg, cert_path, key_path, chain_path, port, early_data, document_root, ktls, client_auth),
+            cpu_cores,
+            # The payload files are served relative to the working directory
+            cwd=document_root,
             start_new_session=True,
-            stdout=subprocess.PIPE if logging.getLogger().isEnabledFor(logging.DEBUG) else subprocess.DEVNULL,
-            stderr=subprocess.PIPE if logging.getLogger().isEnabledFor(logging.DEBUG) else subprocess.DEVNULL
+            stdout=server_log,
+            stderr=subprocess.STDOUT
         )
 
-        sleep(1)  # Give the server a moment to start
-
-        try:
-            yield process
-        finally:
-            os.killpg(os.getpgid(process.pid), signal.SIGTERM)
-            if logging.getLogger().isEnabledFor(logging.DEBUG):
-                if process.stdout:
-                    out = process.stdout.read().decode(errors='replace')
-                    if out:
-                        logging.debug(f"Server stdout:\n{out}")
-                if process.stderr:
-                    err = process.stderr.read().decode(errors='replace')
-                    if err:
-                        logging.warning(f"Server stderr:\n{err}")
+    try:
+        with phase("server_start"):
+            wait_for_server(process, server_log, kem_alg, openssl, port, client_credentials(cert_path) if client_auth else None)
+        yield process
+    finally:
+        with phase("teardown"):
+            # A server that exited on its own, e.g. one the pool restarts, has its output shown as a warning
+            exited = process.poll() is not None
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                # The server already exited
+                pass
             process.wait()
-            logging.info("Server process terminated.")
-
-def get_measurement_data(use_openssl_35: bool) -> str:
-    command_test = create_command_with_env(
-        "bash ./src/test.sh", 
-        {
-            "TEST_TIME": str(TEST_TIME),
-            "USE_OSSL35": int(use_openssl_35)
-        }
-    )
+            output = read_server_log(server_log)
+            server_log.close()
+        if output:
+            logging.log(logging.WARNING if exited else logging.DEBUG, f"Server output:\n{output}")
+        logging.info("Server process terminated.")
+
+def read_server_log(server_log: IO[bytes]) -> str:
+    size = server_log.seek(0, os.SEEK_END)
+    server_log.seek(max(0, size - SERVER_LOG_TAIL_BYTES))
+    output = server_log.read().decode(errors="replace")
+    return f"[{size - SERVER_LOG_TAIL_BYTES} bytes omitted]\n{output}" if size > SERVER_LOG_TAIL_BYTES else output
+
+def server_arguments(kem_alg: str, cert_path: Path, key_path: Path, chain_path: Path, port: int, early_data: bool, document_root: Path | None, ktls: bool, client_auth: bool) -> list:
+    """Arguments of s_server, see start_server."""
+    args = ["s_server", "-cert", cert_path.absolute(), "-key", key_path.absolute()]
+    if chain_path.exists():
+        # The intermediate certificates sent along with the server certificate
+        args += ["-cert_chain", chain_path.absolute()]
+    if client_auth:
+        # Require a client certificate issued by the CAs of the chain (mutual TLS)
+        args += ["-Verify", "10", "-verify_return_error", "-CAfile", cert_path.with_name(CACHE_CLIENT_CA_FILE).absolute()]
+    if early_data:
+        # s_server can't combine -early_data with -www, so the early data server only echoes.
+        # Without anti-replay protection a single session ticket can be used for 0-RTT repeatedly.
+        args += ["-early_data", "-no_anti_replay", "-quiet"]
+    elif document_root:
+        # Serve the payload files of the bulk transfer benchmark straight from disk.
+        # With kTLS the kernel encrypts and sends the files without copying them through user space.
+        args += ["-WWW"] + (["-ktls", "-sendfile"] if ktls else [])
+    else:
+        args += ["-www"]
+    return args + ["-accept", f"localhost:{port}", "-tls1_3", "-curves", kem_alg]
+
+def wait_for_server(process: subprocess.Popen, server_log: IO[bytes], kem_alg: str, openssl: OpenSslSetup, port: int = DEFAULT_PORT, client_cert: Tuple[Path, Path] | None = None, timeout: float = SERVER_START_TIMEOUT):
+    """Probe the server with handshakes until one succeeds, instead of guessing how long loading the key takes."""
+    # A full handshake offering only the server's group
+    probe = ["s_client", "-connect", f"localhost:{port}", "-tls1_3", "-groups", kem_alg, *client_cert_arguments(client_cert)]
+
+    started_at = perf_counter()
+    while perf_counter() - started_at < timeout:
+        if process.poll() is not None:
+            logging.error(f"Server exited with code {process.returncode} before accepting connections, output:\n{read_server_log(server_log)}")
+            exit(1)
+
+        if openssl_runner(openssl).run(probe, check=False).returncode == 0:
+            if process.poll() is not None:
+                logging.error(f"A probe handshake on port {port} succeeded, but the server exited with code {process.returncode}, another process listens on the port. Server output:\n{read_server_log(server_log)}")
+                exit(1)
+            logging.debug(f"Server on port {port} ready after {perf_counter() - started_at:.2f}s")
+            return
+        sleep(SERVER_PROBE_INTERVAL)
+
+    logging.error(f"Server on port {port} didn't complete a handshake within {timeout}s")
+    exit(1)
+
+def port_in_use(port: int) -> bool:
+    try:
+        with socket.create_connection(("localhost", port), timeout=1):
+            return True
+    except OSError:
+        return False
+
+def client_cert_arguments(client_cert: Tuple[Path, Path] | None) -> list:
+    """Arguments of the clients presenting the (certificate, key) in client_cert if given."""
+    if client_cert is None:
+        return []
+    cert_path, key_path = client_cert
+    return ["-cert", cert_path.absolute(), "-key", key_path.absolute()]
+
+def get_measurement_output(openssl: OpenSslSetup, port: int = DEFAULT_PORT, cpu_cores: list[int] | None = None, test_time: int = TEST_TIME, session_mode: str = "new", page: str = "", host: str = "localhost", client_cert: Tuple[Path, Path] | None = None) -> str:
+    # SESSION_MODE: "new" for full handshakes, "reuse" for resumed sessions
+    args = ["s_time", "-connect", f"{host}:{port}", f"-{session_mode}", "-time", test_time, "-tls1_3"]
+    if page:
+        # The page (payload file) fetched over every connection
+        args += ["-www", page]
+    with phase("measurement"):
+        return run_openssl(openssl, args + client_cert_arguments(client_cert), cpu_cores)
+
+def get_measurement_data(openssl: OpenSslSetup, port: int = DEFAULT_PORT, cpu_cores: list[int] | None = None) -> tuple[str, int]:
+    """Return (connections/s, connections) of a TEST_TIME long measurement."""
     logging.info(f"Running performance test")
-    logging.debug(f"Test command: {command_test}")
-    measurement_stream = os.popen(command_test)
-    measurement_output = measurement_stream.read()
-
-    return re.search(MEASUREMENT_FILTERING_REGEX_TLS, measurement_output).group()
-
-def get_algorithm_performance(alg: str, use_openssl_35: bool) -> str:
-    command_test = create_command_with_env(
-        "bash ./src/get_alg_performance.sh", 
-        {
-            "ALG": alg,
-            "TEST_TIME": str(TEST_TIME),
-            "USE_OSSL35": int(use_openssl_35)
+    measurement_output = get_measurement_output(openssl, port, cpu_cores)
+
+    connections, _ = parse_s_time_output(measurement_output)
+    return re.search(MEASUREMENT_FILTERING_REGEX_TLS, measurement_output).group().strip(), connections
+
+def get_mtls_measurement_data(server_pid: int, client_cert: Tuple[Path, Path], openssl: OpenSslSetup, port: int = DEFAULT_PORT, cpu_cores: list[int] | None = None, convergence: ConvergenceCriteria | None = None) -> dict:
+    """Measure full handshakes presenting a client certificate, with the CPU time of both sides per handshake."""
+    logging.info(f"Running performance test with client certificates")
+    with ProcessGroupMonitor(server_pid) as monitor:
+        if convergence:
+            result, samples = measure_s_time_adaptive(openssl, port, cpu_cores, convergence, client_cert=client_cert)
+            data = adaptive_columns(result, "_mtls")
+            connections, connections_per_second = sum(sample.connections for sample in samples), result.means[0]
+        else:
+            measurement_output = get_measurement_output(openssl, port, cpu_cores, client_cert=client_cert)
+            connections, connections_per_second = parse_s_time_output(measurement_output)
+            data = {"test_time_mtls": TEST_TIME, "connections/s_mtls": f"{connections_per_second:.2f}"}
+
+    return {
+        **data,
+        "client_cpu_us/handshake_mtls": client_cpu_per_handshake(connections_per_second),
+        "server_cpu_us/handshake_mtls": monitor.usage.per_handshake(connections)["server_cpu_us/handshake"]
+    }
+
+def client_cpu_per_handshake(connections_per_user_second: float) -> str:
+    # s_time reports its rate per second of its own user CPU time
+    return f"{1_000_000 / connections_per_user_second:.1f}" if connections_per_user_second else ""
+
+def get_resumed_measurement_data(openssl: OpenSslSetup, port: int = DEFAULT_PORT, cpu_cores: list[int] | None = None, convergence: ConvergenceCriteria | None = None) -> dict:
+    logging.info(f"Running performance test with session resumption")
+    if convergence:
+        result, _ = measure_s_time_adaptive(openssl, port, cpu_cores, convergence, session_mode="reuse")
+        return adaptive_columns(result, "_resumed")
+
+    measurement_output = get_measurement_output(openssl, port, cpu_cores, session_mode="reuse")
+    _, connections_per_second = parse_s_time_output(measurement_output)
+    return {"test_time_resumed": TEST_TIME, "connections/s_resumed": f"{connections_per_second:.2f}"}
+
+def run_early_data_bench(kem_alg: str, openssl: OpenSslSetup, port: int, cpu_cores: list[int] | None, test_time: float) -> dict:
+    """Resumed 0-RTT handshakes for test_time seconds from a single client process (src/early_data_bench.py)."""
+    try:
+        with phase("measurement"):
+            output = openssl_runner(openssl).run_program(
+                [sys.executable, EARLY_DATA_BENCH, "--port", port, "--groups", kem_alg, "--seconds", test_time],
+                cpu_cores
+            ).stdout
+    except OpenSslError as e:
+        logging.error(str(e))
+        exit(1)
+    return json.loads(output)
+
+def early_data_rate(result: dict) -> float:
+    # Per second of the client's user CPU time like s_time, so it compares with connections/s_resumed
+    return result["connections"] / result["user_seconds"] if result["user_seconds"] else 0.0
+
+def get_early_data_measurement_data(kem_alg: str, openssl: OpenSslSetup, port: int = DEFAULT_PORT, cpu_cores: list[int] | None = None, convergence: ConvergenceCriteria | None = None) -> dict:
+    """Measure resumed 0-RTT handshakes, in windows of a client process each until converged with convergence."""
+    logging.info(f"Running performance test with early data")
+    if convergence:
+        windows = []
+        def record() -> Generator[Tuple[float, Tuple[float]]]:
+            while True:
+                windows.append(run_early_data_bench(kem_alg, openssl, port, cpu_cores, ADAPTIVE_WINDOW))
+                yield windows[-1]["real_seconds"], (early_data_rate(windows[-1]),)
+
+        data = adaptive_columns(collect_until_converged(record(), convergence), "_early_data")
+    else:
+        windows = [run_early_data_bench(kem_alg, openssl, port, cpu_cores, TEST_TIME)]
+        data = {"test_time_early_data": TEST_TIME, "connections/s_early_data": f"{early_data_rate(windows[0]):.2f}"}
+
+    connections = sum(window["connections"] for window in windows)
+    accepted = sum(window["accepted"] for window in windows)
+    if accepted < connections:
+        logging.warning(f"Early data was only accepted for {accepted} of {connections} connections")
+    return {
+        **data,
+        "connections/s_early_data_real": f"{connections / sum(window['real_seconds'] for window in windows):.2f}",
+        "early_data_accepted": f"{accepted / max(connections, 1):.3f}"
+    }
+
+def get_bulk_transfer_measurement_data(payload_size: int, openssl: OpenSslSetup, port: int = DEFAULT_PORT, cpu_cores: list[int] | None = None) -> dict:
+    """Fetch the payload of payload_size bytes over a new connection each, for TEST_TIME seconds."""
+    logging.info(f"Running bulk transfer test with {payload_size} byte payloads")
+    measurement_output = get_measurement_output(openssl, port, cpu_cores, page=f"/{payload_file_name(payload_size)}")
+
+    connections, real_seconds, bytes_per_connection = parse_s_time_real_time(measurement_output)
+    if bytes_per_connection < payload_size:
+        logging.warning(f"Only {bytes_per_connection} of {payload_size} payload bytes were read per connection")
+    return {
+        "payload_bytes": payload_size,
+        "connections": connections,
+        "real_seconds": real_seconds,
+        "bytes_per_connection": bytes_per_connection,
+        "connections/s": f"{connections / real_seconds:.2f}",
+        "bytes/s": f"{connections * bytes_per_connection / real_seconds:.0f}"
+    }
+
+def get_handshake_bytes_data(kem_alg: str, openssl: OpenSslSetup, port: int = DEFAULT_PORT) -> dict:
+    """Capture a single handshake and return the bytes each side sent, per handshake message and in total."""
+    # A single full handshake printing every TLS record and message with its bytes.
+    # The client offers only KEM_ALG, so the capture shows the handshake without a HelloRetryRequest.
+    with phase("measurement"):
+        result = openssl_runner(openssl).run(["s_client", "-connect", f"localhost:{port}", "-tls1_3", "-groups", kem_alg, "-msg"], check=False)
+    capture = parse_msg_output(result.stdout)
+    if not capture.messages:
+        logging.error(f"Could not capture a handshake with {kem_alg}")
+        exit(1)
+
+    data = {
+        "client_bytes": capture.wire_bytes("client"),
+        "server_bytes": capture.wire_bytes("server"),
+        "client_key_share_bytes": capture.key_share_bytes("client"),
+        "server_key_share_bytes": capture.key_share_bytes("server"),
+        "hello_retry_requests": capture.hello_retry_requests()
+    }
+    for sender in ("client", "server"):
+        for name, length in capture.message_bytes(sender).items():
+            data[f"{sender}_{name}_bytes"] = length
+    return data
+
+def get_network_measurement_data(profile: NetworkProfile, openssl: OpenSslSetup, port: int = DEFAULT_PORT, cpu_cores: list[int] | None = None, test_time: int = DEFAULT_NETWORK_TEST_TIME) -> dict:
+    """Run s_time through a relay emulating the network profile and return the handshake times the relay observed."""
+    logging.info(f"Running handshakes over the emulated {profile.name} network for {test_time}s")
+    with NetworkEmulator(profile, "localhost", port) as emulator:
+        get_measurement_output(openssl, emulator.port, cpu_cores, test_time, host=emulator.host)
+        handshake_times = emulator.handshake_times_ms
+        failed_connections = emulator.failed_connections
+
+    return {
+        "profile": profile.name,
+        "rtt_ms": profile.rtt_ms,
+        "bandwidth_mbit": profile.bandwidth_mbit or "",
+        "mss": profile.mss,
+        "initial_window": profile.initial_window,
+        "handshakes": len(handshake_times),
+        "errors": failed_connections,
+        "handshake_p50_ms": f"{percentile(handshake_times, 50):.3f}",
+        "handshake_p90_ms": f"{percentile(handshake_times, 90):.3f}",
+        "handshake_p99_ms": f"{percentile(handshake_times, 99):.3f}"
+    }
+
+def stream_measurement_windows(openssl: OpenSslSetup, port: int, cpu_cores: list[int] | None, interval: int, total_time: float, **s_time_options) -> Generator[Tuple[float, float, str]]:
+    """Run s_time in consecutive windows of `interval` seconds, yielding (start, duration, output) per window.
+
+    s_time_options are passed on to get_measurement_output, e.g. session_mode or client_cert.
+    """
+    logging.info(f"Running performance test in {interval}s intervals for {total_time}s")
+    measurement_start = perf_counter()
+    # s_time overshoots short windows, so the run is bounded by wall clock time instead of a window count
+    while perf_counter() - measurement_start < total_time:
+        window_start = perf_counter()
+        output = get_measurement_output(openssl, port, cpu_cores, interval, **s_time_options)
+        yield window_start - measurement_start, perf_counter() - window_start, output
+
+def measure_s_time_adaptive(openssl: OpenSslSetup, port: int, cpu_cores: list[int] | None, convergence: ConvergenceCriteria, interval: int = ADAPTIVE_WINDOW, **s_time_options) -> tuple[AdaptiveResult, list[IntervalSample]]:
+    """Run s_time windows until connections/s converged, returns the result with the windows measured."""
+    samples = []
+    def record(windows: Iterable[IntervalSample]) -> Generator[Tuple[float, Tuple[float]]]:
+        for sample in windows:
+            samples.append(sample)
+            yield sample.duration, (sample.connections_per_second,)
+
+    windows = parse_windows(stream_measurement_windows(openssl, port, cpu_cores, interval, convergence.max_time, **s_time_options))
+    return collect_until_converged(record(windows), convergence), samples
+
+def adaptive_columns(result: AdaptiveResult, suffix: str = "") -> dict:
+    """The columns of an adaptively measured connections/s, suffix tells the measurement modes of a row apart."""
+    return {
+        f"test_time{suffix}": f"{result.duration:.1f}",
+        f"connections/s{suffix}": f"{result.means[0]:.2f}",
+        f"connections/s{suffix}_ci95": f"{result.half_widths[0]:.2f}",
+        f"converged{suffix}": int(result.converged)
+    }
+
+def get_algorithm_performance(algs: list[str], openssl: OpenSslSetup, test_time: int = TEST_TIME, multi: int | None = None) -> str:
+    logging.info(f"Running algorithm performance test for {", ".join(algs)}" + (f" on {multi} processes" if multi else ""))
+    # All algorithms are benchmarked in one run
+    args = ["speed", "-seconds", test_time] + (["-multi", multi] if multi else []) + algs
+    try:
+        return openssl_runner(openssl).run(args).stdout
+    except OpenSslError as e:
+        # e.g. an algorithm the build doesn't know, the algorithms missing from the output are reported
+        logging.error(str(e))
+        return e.stdout
+
+def get_algorithms_performance(algs: list[str], openssl: OpenSslSetup, test_time: int = TEST_TIME, multi: int | None = None) -> dict[str, list[float]]:
+    """Benchmark all algs in a single `openssl speed` run, returns keygen/encaps/decaps or keygen/sign/verify per second per algorithm."""
+    measurement_output = get_algorithm_performance(algs, openssl, test_time, multi)
+    results = parse_speed_output(measurement_output)
+
+    performance = {}
+    for alg in algs:
+        result = results.get(normalize_algorithm_name(alg))
+        if result is None:
+            logging.error(f"Could not find {alg} in the algorithm performance output. Full output:\n{measurement_output}")
+            continue
+        performance[alg] = list(result.operations_per_second)
+    return performance
+
+def stream_algorithm_windows(algs: list[str], openssl: OpenSslSetup, window: int, multi: int | None) -> Generator[Tuple[float, list[float]]]:
+    """Endlessly run `openssl speed` windows of `window` seconds, yielding (duration, rates of all algs) per window.
+
+    Ends early if a window is missing one of the algs, the measurement then counts as not converged.
+    """
+    while True:
+        window_start = perf_counter()
+        performance = get_algorithms_performance(algs, openssl, window, multi)
+        if len(performance) != len(algs):
+            logging.error(f"Algorithm performance window is missing {', '.join(sorted(set(algs) - set(performance)))}, stopping the measurement")
+            return
+        yield perf_counter() - window_start, [rate for alg in algs for rate in performance[alg]]
+
+def measure_algorithms(algs: list[str], openssl: OpenSslSetup, alg_column: str, metrics: list[str], convergence: ConvergenceCriteria | None, multi: int | None = None) -> dict[str, dict]:
+    """Return the result row of every algorithm benchmarked, adaptive runs also report confidence intervals."""
+    extra_columns = {} if multi is None else {"multi": multi}
+
+    if convergence is None:
+        performance = get_algorithms_performance(algs, openssl, TEST_TIME, multi)
+        return {
+            alg: {"test_time": TEST_TIME, alg_column: alg, **dict(zip(metrics, rates)), **extra_columns}
+            for alg, rates in performance.items()
         }
-    )
-    logging.info(f"Running algorithm performance test for {alg}")
-    logging.debug(f"Algorithm Test command: {command_test}")
-    measurement_stream = os.popen(command_test)
-    return measurement_stream.read()
 
-def get_kem_algorithm_performance(alg: str, use_openssl_35: bool) -> list[str, 3]:
-    measurement_output = get_algorithm_performance(alg, use_openssl_35)
+    # Algorithms `openssl speed` doesn't report in the first window are recorded as not converged instead of measured
+    window_start = perf_counter()
+    first_window = get_algorithms_performance(algs, openssl, ADAPTIVE_WINDOW, multi)
+    first_duration = perf_counter() - window_start
+    rows = {
+        alg: {"test_time": f"{first_duration:.1f}", alg_column: alg, "converged": 0, **extra_columns}
+        for alg in algs if alg not in first_window
+    }
+    algs = [alg for alg in algs if alg in first_window]
+    if not algs:
+        return rows
+
+    def windows() -> Generator[Tuple[float, list[float]]]:
+        yield first_duration, [rate for alg in algs for rate in first_window[alg]]
+        yield from stream_algorithm_windows(algs, openssl, ADAPTIVE_WINDOW, multi)
+
+    result = collect_until_converged(windows(), convergence)
+    for i, alg in enumerate(algs):
+        means = result.means[i * len(metrics):(i + 1) * len(metrics)]
+        half_widths = result.half_widths[i * len(metrics):(i + 1) * len(metrics)]
+        rows[alg] = {
+            "test_time": f"{result.duration:.1f}",
+            alg_column: alg,
+            **{metric: f"{mean:.1f}" for metric, mean in zip(metrics, means)},
+            **{f"{metric}_ci95": f"{half_width:.1f}" for metric, half_width in zip(metrics, half_widths)},
+            "converged": int(result.converged),
+            **extra_columns
+        }
+    return rows
+
 
-    output = list(filter(lambda x: x != "", re.search(MEASUREMENT_FILTERING_REGEX_KEM, measurement_output).group().split(" ")))
+@dataclass
+class TlsTestOptions:
+    # Concurrency levels for the handshake load generator, None disables the load sweep
+    load_concurrency_levels: list[int] | None = None
+    load_test_time: int = DEFAULT_LOAD_TEST_TIME
+    # Length of the s_time windows in seconds, None measures the whole TEST_TIME at once
+    interval: int | None = None
+    # Stop measuring once the mean converged, None always measures for TEST_TIME
+    convergence: ConvergenceCriteria | None = None
+    # Additionally measure resumed handshakes (s_time -reuse) and resumed handshakes with 0-RTT data
+    resumption: bool = False
+    early_data: bool = False
+    # Payload sizes in bytes fetched over every connection, None disables the bulk transfer benchmark
+    bulk_payload_sizes: list[int] | None = None
+    bulk_ktls: bool = False
+    # Network conditions to measure the handshake latency under, None disables the network emulation
+    network_profiles: list[NetworkProfile] | None = None
+    network_test_time: int = DEFAULT_NETWORK_TEST_TIME
+    handshake_bytes: bool = False
+    server_usage: bool = False
+    # Certificate chain shapes to sweep, e.g. "rsa:3072>*>*", None only measures the default two level chain
+    chain_shapes: list[str] | None = None
+    # Additionally measure full handshakes in which the client presents a certificate
+    mtls: bool = False
+    # Record where the wall clock time of every measurement goes, see harness_profile.py
+    profile_harness: bool = False
 
-    if (len(output) != 3):
-        logging.error(f"Could not parse algorithm performance output for {alg}. Full output:\n{measurement_output}")
+def measure_handshakes(row: dict, options: TlsTestOptions, openssl: OpenSslSetup, port: int, client_cores: list[int] | None) -> tuple[list[IntervalSample], list[IntervalSample], int]:
+    """Run the main handshake measurement into row, returns (interval samples, warm-up samples, handshakes)."""
+    samples = []
+    warmup = []
+    if options.convergence:
+        result, samples = measure_s_time_adaptive(openssl, port, client_cores, options.convergence, options.interval or ADAPTIVE_WINDOW)
+        row.update(adaptive_columns(result))
+    elif options.interval:
+        samples = list(parse_windows(stream_measurement_windows(openssl, port, client_cores, options.interval, TEST_TIME)))
+        warmup, steady_state = trim_warmup(samples)
+        row["connections/s"] = f"{sum(sample.connections_per_second for sample in steady_state) / len(steady_state):.2f}"
+        row["warmup_intervals"] = len(warmup)
+    else:
+        row["connections/s"], handshakes = get_measurement_data(openssl, port, client_cores)
+        return samples, warmup, handshakes
+
+    return samples, warmup, sum(sample.connections for sample in samples)
+
+def sweep_load(openssl: OpenSslSetup, port: int, concurrency_levels: list[int], test_time: float, cpu_cores: list[int] | None) -> list[LoadResult]:
+    """Sweep the handshake load against the server, the client processes load the libssl and providers of the setup."""
+    try:
+        return sweep_concurrency(openssl_runner(openssl), "localhost", port, concurrency_levels, test_time, cpu_cores)
+    except OpenSslError as e:
+        logging.error(str(e))
         exit(1)
 
-    return output
+def run_tls_combination(key: ResultKey, openssl: OpenSslSetup, cert_cache: CertificateCache, options: TlsTestOptions, store: ResultStore, servers: ServerPool, port: int = DEFAULT_PORT, server_cores: list[int] | None = None, client_cores: list[int] | None = None):
+    level, kem_alg = key.nist_level, key.kem
+    chain = chain_algorithms(key.sig)
+    # The SIG column is the algorithm of the server certificate, the chain gets its own columns
+    sig_alg = chain[-1]
+    logging.info(f"Testing (KEM | SIG): ({kem_alg} | {key.sig}) of {key.provider}, repetition {key.repetition}")
+
+    rows = {}
+    server_process = servers.get((key.provider, "www"), lambda: start_server(kem_alg, key.sig, openssl, cert_cache, port, server_cores))
+    row = {"nist_level": level, "test_time": TEST_TIME, "KEM": kem_alg, "SIG": sig_alg, "connections/s": None}
+    if options.interval:
+        row["interval"] = options.interval
+    if options.chain_shapes:
+        _, cert_path = cert_cache.get(key.sig, lambda cache_entry: create_certificate(chain, cache_entry, openssl))
+        row["chain"] = CHAIN_SEPARATOR.join(chain)
+        row["chain_depth"] = len(chain)
+        # Bytes of the certificates the server sends, the root CA isn't sent
+        row["chain_bytes"] = sum(der_certificate_sizes(cert_path)) + sum(der_certificate_sizes(cert_path.with_name(CACHE_CHAIN_FILE)))
+    # mTLS compares the CPU time of both sides with and without client certificates, so it needs the server's as well
+    monitor = ProcessGroupMonitor(server_process.pid) if options.server_usage or options.mtls else nullcontext()
+    with monitor:
+        samples, warmup, handshakes = measure_handshakes(row, options, openssl, port, client_cores)
+    logging.info(f"  Result ({kem_alg} | {sig_alg}): {row['connections/s']} connections/s")
+
+    if options.server_usage:
+        row.update(monitor.usage.per_handshake(handshakes))
+        logging.info(f"  Result ({kem_alg} | {sig_alg}): {row['server_cpu_us/handshake']} server CPU µs/handshake, {row['server_peak_rss_kb']} kB peak server RSS")
+
+    client_cert = None
+    if options.mtls:
+        row["server_cpu_us/handshake"] = monitor.usage.per_handshake(handshakes)["server_cpu_us/handshake"]
+        row["client_cpu_us/handshake"] = client_cpu_per_handshake(float(row["connections/s"]))
+
+        mtls_port = port + 3 * SERVER_MODE_PORT_OFFSET
+        mtls_server = servers.get((key.provider, "mtls"), lambda: start_server(kem_alg, key.sig, openssl, cert_cache, mtls_port, server_cores, client_auth=True))
+        _, cert_path = cert_cache.get(key.sig, lambda cache_entry: create_certificate(chain, cache_entry, openssl, True), True)
+        client_cert = client_credentials(cert_path)
+        row.update(get_mtls_measurement_data(mtls_server.pid, client_cert, openssl, mtls_port, client_cores, options.convergence))
+        logging.info(f"  Result ({kem_alg} | {sig_alg}): {row['connections/s_mtls']} connections/s with client certificates, {row['client_cpu_us/handshake_mtls']} client and {row['server_cpu_us/handshake_mtls']} server CPU µs/handshake")
+
+    if options.interval:
+        rows["tls_timeseries"] = [
+            {
+                "nist_level": level, "KEM": kem_alg, "SIG": sig_alg,
+                "interval_index": sample.index,
+                "start_s": f"{sample.start:.3f}",
+                "duration_s": f"{sample.duration:.3f}",
+                "connections": sample.connections,
+                "connections/s": sample.connections_per_second,
+                "warmup": int(sample in warmup)
+            }
+            for sample in samples
+        ]
+
+    if server_cores or client_cores:
+        # Semicolon separated so the core lists don't need quoting in the csv files
+        row["server_cores"] = format_cores(server_cores or []).replace(",", ";")
+        row["client_cores"] = format_cores(client_cores or []).replace(",", ";")
+
+    if options.resumption:
+        row.update(get_resumed_measurement_data(openssl, port, client_cores, options.convergence))
+        logging.info(f"  Result ({kem_alg} | {sig_alg}): {row['connections/s_resumed']} resumed connections/s")
+
+    if options.load_concurrency_levels:
+        if options.server_usage:
+            # One sweep per concurrency level, so the memory per open connection can be told apart
+            load_results, load_usages = [], []
+            for concurrency in options.load_concurrency_levels:
+                with ProcessGroupMonitor(server_process.pid) as load_monitor, phase("measurement"):
+                    load_results += sweep_load(openssl, port, [concurrency], options.load_test_time, client_cores)
+                load_usages.append(load_monitor.usage.per_handshake(load_results[-1].handshakes))
+        else:
+            with phase("measurement"):
+                load_results = sweep_load(openssl, port, options.load_concurrency_levels, options.load_test_time, client_cores)
+            load_usages = [{} for _ in load_results]
+        load_client_auth = [{"client_auth": 0} if options.mtls else {} for _ in load_results]
+
+        mtls_results = []
+        if options.mtls:
+            try:
+                logging.info("Sweeping the handshake load with client certificates")
+                with phase("measurement"):
+                    mtls_results = sweep_concurrency(openssl_runner(openssl), "localhost", mtls_port, options.load_concurrency_levels, options.load_test_time, client_cores, client_cert)
+            except OpenSslError as e:
+                # Python's ssl module may not be able to load the client certificate, e.g. a signature algorithm only a provider implements
+                logging.warning(f"Skipping the load sweep with client certificates: {e}")
+        load_results += mtls_results
+        load_usages += [{} for _ in mtls_results]
+        load_client_auth += [{"client_auth": 1} for _ in mtls_results]
+
+        rows["tls_load"] = [
+            {
+                "nist_level": level, "test_time": options.load_test_time, "KEM": kem_alg, "SIG": sig_alg,
+                **client_auth,
+                "concurrency": result.concurrency,
+                "handshakes": result.handshakes,
+                "errors": result.errors,
+                "connections/s": f"{result.connections_per_second:.2f}",
+                "p50_ms": f"{result.percentile(50):.3f}",
+                "p90_ms": f"{result.percentile(90):.3f}",
+                "p99_ms": f"{result.percentile(99):.3f}",
+                **usage
+            }
+            for result, usage, client_auth in zip(load_results, load_usages, load_client_auth)
+        ]
+
+    if options.handshake_bytes:
+        bytes_row = {"nist_level": level, "KEM": kem_alg, "SIG": sig_alg, **get_handshake_bytes_data(kem_alg, openssl, port)}
+        rows["tls_bytes"] = [bytes_row]
+        logging.info(f"  Result ({kem_alg} | {sig_alg}): {bytes_row['client_bytes']} bytes from the client, {bytes_row['server_bytes']} bytes from the server per handshake")
+
+    if options.network_profiles:
+        rows["tls_network"] = [
+            {"nist_level": level, "test_time": options.network_test_time, "KEM": kem_alg, "SIG": sig_alg, **get_network_measurement_data(profile, openssl, port, client_cores, options.network_test_time)}
+            for profile in options.network_profiles
+        ]
+        for network_row in rows["tls_network"]:
+            logging.info(f"  Result ({kem_alg} | {sig_alg}): {network_row['handshake_p50_ms']} ms median handshake time on {network_row['profile']}")
+
+    if options.early_data:
+        early_data_port = port + SERVER_MODE_PORT_OFFSET
+        servers.get((key.provider, "early_data"), lambda: start_server(kem_alg, key.sig, openssl, cert_cache, early_data_port, server_cores, early_data=True))
+        row.update(get_early_data_measurement_data(kem_alg, openssl, early_data_port, client_cores, options.convergence))
+        logging.info(f"  Result ({kem_alg} | {sig_alg}): {row['connections/s_early_data']} connections/s with early data")
+
+    if options.bulk_payload_sizes:
+        bulk_port = port + 2 * SERVER_MODE_PORT_OFFSET
+        servers.get((key.provider, "bulk"), lambda: start_server(kem_alg, key.sig, openssl, cert_cache, bulk_port, server_cores, document_root=PAYLOAD_DIR, ktls=options.bulk_ktls))
+        rows["tls_bulk"] = []
+        for payload_size in options.bulk_payload_sizes:
+            bulk_row = {"nist_level": level, "test_time": TEST_TIME, "KEM": kem_alg, "SIG": sig_alg, **get_bulk_transfer_measurement_data(payload_size, openssl, bulk_port, client_cores)}
+            logging.info(f"  Result ({kem_alg} | {sig_alg}): {bulk_row['connections/s']} connections/s, {bulk_row['bytes/s']} bytes/s with {payload_size} byte payloads")
+            rows["tls_bulk"].append(bulk_row)
+
+    if options.chain_shapes:
+        # Tells apart the rows of the other kinds measured with different chains of the same SIG
+        for kind_rows in rows.values():
+            for kind_row in kind_rows:
+                kind_row["chain"] = row["chain"]
+
+    # The tls row goes last, it marks the combination as complete
+    rows["tls"] = [row]
+    store.save(key, rows)
+
+@dataclass
+class ProviderRun:
+    """A provider measured in the campaign and the base key its rows are stored under."""
+    openssl: OpenSslSetup
+    cert_cache: CertificateCache
+    base_key: ResultKey
+    # Added to the ports of the provider's servers, so the servers of all providers can run side by side
+    port_offset: int = 0
+
+def pending_tls_combinations(store: ResultStore, runs: list[ProviderRun], experiment: Experiment, repetitions: int, rng: random.Random, chain_shapes: list[str]) -> list[list[tuple[ProviderRun, ResultKey]]]:
+    """The measurements still to take, grouped by combination and certificate chain shape.
+
+    Every group needs its own servers, s_server only serves one certificate and s_time can't pick
+    the group, so running all measurements of a group back to back starts each server only once.
+    Within a repetition of a combination the providers are measured back to back in random order,
+    so drift of the machine over the campaign can't masquerade as a difference between providers.
+    """
+    pending = []
+    for combination, shape in product(experiment.tls_combinations, chain_shapes):
+        measurements = []
+        for repetition in range(1, repetitions + 1):
+            for run in rng.sample(runs, len(runs)):
+                provider = run.base_key.provider
+                kem_alg = experiment.alias(provider, "tls", combination.kem)
+                sig = chain_key(shape, experiment.alias(provider, "tls", combination.sig))
+                key = replace(run.base_key, nist_level=combination.nist_level, kem=kem_alg, sig=sig, repetition=repetition)
+                if store.is_complete("tls", key):
+                    logging.info(f"Skipping (KEM | SIG): ({kem_alg} | {sig}) of {key.provider}, repetition {repetition} is already complete")
+                    continue
+                measurements.append((run, key))
+        if measurements:
+            pending.append(measurements)
+    return pending
+
+def server_modes(options: TlsTestOptions) -> list[str]:
+    """The servers every combination starts, see run_tls_combination."""
+    return ["www"] + [mode for mode, enabled in [("early_data", options.early_data), ("bulk", options.bulk_payload_sizes), ("mtls", options.mtls)] if enabled]
+
+def generate_certificates(pending: list[list[tuple[ProviderRun, ResultKey]]], options: TlsTestOptions) -> dict[tuple, HarnessProfile]:
+    """Generate every distinct certificate chain of the pending measurements once, before any server starts.
+
+    The KEMs of a SIG share its chain, so the slow key generation (e.g. rsa:15360) isn't repeated
+    and doesn't end up in the middle of the matrix, where it would delay the measurements after it.
+    With options.profile_harness the profile of every chain is returned, keyed by (cert cache, OpenSSL setup, SIG).
+    """
+    chains = dict.fromkeys((run.cert_cache, run.openssl, key.sig) for measurements in pending for run, key in measurements)
+    logging.info(f"Preparing {len(chains)} certificate chains")
+    profiles = {}
+    for entry in chains:
+        cert_cache, openssl, sig = entry
+        with profiling(HarnessProfile() if options.profile_harness else None) as profile, phase("certificate"):
+            for client_auth in [False, True] if options.mtls else [False]:
+                cert_cache.get(sig, lambda cache_entry: create_certificate(chain_algorithms(sig), cache_entry, openssl, client_auth), client_auth)
+        if profile is not None:
+            profiles[entry] = profile
+    return profiles
 
-def get_sig_algorithm_performance(alg: str, use_openssl_35: bool) -> list[str, 3]:
-    measurement_output = get_algorithm_performance(alg, use_openssl_35)
+def log_tls_plan(pending: list[list[tuple[ProviderRun, ResultKey]]], options: TlsTestOptions):
+    measurements = sum(len(group) for group in pending)
+    # Every provider of a group has its own servers
+    server_starts = sum(len({run.base_key.provider for run, _ in group}) for group in pending) * len(server_modes(options))
+    logging.info(f"TLS plan: {measurements} measurements of {len(pending)} combinations, {server_starts} server starts")
+    for group in pending:
+        _, first = group[0]
+        providers = ", ".join(dict.fromkeys(key.provider for _, key in group))
+        logging.info(f"  Level {first.nist_level} (KEM | SIG): ({first.kem} | {first.sig}) of {providers}, {len(group)} measurements")
 
-    output = list(filter(lambda x: x != "", re.search(MEASUREMENT_FILTERING_REGEX_KEM, measurement_output).group().split(" ")))
+def run_tls_combination_repetitions(measurements: list[tuple[ProviderRun, ResultKey]], options: TlsTestOptions, store: ResultStore, certificate_profiles: dict[tuple, HarnessProfile], port: int = DEFAULT_PORT, server_cores: list[int] | None = None, client_cores: list[int] | None = None):
+    """Take all measurements of a combination, its servers keep running from the first until the last repetition."""
+    with ServerPool() as servers:
+        for i, (run, key) in enumerate(measurements):
+            with profiling(HarnessProfile() if options.profile_harness else None) as profile:
+                run_tls_combination(key, run.openssl, run.cert_cache, options, store, servers, port + run.port_offset, server_cores, client_cores)
+                if i == len(measurements) - 1:
+                    # The servers are stopped after the last measurement, which is charged with their teardown
+                    servers.close()
+            if profile is not None:
+                # The first measurement using a chain is charged with creating it
+                certificate_profile = certificate_profiles.pop((run.cert_cache, run.openssl, key.sig), None)
+                if certificate_profile is not None:
+                    profile.charge(certificate_profile)
+                save_harness_profile(key, profile, options, store)
 
-    if (len(output) != 3):
-        logging.error(f"Could not parse algorithm performance output for {alg}. Full output:\n{measurement_output}")
+def save_harness_profile(key: ResultKey, profile: HarnessProfile, options: TlsTestOptions, store: ResultStore):
+    logging.info(f"  Harness ({key.kem} | {key.sig}): {profile.seconds['measurement']:.2f}s measured in {profile.total:.2f}s, {profile.overhead:.2f}s overhead in {profile.spawns} processes")
+    chain = chain_algorithms(key.sig)
+    row = {"nist_level": key.nist_level, "KEM": key.kem, "SIG": chain[-1], **profile.row()}
+    if options.chain_shapes:
+        # Tells apart the rows of the chain shapes of the same SIG, like in the other kinds
+        row["chain"] = CHAIN_SEPARATOR.join(chain)
+    store.save(key, {"tls_harness": [row]})
+
+def run_tls_matrix_sequential(pending: list[list[tuple[ProviderRun, ResultKey]]], options: TlsTestOptions, store: ResultStore, certificate_profiles: dict[tuple, HarnessProfile]):
+    for measurements in pending:
+        run_tls_combination_repetitions(measurements, options, store, certificate_profiles)
+
+def run_tls_matrix_parallel(pending: list[list[tuple[ProviderRun, ResultKey]]], options: TlsTestOptions, store: ResultStore, certificate_profiles: dict[tuple, HarnessProfile], cores_per_pair: int, base_port: int):
+    core_sets = allocate_core_sets(cores_per_pair)
+    if not core_sets:
+        logging.error(f"Not enough cores available for a single pair of {cores_per_pair} cores")
         exit(1)
+    logging.info(f"Running up to {len(core_sets)} server/client pairs in parallel with {cores_per_pair} cores each")
+
+    free_core_sets = Queue()
+    for core_set in core_sets:
+        free_core_sets.put(core_set)
+
+    def run_pinned(measurements: list[tuple[ProviderRun, ResultKey]], port: int):
+        server_cores, client_cores = free_core_sets.get()
+        try:
+            run_tls_combination_repetitions(measurements, options, store, certificate_profiles, port, server_cores, client_cores)
+        finally:
+            free_core_sets.put((server_cores, client_cores))
+
+    with ThreadPoolExecutor(max_workers=len(core_sets)) as executor:
+        # Every combination gets its own port so that overlapping server restarts can't collide
+        futures = [
+            executor.submit(run_pinned, measurements, base_port + i)
+            for i, measurements in enumerate(pending)
+        ]
+        for future in futures:
+            future.result()
+
+def get_evp_benchmark_output(algs: list[str], kind: str, openssl: OpenSslSetup, test_time: int = TEST_TIME) -> dict[str, dict]:
+    """Run the EVP microbenchmark (src/evp_bench.py) on algs of kind "kem" or "sig", returns its results per algorithm."""
+    logging.info(f"Running EVP benchmark for {", ".join(algs)}")
+    result = openssl_runner(openssl).run_script(
+        EVP_BENCH_SCRIPT,
+        {"KIND": kind, "ALG": " ".join(algs), "TEST_TIME": test_time, "PYTHON": sys.executable},
+        check=False
+    )
+    if result.returncode != 0:
+        logging.error(f"EVP benchmark failed: {result.stderr}")
+        return {}
+    return json.loads(result.stdout)["algorithms"]
+
+def measure_algorithms_evp(algs: list[str], kind: str, openssl: OpenSslSetup, alg_column: str, metrics: list[str]) -> dict[str, dict[str, list[dict]]]:
+    """Return the result rows of every algorithm benchmarked with the EVP benchmark, by result kind.
+
+    The rates come from the batched operations, the percentiles and the latency histograms from the individually timed ones.
+    """
+    rows = {}
+    for alg, result in get_evp_benchmark_output(algs, kind, openssl).items():
+        if "error" in result:
+            logging.error(f"EVP benchmark of {alg} failed: {result['error']}")
+            continue
+
+        row = {"test_time": TEST_TIME, alg_column: alg, "engine": "evp"}
+        latency_rows = []
+        for metric, (operation, operation_result) in zip(metrics, result.items()):
+            row[metric] = f"{operation_result['operations_per_second']:.1f}"
+            row[f"{operation}_mean_us"] = f"{operation_result['mean_us']:.2f}"
+            for name, value in operation_result["percentiles_us"].items():
+                row[f"{operation}_{name}_us"] = f"{value:.2f}"
+            row[f"{operation}_max_us"] = f"{operation_result['max_us']:.2f}"
+            latency_rows += [
+                {"algorithm": alg, "kind": kind, "operation": operation, "bucket_us": f"{bucket_us:.3f}", "count": count}
+                for bucket_us, count in operation_result["histogram"]
+            ]
+        rows[alg] = {"alg_latency": latency_rows, f"{kind}_alg": [row]}
+    return rows
+
+def run_algorithm_benchmarks(kind: str, algs: list[str], openssl: OpenSslSetup, alg_column: str, metrics: list[str], convergence: ConvergenceCriteria | None, multi_levels: list[int] | None, store: ResultStore, base_key: ResultKey, engine: str = "speed"):
+    keys = {alg: replace(base_key, kem=alg) if kind == "kem_alg" else replace(base_key, sig=alg) for alg in algs}
+    pending = []
+    for alg, key in keys.items():
+        if store.is_complete(kind, key):
+            logging.info(f"Skipping algorithm {alg}, repetition {key.repetition} is already complete")
+            continue
+        pending.append(alg)
+    if not pending:
+        return
+
+    if engine == "evp":
+        for alg, rows in measure_algorithms_evp(pending, kind.removesuffix("_alg"), openssl, alg_column, metrics).items():
+            logging.info(f"  Algorithm {alg} performance: {[rows[kind][0][metric] for metric in metrics]}")
+            # The histograms go first, the row of the kind marks the algorithm as complete
+            store.save(keys[alg], rows)
+        return
+
+    # Without a sweep a single speed run without -multi keeps the original measurement
+    rows = {alg: [] for alg in pending}
+    for multi in multi_levels or [None]:
+        for alg, row in measure_algorithms(pending, openssl, alg_column, metrics, convergence, multi).items():
+            logging.info(f"  Algorithm {alg} performance" + (f" on {multi} processes" if multi else "") + f": {[row.get(metric) for metric in metrics]}")
+            rows[alg].append(row)
+
+    for alg, alg_rows in rows.items():
+        if alg_rows:
+            store.save(keys[alg], {kind: alg_rows})
+
+def export_results(store: ResultStore, run_id: str, latest: bool = False):
+    """Export a run into the csv layouts under results/runs/<run_id>: all rows into the run directory, every provider
+    and repetition into its own <provider>_<n> directory. With latest all rows also go to the files in ./results."""
+    providers_and_repetitions = store.providers_and_repetitions(run_id)
+    # Rows of several providers or repetitions in one file are tagged with them
+    key_columns = len(providers_and_repetitions) > 1
+    for kind, result_file in RESULT_FILES.items():
+        for path in [RESULT_RUNS_DIR / run_id / result_file.name, *([result_file] if latest else [])]:
+            if store.export_csv(path, run_id, kind, key_columns=key_columns):
+                logging.info(f"Exported {kind} results of run {run_id} to {path}")
+
+        for provider, repetition in providers_and_repetitions:
+            store.export_csv(RESULT_RUNS_DIR / run_id / f"{provider}_{repetition}" / result_file.name, run_id, kind, provider, repetition)
+
+def detect_provider(build_info: str, openssl: OpenSslSetup) -> str:
+    if openssl.use_openssl_35:
+        return "ossl35"
+
+    # Provider ids are the lines indented by exactly two spaces in `openssl list -providers`
+    loaded_providers = re.findall(r"^  (\S+)$", build_info, re.MULTILINE)
+    for provider_id, provider in [("pqsprovider", "pqs"), ("oqsprovider", "oqs")]:
+        if provider_id in loaded_providers:
+            return provider
+    return "default"
 
-    return output
+def describe_openssl_build(build_info: str) -> str:
+    version = build_info.splitlines()[0] if build_info else "unknown"
+    return f"{version} ({hashlib.sha256(build_info.encode()).hexdigest()[:12]})"
+
+def parse_int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item]
+
+def parse_network_profiles(value: str) -> list[str]:
+    """Validate the profiles, they stay strings so they can be stored with the run settings."""
+    profiles = [item for item in value.split(",") if item]
+    try:
+        for profile in profiles:
+            parse_network_profile(profile)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return profiles
+
+def parse_providers(value: str) -> list[str]:
+    providers = [item for item in value.split(",") if item]
+    for provider in providers:
+        if provider not in PROVIDER_CONFIGS:
+            raise argparse.ArgumentTypeError(f"Unknown provider {provider}, expected one of {', '.join(PROVIDER_CONFIGS)}")
+    return list(dict.fromkeys(providers))
+
+def parse_chain_shapes(value: str) -> list[str]:
+    shapes = [item for item in value.split(",") if item]
+    for shape in shapes:
+        if len(shape.split(CHAIN_SEPARATOR)) < 2:
+            raise argparse.ArgumentTypeError(f"Chain shape {shape} needs at least a root CA and a server certificate")
+    return shapes
+
+def parse_size_list(value: str) -> list[int]:
+    """Parse comma separated sizes with an optional binary unit, e.g. "1K,64K,1M,256M"."""
+    sizes = []
+    for item in value.split(","):
+        match = re.fullmatch(r"(\d+)([KMG]?)(?:i?B)?", item.strip(), re.IGNORECASE)
+        if match is None:
+            raise argparse.ArgumentTypeError(f"Invalid size {item}")
+        sizes.append(int(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+    return sizes
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure TLS handshake and PQC algorithm performance")
+    parser.add_argument("openssl_build", nargs="?", choices=["ossl35"], help="Use the OpenSSL 3.5 side installation")
+    parser.add_argument("--experiment", type=Path, default=DEFAULT_EXPERIMENT_FILE, help=f"TOML file with the algorithms to measure (default: {DEFAULT_EXPERIMENT_FILE}), see experiments/")
+    parser.add_argument("--dry-run", action="store_true", help="Only log the planned TLS measurements and server starts")
+    parser.add_argument("--providers", type=parse_providers, metavar="PROVIDERS", help=f"Measure the comma separated providers ({', '.join(PROVIDER_CONFIGS)}) interleaved in random order in one campaign, each loaded through its config in configs/ instead of the system wide OpenSSL config")
+    parser.add_argument("--seed", type=int, help="Seed of the random order of the providers in a campaign")
+    parser.add_argument("--provider", help="Provider name the results are tagged with (default: detected from the loaded OpenSSL providers)")
+    parser.add_argument("--repetitions", type=int, default=1, help="Number of full repetitions of the campaign")
+    parser.add_argument("--run-id", help="Id of the campaign, an existing run is resumed and only its missing measurements are taken")
+    parser.add_argument("--resume", action="store_true", help="Resume the most recently started run")
+    parser.add_argument("--export-only", action="store_true", help="Only export the results of the run to csv, don't measure")
+    parser.add_argument("--export-latest", action="store_true", help="Also export the run into the results/results_*.csv files, replacing the results committed there")
+    parser.add_argument("--parallel", action="store_true", help="Run the TLS combinations in parallel on disjoint CPU cores")
+    parser.add_argument("--cores-per-pair", type=int, default=DEFAULT_CORES_PER_PAIR, help="Cores reserved for each server/client pair in parallel mode (split evenly between server and client)")
+    parser.add_argument("--base-port", type=int, default=DEFAULT_PORT, help="First port used for the servers in parallel mode")
+    parser.add_argument("--regen-certs", action="store_true", help="Regenerate every certificate chain used in this run instead of reusing the cache")
+    parser.add_argument("--load-sweep", nargs="?", const=DEFAULT_CONCURRENCY_LEVELS, type=parse_int_list, metavar="LEVELS", help=f"Additionally sweep concurrent TLS handshakes over the comma separated concurrency levels (default: {','.join(map(str, DEFAULT_CONCURRENCY_LEVELS))})")
+    parser.add_argument("--load-time", type=int, default=DEFAULT_LOAD_TEST_TIME, help="Seconds per concurrency level of the load sweep")
+    parser.add_argument("--interval", type=int, help="Measure in consecutive s_time windows of this many seconds, store the per-interval time series and trim the warm-up intervals")
+    parser.add_argument("--adaptive", action="store_true", help="Measure in short windows and stop each combination once the 95%% confidence interval of the mean is narrow enough")
+    parser.add_argument("--target-error", type=float, default=ConvergenceCriteria.target_relative_error, help="Target relative half-width of the confidence interval in adaptive mode")
+    parser.add_argument("--min-time", type=float, default=ConvergenceCriteria.min_time, help="Minimum seconds per measurement in adaptive mode")
+    parser.add_argument("--max-time", type=float, default=TEST_TIME, help="Maximum seconds per measurement in adaptive mode")
+    parser.add_argument("--resumption", action="store_true", help="Additionally measure resumed handshakes (s_time -reuse)")
+    parser.add_argument("--early-data", action="store_true", help="Additionally measure resumed handshakes sending 0-RTT early data")
+    parser.add_argument("--bulk", type=parse_size_list, metavar="SIZES", help="Additionally measure bulk transfers fetching payloads of the comma separated sizes (e.g. 1K,64K,1M,256M) over every connection")
+    parser.add_argument("--bulk-ktls", action="store_true", help="Serve the bulk transfer payloads with kTLS and sendfile")
+    parser.add_argument("--network", type=parse_network_profiles, metavar="PROFILES", help=f"Additionally measure the handshake time through an emulated network for every comma separated profile, either one of {', '.join(NETWORK_PROFILES)} or rtt_ms/bandwidth_mbit[/mss[/initial_window]]")
+    parser.add_argument("--network-time", type=int, default=DEFAULT_NETWORK_TEST_TIME, help="Seconds to measure per network profile")
+    parser.add_argument("--handshake-bytes", action="store_true", help="Additionally capture the bytes of every handshake message of a single handshake")
+    parser.add_argument("--server-usage", action="store_true", help="Additionally record the CPU time, context switches and memory of the server (and hardware cycles if perf is available)")
+    parser.add_argument("--mtls", action="store_true", help="Additionally measure handshakes with a client certificate of the SIG algorithm, and the client and server CPU time per handshake with and without it")
+    parser.add_argument("--profile-harness", action="store_true", help="Record the wall clock time every measurement spends measuring, spawning processes, creating certificates and starting and stopping servers")
+    parser.add_argument("--chain-shapes", type=parse_chain_shapes, metavar="SHAPES", help=f"Sweep the comma separated certificate chain shapes, the algorithms from the root CA down to the server certificate separated by '{CHAIN_SEPARATOR}' with '{CHAIN_SHAPE_PLACEHOLDER}' for the signature algorithm of the combination, e.g. '{DEFAULT_CHAIN_SHAPE},{CHAIN_SHAPE_PLACEHOLDER}>{DEFAULT_CHAIN_SHAPE},ecdsa:P-256>{DEFAULT_CHAIN_SHAPE}'")
+    parser.add_argument("--alg-engine", choices=ALG_ENGINES, default="speed", help="Benchmark the algorithms with `openssl speed`, or in-process through the EVP API with per-operation latency percentiles and histograms (TEST_TIME per operation)")
+    parser.add_argument("--speed-multi", type=parse_int_list, metavar="PROCESSES", help="Sweep the algorithm benchmarks over the comma separated numbers of parallel `openssl speed -multi` processes")
+    parser.add_argument("--clear-cert-cache", action="store_true", help=f"Remove all cached certificate chains from {CERT_CACHE_DIR} before running")
+    args = parser.parse_args()
+    if args.providers and (args.openssl_build or args.provider):
+        parser.error("--providers selects the OpenSSL build and names the providers itself")
+    if args.speed_multi and args.alg_engine == "evp":
+        parser.error("--speed-multi sweeps `openssl speed -multi`, the EVP benchmark runs in a single process")
+    if args.network and args.parallel:
+        # The relay is an asyncio thread of the harness, it would share the GIL and the cores with the parallel pairs
+        parser.error("--network runs the emulated network in the harness process, it can't be combined with --parallel")
+    if args.adaptive and args.interval is not None and args.interval < ADAPTIVE_WINDOW:
+        parser.error(f"--adaptive needs an --interval of at least {ADAPTIVE_WINDOW}s, shorter s_time windows count too few CPU clock ticks to converge")
+    return args
 
 
 if __name__ == "__main__":
+    args = parse_args()
+
+    store = ResultStore(RESULT_DATABASE)
+
+    run_id = args.run_id
+    if run_id is None and (args.resume or args.export_only):
+        run_id = store.latest_run_id()
+        if run_id is None:
+            logging.error(f"There is no run in {RESULT_DATABASE} to resume or export")
+            exit(1)
+    if run_id is None:
+        run_id = datetime.now().strftime("%Y%m%dT%H%M%S")
 
-    ossl35_running = True if len(sys.argv) > 1 and sys.argv[1] == "ossl35" else False
-    
-    RESULT_FILE_TLS.parent.mkdir(parents=True, exist_ok=True)
+    if args.export_only:
+        export_results(store, run_id, args.export_latest)
+        exit(0)
 
-    if RESULT_FILE_TLS.exists(follow_symlinks=True) or RESULT_FILE_KEM_ALG_PERF.exists(follow_symlinks=True) or RESULT_FILE_SIG_ALG_PERF.exists(follow_symlinks=True):
-        logging.error(f"TLS result file {RESULT_FILE_TLS} or ALG result file {RESULT_FILE_KEM_ALG_PERF} already exists. Please move or delete it before running the tests.")
+    try:
+        experiment = load_experiment(args.experiment)
+    except (OSError, ValueError) as e:
+        logging.error(f"Could not load the experiment {args.experiment}: {e}")
         exit(1)
+    logging.info(f"Experiment {args.experiment}: {len(experiment.tls_combinations)} TLS combinations on levels {experiment.nist_levels}")
 
-    with open(RESULT_FILE_TLS, "w") as result_file:
-        result_file.write("nist_level,test_time,KEM,SIG,connections/s\n")
+    if args.providers:
+        setups = {provider: provider_setup(provider) for provider in args.providers}
+    else:
+        # A single provider, loaded by the system wide OpenSSL config
+        setups = {args.provider: OpenSslSetup(args.openssl_build == "ossl35")}
 
-    with open(RESULT_FILE_KEM_ALG_PERF, "w") as result_file:
-        result_file.write("test_time,kem-algorithm,keygens/s,encaps/s,decaps/s\n")
+    runs = []
+    for index, (provider, openssl) in enumerate(setups.items()):
+        build_info = get_openssl_build_info(openssl)
+        provider = provider or detect_provider(build_info, openssl)
+        openssl_build = describe_openssl_build(build_info)
+        logging.info(f"Provider {provider} runs with {openssl_build}")
 
-    with open(RESULT_FILE_SIG_ALG_PERF, "w") as result_file:
-        result_file.write("test_time,sig-algorithm,keygens/s,signs/s,verify/s\n")
+        cert_cache = create_certificate_cache(build_info, args.regen_certs)
+        if args.clear_cert_cache:
+            cert_cache.invalidate()
+        runs.append(ProviderRun(openssl, cert_cache, ResultKey(run_id, provider, openssl_build, 0, "", "", 1), index * PROVIDER_PORT_OFFSET))
 
-    for level in NIST_LEVELS:
-        for kem_alg in KEM_ALGS[level]:
-            for sig_alg in SIG_ALGS[level]:
-                logging.info(f"Testing (KEM | SIG): ({kem_alg} | {sig_alg})")
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    if len(runs) > 1:
+        logging.info(f"Interleaving the providers in random order with seed {seed}")
+    rng = random.Random(seed)
 
-                with start_server(kem_alg, sig_alg, ossl35_running) as server_process:
-                    data = get_measurement_data(ossl35_running)
-                    logging.info(f"  Result: {data} connections/s")
+    convergence = None
+    if args.adaptive:
+        convergence = ConvergenceCriteria(args.target_error, args.min_time, args.max_time)
 
-                    with open(RESULT_FILE_TLS, "a") as result_file:
-                        result_file.write(f"{level},{TEST_TIME},{kem_alg},{sig_alg},{data}\n")
-    
-    logging.info(f"All tls-connections/s tests completed. Results saved to {RESULT_FILE_TLS}")
+    options = TlsTestOptions(
+        load_concurrency_levels=args.load_sweep,
+        load_test_time=args.load_time,
+        interval=args.interval,
+        convergence=convergence,
+        resumption=args.resumption,
+        early_data=args.early_data,
+        bulk_payload_sizes=args.bulk,
+        bulk_ktls=args.bulk_ktls,
+        network_profiles=[parse_network_profile(profile) for profile in args.network] if args.network else None,
+        network_test_time=args.network_time,
+        handshake_bytes=args.handshake_bytes,
+        server_usage=args.server_usage,
+        chain_shapes=args.chain_shapes,
+        mtls=args.mtls,
+        profile_harness=args.profile_harness
+    )
 
-    logging.info(f"Getting kem algorithm performance")
-    algs = KEM_ALGS_OSS35_PERFORMANCE if ossl35_running else KEM_ALGS_PERFORMANCE
-    for alg in algs:
-        data = get_kem_algorithm_performance(alg, ossl35_running)
-        logging.info(f"  Algorithm {alg} performance: {data}")
-
-        with open(RESULT_FILE_KEM_ALG_PERF, "a") as result_file:
-            result_file.write(f"{TEST_TIME},{alg},{data[0]},{data[1]},{data[2]}\n")
-    logging.info(f"All kem algorithm performance tests completed. Results saved to {RESULT_FILE_KEM_ALG_PERF}")
-
-    # Due to openssl error mldsa can not be tested for openssl3.5 right now
-    # https://github.com/openssl/openssl/issues/27373
-    if not ossl35_running:
-        logging.info(f"Getting sig algorithm performance")
-        for alg in SIG_ALGS_PERFORMANCE:
-            data = get_sig_algorithm_performance(alg, ossl35_running)
-            logging.info(f"  Algorithm {alg} performance: {data}")
-
-            with open(RESULT_FILE_SIG_ALG_PERF, "a") as result_file:
-                result_file.write(f"{TEST_TIME},{alg},{data[0]},{data[1]},{data[2]}\n")
-        logging.info(f"All sig algorithm performance tests completed. Results saved to {RESULT_FILE_SIG_ALG_PERF}")    
+    pending = pending_tls_combinations(store, runs, experiment, args.repetitions, rng, options.chain_shapes or [DEFAULT_CHAIN_SHAPE])
+    log_tls_plan(pending, options)
+    if args.dry_run:
+        exit(0)
+
+    # Settings that influence the measurements, a resumed run is compared against them
+    settings = {name: value for name, value in vars(args).items() if name not in NON_MEASUREMENT_ARGS}
+    # What is measured is the content of the experiment file, not its path
+    settings["experiment"] = experiment.definition
+    providers = ", ".join(run.base_key.provider for run in runs)
+    if store.start_run(run_id, settings):
+        logging.info(f"Starting run {run_id} for {providers}")
+    else:
+        logging.info(f"Resuming run {run_id} for {providers}")
+
+    if args.bulk:
+        create_payload_files(args.bulk)
+    certificate_profiles = generate_certificates(pending, options)
+
+    # All repetitions of a combination run back to back, so its servers are only started once
+    if args.parallel:
+        run_tls_matrix_parallel(pending, options, store, certificate_profiles, args.cores_per_pair, args.base_port)
     else:
-        logging.warning("Skipping sig algorithm performance tests for openssl 3.5 due to https://github.com/openssl/openssl/issues/27373")
+        run_tls_matrix_sequential(pending, options, store, certificate_profiles)
+    logging.info(f"All tls-connections/s tests completed")
+
+    for repetition in range(1, args.repetitions + 1):
+        logging.info(f"Starting algorithm benchmarks of repetition {repetition} of {args.repetitions}")
+        for run in rng.sample(runs, len(runs)):
+            base_key = replace(run.base_key, repetition=repetition)
+            ossl35_running = run.openssl.use_openssl_35
+
+            logging.info(f"Getting kem algorithm performance of {base_key.provider}")
+            algs = experiment.performance_algorithms("kem", base_key.provider)
+            run_algorithm_benchmarks("kem_alg", algs, run.openssl, "kem-algorithm", KEM_ALG_METRICS, convergence, args.speed_multi, store, base_key, args.alg_engine)
+            logging.info(f"All kem algorithm performance tests of {base_key.provider}, repetition {repetition} completed")
+
+            # Due to openssl error mldsa can not be tested with openssl speed of openssl3.5 right now,
+            # the EVP benchmark doesn't go through openssl speed
+            # https://github.com/openssl/openssl/issues/27373
+            if not ossl35_running or args.alg_engine == "evp":
+                logging.info(f"Getting sig algorithm performance of {base_key.provider}")
+                run_algorithm_benchmarks("sig_alg", experiment.performance_algorithms("sig", base_key.provider), run.openssl, "sig-algorithm", SIG_ALG_METRICS, convergence, args.speed_multi, store, base_key, args.alg_engine)
+                logging.info(f"All sig algorithm performance tests of {base_key.provider}, repetition {repetition} completed")
+            else:
+                logging.warning("Skipping sig algorithm performance tests for openssl 3.5 due to https://github.com/openssl/openssl/issues/27373")
+
+    export_results(store, run_id, args.export_latest)
+    store.close()
@@ -0,0 +1,69 @@
+import re
+import logging
+import statistics
+
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+
+# "1234 connections in 5.67s; 217.64 connections/user sec, bytes read 0"
+S_TIME_USER_RATE_REGEX = r"(\d+) connections in \d+\.\d+s; (\d+\.\d+) connections/user sec"
+# "1234 connections in 6 real seconds, 0 bytes read per connection"
+S_TIME_REAL_TIME_REGEX = r"(\d+) connections in (\d+) real seconds, (\d+) bytes read per connection"
+
+# Relative deviation from the steady state below which an interval no longer counts as warm-up
+DEFAULT_WARMUP_TOLERANCE = 0.1
+
+
+@dataclass
+class IntervalSample:
+    index: int
+    # Seconds since the start of the measurement
+    start: float
+    duration: float
+    connections: int
+    connections_per_second: float
+
+
+def parse_s_time_output(output: str) -> tuple[int, float]:
+    """Return (connections, connections/user sec) from the output of `openssl s_time`."""
+    match = re.search(S_TIME_USER_RATE_REGEX, output)
+    if match is None:
+        raise ValueError(f"Could not parse s_time output:\n{output}")
+    return int(match.group(1)), float(match.group(2))
+
+
+def parse_s_time_real_time(output: str) -> tuple[int, int, int]:
+    """Return (connections, real seconds, bytes read per connection) from the output of `openssl s_time`."""
+    match = re.search(S_TIME_REAL_TIME_REGEX, output)
+    if match is None:
+        raise ValueError(f"Could not parse s_time output:\n{output}")
+    return int(match.group(1)), int(match.group(2)), int(match.group(3))
+
+
+def parse_windows(windows: Iterable[tuple[float, float, str]]) -> Iterator[IntervalSample]:
+    """Turn (start, duration, s_time output) windows into interval samples as they arrive."""
+    for index, (start, duration, output) in enumerate(windows):
+        connections, connections_per_second = parse_s_time_output(output)
+        logging.debug(f"  Interval {index}: {connections} connections, {connections_per_second} connections/s")
+        yield IntervalSample(index, start, duration, connections, connections_per_second)
+
+
+def trim_warmup(samples: list[IntervalSample], tolerance: float = DEFAULT_WARMUP_TOLERANCE) -> tuple[list[IntervalSample], list[IntervalSample]]:
+    """Split samples into (warm-up, steady state).
+
+    The steady state level is the median of the second half of the run. Leading intervals deviating
+    more than `tolerance` from it count as warm-up, at most half of the run is ever trimmed.
+    """
+    if len(samples) < 2:
+        return [], samples
+
+    reference = statistics.median(sample.connections_per_second for sample in samples[len(samples) // 2:])
+    if reference == 0:
+        return [], samples
+
+    warmup_end = 0
+    while warmup_end < len(samples) // 2 and abs(samples[warmup_end].connections_per_second - reference) / reference > tolerance:
+        warmup_end += 1
+
+    return samples[:warmup_end], samples[warmup_end:]
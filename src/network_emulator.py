@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import threading
+
+from collections import deque
+from dataclasses import dataclass, field
+
+
+# TCP/IP header bytes sent on the link with every segment
+SEGMENT_OVERHEAD = 40
+# TLS record content types
+TLS_CONTENT_TYPE_APPLICATION_DATA = 23
+TLS_RECORD_HEADER_LENGTH = 5
+READ_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class NetworkProfile:
+    name: str
+    rtt_ms: float
+    # None for an unlimited link
+    bandwidth_mbit: float | None = None
+    mss: int = 1460
+    # Segments the sender may have in flight before the first ack, RFC 6928 defaults to 10
+    initial_window: int = 10
+
+    @property
+    def one_way_delay(self) -> float:
+        return self.rtt_ms / 2000
+
+    def serialization_delay(self, segment_length: int) -> float:
+        if not self.bandwidth_mbit:
+            return 0.0
+        return (segment_length + SEGMENT_OVERHEAD) * 8 / (self.bandwidth_mbit * 1_000_000)
+
+
+NETWORK_PROFILES = {
+    "loopback": NetworkProfile("loopback", 0),
+    "lan": NetworkProfile("lan", 1, 1000),
+    "broadband": NetworkProfile("broadband", 20, 50),
+    "mobile": NetworkProfile("mobile", 80, 10, 1400),
+    "satellite": NetworkProfile("satellite", 600, 5),
+    # Small segments and a small initial window, where large certificate chains need extra round trips
+    "constrained": NetworkProfile("constrained", 100, 1, 536, 4),
+}
+
+
+def parse_network_profile(value: str) -> NetworkProfile:
+    """Parse a preset name or "rtt_ms/bandwidth_mbit[/mss[/initial_window]]", a bandwidth of 0 is unlimited."""
+    if value in NETWORK_PROFILES:
+        return NETWORK_PROFILES[value]
+
+    parts = value.split("/")
+    if not 2 <= len(parts) <= 4:
+        raise ValueError(f"Unknown network profile {value}, expected one of {', '.join(NETWORK_PROFILES)} or rtt_ms/bandwidth_mbit[/mss[/initial_window]]")
+
+    rtt_ms, bandwidth_mbit = float(parts[0]), float(parts[1])
+    mss = int(parts[2]) if len(parts) > 2 else NetworkProfile.mss
+    initial_window = int(parts[3]) if len(parts) > 3 else NetworkProfile.initial_window
+    return NetworkProfile(value, rtt_ms, bandwidth_mbit or None, mss, initial_window)
+
+
+class _Link:
+    """Schedules the segments of one direction of a connection in emulated time.
+
+    Segments are serialized one after another at the link bandwidth and arrive one way delay later.
+    The sender may have at most the congestion window of segments unacknowledged, every segment is
+    acked as soon as it arrives and the window grows by one segment per ack like in slow start.
+    Losses and the receive window aren't modeled.
+    """
+
+    def __init__(self, profile: NetworkProfile, available_at: float):
+        self.profile = profile
+        self.free_at = available_at
+        self.congestion_window = profile.initial_window
+        self.ack_times: deque[float] = deque()
+
+    def schedule(self, now: float, segment_length: int) -> float:
+        """Return the time the segment is delivered to the receiver."""
+        send_at = max(now, self.free_at)
+        while self.ack_times and self.ack_times[0] <= send_at:
+            self.ack_times.popleft()
+            self.congestion_window += 1
+        while len(self.ack_times) >= self.congestion_window:
+            send_at = max(send_at, self.ack_times.popleft())
+            self.congestion_window += 1
+
+        self.free_at = send_at + self.profile.serialization_delay(segment_length)
+        delivered_at = self.free_at + self.profile.one_way_delay
+        self.ack_times.append(delivered_at + self.profile.one_way_delay)
+        return delivered_at
+
+
+class _HandshakeTimer:
+    """Watches the TLS records sent by the client for the first encrypted record, the client Finished in TLS 1.3."""
+
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self.finished_at: float | None = None
+        self._buffer = b""
+        self._skip = 0
+
+    def feed(self, now: float, data: bytes):
+        if self.finished_at is not None:
+            return
+
+        if self._skip >= len(data):
+            self._skip -= len(data)
+            return
+        self._buffer += data[self._skip:]
+        self._skip = 0
+
+        while len(self._buffer) >= TLS_RECORD_HEADER_LENGTH:
+            if self._buffer[0] == TLS_CONTENT_TYPE_APPLICATION_DATA:
+                self.finished_at = now
+                return
+            record_length = TLS_RECORD_HEADER_LENGTH + int.from_bytes(self._buffer[3:5], "big")
+            if record_length > len(self._buffer):
+                self._skip = record_length - len(self._buffer)
+                self._buffer = b""
+                return
+            self._buffer = self._buffer[record_length:]
+
+
+@dataclass
+class NetworkEmulator:
+    """TCP relay between the client and the server emulating the network conditions of a profile.
+
+    The relay listens on a free local port and runs its own event loop in a background thread, so
+    it needs neither root nor `tc`. For every relayed connection it records the time from the
+    client connecting until the client sends its Finished, including the emulated TCP handshake.
+    """
+    profile: NetworkProfile
+    upstream_host: str
+    upstream_port: int
+    # An address instead of a name, a name resolving to several addresses would get a different free port for each
+    host: str = "127.0.0.1"
+    port: int = 0
+    handshake_times_ms: list[float] = field(default_factory=list)
+    failed_connections: int = 0
+    _loop: asyncio.AbstractEventLoop | None = field(default=None, repr=False)
+    _thread: threading.Thread | None = field(default=None, repr=False)
+    _server: asyncio.Server | None = field(default=None, repr=False)
+
+    def __enter__(self) -> "NetworkEmulator":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._relay, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._thread = threading.Thread(target=self._loop.run_forever, name=f"network-emulator-{self.port}", daemon=True)
+        self._thread.start()
+        logging.debug(f"Emulating {self.profile} on port {self.port} in front of {self.upstream_host}:{self.upstream_port}")
+
+    def stop(self):
+        async def shutdown():
+            self._server.close()
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _relay(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        accepted_at = loop.time()
+        try:
+            server_reader, server_writer = await asyncio.open_connection(self.upstream_host, self.upstream_port)
+        except OSError as e:
+            logging.warning(f"Network emulator could not connect to {self.upstream_host}:{self.upstream_port}: {e}")
+            self.failed_connections += 1
+            client_writer.close()
+            return
+
+        # The client's first segment can only be sent after the SYN and SYN-ACK took one round trip
+        handshake_done_at = accepted_at + self.profile.rtt_ms / 1000
+        timer = _HandshakeTimer(accepted_at)
+        try:
+            await asyncio.gather(
+                self._pipe(client_reader, server_writer, _Link(self.profile, handshake_done_at), timer),
+                self._pipe(server_reader, client_writer, _Link(self.profile, handshake_done_at))
+            )
+        finally:
+            for writer in (server_writer, client_writer):
+                writer.close()
+
+        if timer.finished_at is None:
+            self.failed_connections += 1
+        else:
+            self.handshake_times_ms.append((timer.finished_at - timer.started_at) * 1000)
+
+    async def _pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, link: _Link, timer: _HandshakeTimer | None = None):
+        loop = asyncio.get_running_loop()
+        segments: asyncio.Queue[tuple[float, bytes] | None] = asyncio.Queue()
+
+        async def deliver():
+            # Delivery times never decrease, so writing them in queue order keeps the stream intact
+            try:
+                while (segment := await segments.get()) is not None:
+                    delivered_at, data = segment
+                    await asyncio.sleep(max(0.0, delivered_at - loop.time()))
+                    writer.write(data)
+                    await writer.drain()
+                if writer.can_write_eof():
+                    writer.write_eof()
+            except ConnectionError:
+                # s_time resets connections it's done with
+                pass
+
+        delivery = asyncio.create_task(deliver())
+        try:
+            while data := await reader.read(READ_SIZE):
+                now = loop.time()
+                if timer:
+                    timer.feed(now, data)
+                for offset in range(0, len(data), self.profile.mss):
+                    segment = data[offset:offset + self.profile.mss]
+                    segments.put_nowait((link.schedule(now, len(segment)), segment))
+        except ConnectionError:
+            pass
+        finally:
+            segments.put_nowait(None)
+        await delivery
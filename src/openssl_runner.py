@@ -0,0 +1,100 @@
+import os
+import shlex
+import shutil
+import logging
+import subprocess
+
+from pathlib import Path
+from functools import cache
+from dataclasses import dataclass
+
+from harness_profile import phase
+from openssl_setup import OpenSslSetup
+
+
+OPENSSL_35_PREFIX = Path.home() / "openssl-3.5"
+
+
+class OpenSslError(RuntimeError):
+    """An openssl process (or script) exited with an error."""
+
+    def __init__(self, argv: list[str], returncode: int, stdout: str, stderr: str):
+        super().__init__(f"{shlex.join(argv)} exited with code {returncode}: {stderr.strip()}")
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+@dataclass(frozen=True, eq=False)
+class OpenSslRunner:
+    """Starts the openssl binary of an OpenSslSetup directly, with an argument vector and an explicit environment.
+
+    The binary and the environment (PATH and LD_LIBRARY_PATH of the installation, OPENSSL_CONF of the provider)
+    are resolved once per setup, instead of a shell and a wrapper script editing them for every process.
+    """
+    binary: str
+    env: dict[str, str]
+
+    def argv(self, args: list, cpu_cores: list[int] | None = None) -> list[str]:
+        """The command line of `openssl <args>`, pinned to cpu_cores with taskset if given."""
+        return pinned([self.binary, *args], cpu_cores)
+
+    def script_env(self, env: dict) -> dict[str, str]:
+        """Environment of the scripts still run through bash, they find the resolved openssl on the PATH."""
+        return {**self.env, **{key: str(value) for key, value in env.items()}}
+
+    def start(self, argv: list[str], env: dict[str, str] | None = None, **kwargs) -> subprocess.Popen:
+        logging.debug(f"Starting {shlex.join(argv)}")
+        with phase("spawn"):
+            return subprocess.Popen(argv, env=env or self.env, **kwargs)
+
+    def popen(self, args: list, cpu_cores: list[int] | None = None, **kwargs) -> subprocess.Popen:
+        return self.start(self.argv(args, cpu_cores), **kwargs)
+
+    def run(self, args: list, cpu_cores: list[int] | None = None, check: bool = True, timeout: float | None = None) -> subprocess.CompletedProcess:
+        """Run `openssl <args>` to completion with stdin closed, raises OpenSslError if it fails and check is set."""
+        return self._complete(self.argv(args, cpu_cores), None, check, timeout)
+
+    def run_program(self, argv: list, cpu_cores: list[int] | None = None, check: bool = True, timeout: float | None = None) -> subprocess.CompletedProcess:
+        """Run another program linked against libcrypto (e.g. a ctypes benchmark) like `run`, it loads the same libraries and providers."""
+        return self._complete(pinned(argv, cpu_cores), None, check, timeout)
+
+    def run_script(self, script: Path, env: dict, check: bool = True, timeout: float | None = None) -> subprocess.CompletedProcess:
+        """Run a bash script with the environment of the setup and env on top."""
+        return self._complete(["bash", str(script)], self.script_env(env), check, timeout)
+
+    def _complete(self, argv: list[str], env: dict[str, str] | None, check: bool, timeout: float | None) -> subprocess.CompletedProcess:
+        process = self.start(argv, env, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise
+        if check and process.returncode != 0:
+            raise OpenSslError(argv, process.returncode, stdout, stderr)
+        return subprocess.CompletedProcess(argv, process.returncode, stdout, stderr)
+
+
+def pinned(argv: list, cpu_cores: list[int] | None) -> list[str]:
+    taskset = ["taskset", "-c", ",".join(str(core) for core in cpu_cores)] if cpu_cores else []
+    return taskset + [str(arg) for arg in argv]
+
+
+@cache
+def openssl_runner(setup: OpenSslSetup) -> OpenSslRunner:
+    """Resolve the openssl binary and environment of a setup, once per setup."""
+    env = dict(os.environ)
+    path = env.get("PATH", os.defpath)
+    if setup.use_openssl_35:
+        path = os.pathsep.join([str(OPENSSL_35_PREFIX / "bin"), path])
+        env["LD_LIBRARY_PATH"] = os.pathsep.join(filter(None, [str(OPENSSL_35_PREFIX / "lib"), env.get("LD_LIBRARY_PATH")]))
+    env["PATH"] = path
+    if setup.config is not None:
+        env["OPENSSL_CONF"] = str(setup.config.absolute())
+
+    binary = shutil.which("openssl", path=path)
+    if binary is None:
+        raise FileNotFoundError(f"There is no openssl binary on {path}")
+    logging.debug(f"Running {binary}" + (f" with {env['OPENSSL_CONF']}" if "OPENSSL_CONF" in env else ""))
+    return OpenSslRunner(binary, env)
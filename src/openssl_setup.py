@@ -0,0 +1,28 @@
+from pathlib import Path
+from dataclasses import dataclass
+
+
+# OpenSSL configs activating a single provider, see configs/
+PROVIDER_CONFIGS = {
+    "oqs": Path("./configs/openssl_oqs.cnf"),
+    "pqs": Path("./configs/openssl_pqs.cnf"),
+    "ossl35": Path("./configs/openssl_ossl35.cnf"),
+}
+# Providers run with the side installation of OpenSSL 3.5
+OPENSSL_35_PROVIDERS = {"ossl35"}
+
+
+@dataclass(frozen=True)
+class OpenSslSetup:
+    """How every openssl process of a measurement is run: the OpenSSL installation and the config loading the provider.
+
+    Without a config the system wide config (e.g. /etc/ssl/openssl.cnf) decides which providers are loaded.
+    """
+    use_openssl_35: bool = False
+    config: Path | None = None
+
+
+def provider_setup(provider: str) -> OpenSslSetup:
+    if provider not in PROVIDER_CONFIGS:
+        raise ValueError(f"Unknown provider {provider}, expected one of {', '.join(PROVIDER_CONFIGS)}")
+    return OpenSslSetup(provider in OPENSSL_35_PROVIDERS, PROVIDER_CONFIGS[provider])
@@ -0,0 +1,223 @@
+import os
+import signal
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+
+from time import perf_counter
+from pathlib import Path
+from dataclasses import dataclass
+
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+DEFAULT_SAMPLE_INTERVAL = 0.1
+PERF_EVENTS = ["cycles", "instructions"]
+
+
+@dataclass
+class ProcessSnapshot:
+    # Seconds of CPU time
+    user: float
+    system: float
+    voluntary_context_switches: int
+    involuntary_context_switches: int
+    rss_kb: int
+    # Highest RSS of the processes since it started (VmHWM)
+    peak_rss_kb: int
+    open_sockets: int
+
+
+@dataclass
+class ProcessGroupUsage:
+    duration: float
+    user: float
+    system: float
+    voluntary_context_switches: int
+    involuntary_context_switches: int
+    idle_rss_kb: int
+    peak_rss_kb: int
+    # Most sockets open at once besides the listening socket
+    max_connections: int
+    # Hardware counters from perf, None if perf isn't available
+    cycles: int | None = None
+    instructions: int | None = None
+
+    @property
+    def cpu_time(self) -> float:
+        return self.user + self.system
+
+    def per_handshake(self, handshakes: int) -> dict:
+        """Usage columns for a measurement of `handshakes` handshakes."""
+        rss_per_connection = (self.peak_rss_kb - self.idle_rss_kb) / self.max_connections if self.max_connections else None
+        return {
+            "server_cpu_us/handshake": f"{self.cpu_time * 1_000_000 / handshakes:.1f}" if handshakes else "",
+            "server_user_s": f"{self.user:.2f}",
+            "server_system_s": f"{self.system:.2f}",
+            "server_context_switches": self.voluntary_context_switches + self.involuntary_context_switches,
+            "server_idle_rss_kb": self.idle_rss_kb,
+            "server_peak_rss_kb": self.peak_rss_kb,
+            "server_rss_kb/connection": f"{rss_per_connection:.1f}" if rss_per_connection is not None else "",
+            "server_cycles/handshake": f"{self.cycles / handshakes:.0f}" if self.cycles is not None and handshakes else ""
+        }
+
+
+def process_group_pids(pgid: int) -> list[int]:
+    """All processes of a process group, e.g. the wrapper script of a server and the server itself."""
+    pids = []
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            # The command name in field 2 may contain spaces, the fields after it are fixed
+            fields = (entry / "stat").read_text().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if int(fields[2]) == pgid:
+            pids.append(int(entry.name))
+    return pids
+
+
+def read_process(pid: int) -> ProcessSnapshot | None:
+    """Read the usage of a single process from /proc, None if it already exited."""
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+        status = dict(
+            line.split(":", 1) for line in Path(f"/proc/{pid}/status").read_text().splitlines() if ":" in line
+        )
+        fds = list(Path(f"/proc/{pid}/fd").iterdir())
+        open_sockets = sum(1 for fd in fds if os.readlink(fd).startswith("socket:"))
+    except (OSError, IndexError):
+        return None
+
+    def kb(name: str) -> int:
+        return int(status[name].split()[0]) if name in status else 0
+
+    return ProcessSnapshot(
+        user=int(fields[11]) / CLOCK_TICKS,
+        system=int(fields[12]) / CLOCK_TICKS,
+        voluntary_context_switches=int(status.get("voluntary_ctxt_switches", 0)),
+        involuntary_context_switches=int(status.get("nonvoluntary_ctxt_switches", 0)),
+        rss_kb=kb("VmRSS"),
+        peak_rss_kb=kb("VmHWM"),
+        open_sockets=open_sockets
+    )
+
+
+def read_process_group(pgid: int) -> ProcessSnapshot:
+    """Sum of the usage of all processes of a process group."""
+    snapshots = [snapshot for pid in process_group_pids(pgid) if (snapshot := read_process(pid)) is not None]
+    return ProcessSnapshot(
+        user=sum(snapshot.user for snapshot in snapshots),
+        system=sum(snapshot.system for snapshot in snapshots),
+        voluntary_context_switches=sum(snapshot.voluntary_context_switches for snapshot in snapshots),
+        involuntary_context_switches=sum(snapshot.involuntary_context_switches for snapshot in snapshots),
+        rss_kb=sum(snapshot.rss_kb for snapshot in snapshots),
+        peak_rss_kb=sum(snapshot.peak_rss_kb for snapshot in snapshots),
+        open_sockets=sum(snapshot.open_sockets for snapshot in snapshots)
+    )
+
+
+def parse_perf_stat(output: str) -> dict[str, int]:
+    """Parse the csv output of `perf stat -x,`, events perf couldn't count are left out."""
+    counters = {}
+    for line in output.splitlines():
+        fields = line.split(",")
+        if len(fields) < 3 or line.startswith("#"):
+            continue
+        value, event = fields[0], fields[2]
+        # Events may carry a modifier, e.g. "cycles:u"
+        event = event.split(":")[0]
+        if value.isdigit():
+            counters[event] = int(value)
+    return counters
+
+
+class ProcessGroupMonitor:
+    """Samples the CPU time, context switches, memory and open connections of a process group.
+
+    CPU time and context switches are the difference between entering and leaving the monitor.
+    s_server isn't a waited for child of the harness, so getrusage can't see it and everything is
+    read from /proc. The RSS is sampled in the background to find the peak during the measurement,
+    as VmHWM also covers the key loading at startup. If `perf` is installed the hardware cycles and
+    instructions of the group are counted as well, e.g. it needs `kernel.perf_event_paranoid` <= 2.
+    """
+
+    def __init__(self, pgid: int, sample_interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.pgid = pgid
+        self.sample_interval = sample_interval
+        self.usage: ProcessGroupUsage | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._perf: subprocess.Popen | None = None
+        self._perf_output: Path | None = None
+        self._peak_rss_kb = 0
+        self._max_connections = 0
+
+    def __enter__(self) -> "ProcessGroupMonitor":
+        self._start = read_process_group(self.pgid)
+        self._started_at = perf_counter()
+        self._start_perf()
+        self._thread = threading.Thread(target=self._sample, name=f"monitor-{self.pgid}", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        end = read_process_group(self.pgid)
+        counters = self._stop_perf()
+
+        self.usage = ProcessGroupUsage(
+            duration=perf_counter() - self._started_at,
+            user=end.user - self._start.user,
+            system=end.system - self._start.system,
+            voluntary_context_switches=end.voluntary_context_switches - self._start.voluntary_context_switches,
+            involuntary_context_switches=end.involuntary_context_switches - self._start.involuntary_context_switches,
+            idle_rss_kb=self._start.rss_kb,
+            peak_rss_kb=max(self._peak_rss_kb, end.rss_kb),
+            max_connections=self._max_connections,
+            cycles=counters.get("cycles"),
+            instructions=counters.get("instructions")
+        )
+
+    def _sample(self):
+        listening_sockets = self._start.open_sockets
+        while not self._stop.wait(self.sample_interval):
+            snapshot = read_process_group(self.pgid)
+            self._peak_rss_kb = max(self._peak_rss_kb, snapshot.rss_kb)
+            self._max_connections = max(self._max_connections, snapshot.open_sockets - listening_sockets)
+
+    def _start_perf(self):
+        perf = shutil.which("perf")
+        pids = process_group_pids(self.pgid)
+        if perf is None or not pids:
+            return
+
+        self._perf_output = Path(tempfile.mkstemp(prefix="perf-stat-", suffix=".csv")[1])
+        self._perf = subprocess.Popen(
+            [perf, "stat", "-x,", "-e", ",".join(PERF_EVENTS), "-o", str(self._perf_output), "-p", ",".join(map(str, pids))],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+    def _stop_perf(self) -> dict[str, int]:
+        if self._perf is None:
+            return {}
+
+        # perf stat writes the counters when interrupted
+        self._perf.send_signal(signal.SIGINT)
+        try:
+            self._perf.wait(timeout=5)
+            counters = parse_perf_stat(self._perf_output.read_text())
+        except (subprocess.TimeoutExpired, OSError) as e:
+            logging.warning(f"Could not read the perf counters: {e}")
+            self._perf.kill()
+            counters = {}
+        finally:
+            self._perf_output.unlink(missing_ok=True)
+
+        if not counters:
+            logging.debug("perf counted no events, hardware counters are not available")
+        return counters
@@ -0,0 +1,261 @@
+import json
+import math
+import logging
+import argparse
+
+from pathlib import Path
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from result_cache import RESULTS_BASE_PATH, RESULT_PROVIDERS_FILE_MAP, read_results
+from result_statistics import DEFAULT_CONFIDENCE, DEFAULT_RESAMPLES, compare_groups
+
+DEFAULT_THRESHOLD = 0.05
+DEFAULT_REPORT_FILE = Path("./results/regression_report.json")
+# Errors exit with 1, so a gate can tell a failed comparison from a regression
+REGRESSION_EXIT_CODE = 2
+
+TLS_KEY = ("nist_level", "KEM", "SIG")
+
+
+@dataclass(frozen=True)
+class Metric:
+    file_name: str
+    # The columns identifying what was measured, e.g. the KEM, SIG and level of a TLS combination
+    key_columns: tuple[str, ...]
+    column: str
+    higher_is_better: bool = True
+
+
+METRICS = [
+    Metric("results_tls.csv", TLS_KEY, "connections/s"),
+    Metric("results_tls.csv", TLS_KEY, "connections/s_resumed"),
+    Metric("results_tls.csv", TLS_KEY, "connections/s_mtls"),
+    Metric("results_tls.csv", TLS_KEY, "server_cpu_us/handshake", higher_is_better=False),
+    Metric("results_kem_alg.csv", ("kem-algorithm",), "keygens/s"),
+    Metric("results_kem_alg.csv", ("kem-algorithm",), "encaps/s"),
+    Metric("results_kem_alg.csv", ("kem-algorithm",), "decaps/s"),
+    Metric("results_sig_alg.csv", ("sig-algorithm",), "keygens/s"),
+    Metric("results_sig_alg.csv", ("sig-algorithm",), "signs/s"),
+    Metric("results_sig_alg.csv", ("sig-algorithm",), "verify/s"),
+]
+# Optional columns telling rows of the same algorithms apart, part of the key if a file has them
+VARIANT_COLUMNS = ["multi", "engine"]
+
+logging.basicConfig(level=logging.INFO)
+
+
+@dataclass
+class ComparisonGroup:
+    metric: Metric
+    key: dict
+    baseline: str
+    candidate: str
+    baseline_samples: np.ndarray
+    candidate_samples: np.ndarray
+
+
+def json_value(value):
+    """numpy scalars as Python values and NaN as null, so the report is valid JSON."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def samples_by_group(data: pd.DataFrame, metric: Metric, key_columns: list[str], group_column: str) -> dict[tuple, dict[str, np.ndarray]]:
+    """The samples of the metric of every key, by the value of group_column (e.g. the provider)."""
+    if metric.column not in data.columns or not set(key_columns) <= set(data.columns):
+        return {}
+    data = data.dropna(subset=[metric.column])
+
+    samples = {}
+    # Rows without a variant column value, e.g. no `multi` in a run without a -multi sweep, form their own group
+    for values, group in data.groupby(key_columns + [group_column], sort=True, dropna=False):
+        *key, label = values
+        samples.setdefault(tuple(key), {})[label] = group[metric.column].to_numpy(dtype=float)
+    return samples
+
+
+def provider_groups(data: dict[str, pd.DataFrame], baseline_provider: str | None) -> list[ComparisonGroup]:
+    """Every provider against the baseline provider, within one set of runs."""
+    groups = []
+    for metric in METRICS:
+        frame = data[metric.file_name]
+        key_columns = list(metric.key_columns) + [column for column in VARIANT_COLUMNS if column in frame.columns]
+        for key, by_provider in samples_by_group(frame, metric, key_columns, "provider").items():
+            if baseline_provider not in by_provider:
+                continue
+            for provider, samples in by_provider.items():
+                if provider != baseline_provider:
+                    groups.append(ComparisonGroup(
+                        metric, dict(zip(key_columns, key)), baseline_provider, provider, by_provider[baseline_provider], samples
+                    ))
+    return groups
+
+
+def run_set_groups(baseline: dict[str, pd.DataFrame], candidate: dict[str, pd.DataFrame], provider: str | None) -> list[ComparisonGroup]:
+    """The candidate runs against the baseline runs, for each provider on its own."""
+    groups = []
+    for metric in METRICS:
+        frame = pd.concat([
+            baseline[metric.file_name].assign(run_set="baseline"),
+            candidate[metric.file_name].assign(run_set="candidate")
+        ], ignore_index=True)
+        if provider is not None and "provider" in frame.columns:
+            frame = frame[frame["provider"] == provider]
+        key_columns = ["provider"] + list(metric.key_columns) + [column for column in VARIANT_COLUMNS if column in frame.columns]
+        for key, by_run_set in samples_by_group(frame, metric, key_columns, "run_set").items():
+            if len(by_run_set) == 2:
+                groups.append(ComparisonGroup(
+                    metric, dict(zip(key_columns, key)), "baseline", "candidate", by_run_set["baseline"], by_run_set["candidate"]
+                ))
+    return groups
+
+
+def evaluate(groups: list[ComparisonGroup], threshold: float, confidence: float, resamples: int, seed: int) -> list[dict]:
+    """Statistics of all groups, with whether the candidate is significantly worse (or better) than the threshold."""
+    comparisons = compare_groups(
+        [group.baseline_samples for group in groups],
+        [group.candidate_samples for group in groups],
+        resamples,
+        confidence,
+        np.random.default_rng(seed)
+    )
+
+    rows = []
+    for i, group in enumerate(groups):
+        change = comparisons.change[i]
+        # Positive if the candidate is better, whatever the direction of the metric
+        gain = change if group.metric.higher_is_better else -change
+        significant = bool(comparisons.p_value[i] < 1 - confidence)
+        rows.append({
+            "file": group.metric.file_name,
+            "metric": group.metric.column,
+            "higher_is_better": group.metric.higher_is_better,
+            "key": {column: json_value(value) for column, value in group.key.items()},
+            "baseline": group.baseline,
+            "candidate": group.candidate,
+            "baseline_n": int(comparisons.baseline_n[i]),
+            "candidate_n": int(comparisons.candidate_n[i]),
+            "baseline_mean": json_value(comparisons.baseline_mean[i]),
+            "baseline_ci": [json_value(bound) for bound in comparisons.baseline_ci[i]],
+            "candidate_mean": json_value(comparisons.candidate_mean[i]),
+            "candidate_ci": [json_value(bound) for bound in comparisons.candidate_ci[i]],
+            "change": json_value(change),
+            "change_ci": [json_value(bound) for bound in comparisons.change_ci[i]],
+            "effect_size": json_value(comparisons.effect_size[i]),
+            "p_value": json_value(comparisons.p_value[i]),
+            "significant": significant,
+            "regression": significant and bool(gain < -threshold),
+            "improvement": significant and bool(gain > threshold)
+        })
+    return rows
+
+
+def log_comparisons(rows: list[dict]):
+    table = pd.DataFrame([
+        {
+            "metric": row["metric"],
+            "key": " ".join(str(value) for value in row["key"].values()),
+            "baseline": row["baseline"],
+            "candidate": row["candidate"],
+            "n": f"{row['baseline_n']}/{row['candidate_n']}",
+            "change_%": None if row["change"] is None else round(100 * row["change"], 2),
+            "ci_%": None if None in row["change_ci"] else f"[{100 * row['change_ci'][0]:.2f}, {100 * row['change_ci'][1]:.2f}]",
+            "g": None if row["effect_size"] is None else round(row["effect_size"], 2),
+            "p": row["p_value"],
+            "result": "REGRESSION" if row["regression"] else "improvement" if row["improvement"] else ""
+        }
+        for row in rows
+    ])
+    with pd.option_context("display.max_rows", None, "display.width", 200, "display.max_colwidth", 60):
+        print(table.to_string(index=False))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare providers or two sets of runs and report significant performance regressions")
+    parser.add_argument("--results", type=Path, default=RESULTS_BASE_PATH, help=f"Directory of <provider>_<n> run directories to compare the providers of (default: {RESULTS_BASE_PATH})")
+    parser.add_argument("--baseline-provider", help="Provider the other providers are compared with (default: the first one found)")
+    parser.add_argument("--baseline", type=Path, help="Directory of the baseline runs, e.g. results/runs/<run id>, compared with --candidate")
+    parser.add_argument("--candidate", type=Path, help="Directory of the candidate runs, compared with --baseline")
+    parser.add_argument("--provider", help="Only compare the runs of this provider (with --baseline and --candidate)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help=f"Relative change that counts as a regression if it is significant (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE, help=f"Confidence level of the intervals and significance tests (default: {DEFAULT_CONFIDENCE})")
+    parser.add_argument("--resamples", type=int, default=DEFAULT_RESAMPLES, help=f"Bootstrap resamples per comparison (default: {DEFAULT_RESAMPLES})")
+    parser.add_argument("--seed", type=int, help="Seed of the bootstrap resampling")
+    parser.add_argument("--report", type=Path, default=DEFAULT_REPORT_FILE, help=f"JSON file the report is written to (default: {DEFAULT_REPORT_FILE})")
+    args = parser.parse_args()
+
+    if (args.baseline is None) != (args.candidate is None):
+        parser.error("--baseline and --candidate have to be given together")
+    if not 0 < args.confidence < 1:
+        parser.error("--confidence has to be between 0 and 1")
+    if args.resamples < 1 or args.threshold < 0:
+        parser.error("--resamples has to be positive and --threshold not negative")
+    return args
+
+
+def read_run_set(base_path: Path) -> dict[str, pd.DataFrame]:
+    if not base_path.is_dir():
+        logging.error(f"{base_path} is not a directory")
+        exit(1)
+    return {file_name: read_results(file_name, base_path) for file_name in {metric.file_name for metric in METRICS}}
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    seed = args.seed if args.seed is not None else int(np.random.SeedSequence().entropy % 2**32)
+
+    if args.baseline is not None:
+        mode = "runs"
+        baseline, candidate = str(args.baseline), str(args.candidate)
+        groups = run_set_groups(read_run_set(args.baseline), read_run_set(args.candidate), args.provider)
+    else:
+        mode = "providers"
+        data = read_run_set(args.results)
+        # Same order as the graphs, providers without a display name last
+        display_order = list(RESULT_PROVIDERS_FILE_MAP.values())
+        providers = sorted(
+            {provider for frame in data.values() if "provider" in frame.columns for provider in frame["provider"].unique()},
+            key=lambda provider: (display_order.index(provider) if provider in display_order else len(display_order), provider)
+        )
+        baseline = args.baseline_provider if args.baseline_provider is not None else (providers[0] if providers else None)
+        if baseline not in providers:
+            logging.error(f"Provider {baseline} has no results in {args.results}, found: {', '.join(providers) or 'none'}")
+            exit(1)
+        candidate = ", ".join(provider for provider in providers if provider != baseline)
+        groups = provider_groups(data, baseline)
+
+    if not groups:
+        logging.error("There are no measurements present in both the baseline and the candidate to compare")
+        exit(1)
+
+    logging.info(f"Comparing {len(groups)} measurements of {candidate} with {baseline} ({args.resamples} resamples, seed {seed})")
+    rows = evaluate(groups, args.threshold, args.confidence, args.resamples, seed)
+    log_comparisons(rows)
+
+    regressions = [row for row in rows if row["regression"]]
+    report = {
+        "mode": mode,
+        "baseline": baseline,
+        "candidate": candidate,
+        "threshold": args.threshold,
+        "confidence": args.confidence,
+        "resamples": args.resamples,
+        "seed": seed,
+        "regressions": len(regressions),
+        "improvements": sum(row["improvement"] for row in rows),
+        "comparisons": rows
+    }
+    args.report.parent.mkdir(parents=True, exist_ok=True)
+    args.report.write_text(json.dumps(report, indent=2))
+    logging.info(f"Wrote the report to {args.report}")
+
+    if regressions:
+        for row in regressions:
+            logging.error(f"Regression of {row['metric']} {row['key']}: {100 * row['change']:+.2f}% ({row['candidate']} against {row['baseline']}, p={row['p_value']:.4f})")
+        exit(REGRESSION_EXIT_CODE)
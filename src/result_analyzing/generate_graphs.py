@@ -2,21 +2,27 @@
 # My author didn't try to make me handsome
 # so my code quality is ... bad.
 
+import os
+import json
+import hashlib
+import logging
+import argparse
+
+from time import perf_counter
 from pathlib import Path
+from dataclasses import dataclass
+from typing import Callable
+from concurrent.futures import ProcessPoolExecutor
 
+import matplotlib
+from matplotlib.patches import Patch
 from matplotlib.ticker import AutoMinorLocator
 import seaborn as sns
 import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
 
-RESULTS_BASE_PATH = Path("./results/raw_data/")
-AMT_OF_MEASUREMENTS = 5
-RESULT_PROVIDERS_FILE_MAP = {
-    "oqs": "Open Quantum Safe",
-    "pqs": "PQShield",
-    "ossl35": "OpenSSL 3.5"
-}
+from result_cache import RESULTS_BASE_PATH, read_results
 
 # Fixed provider order to ensure consistent colors across all diagrams
 PROVIDER_ORDER = ["Open Quantum Safe", "PQShield", "OpenSSL 3.5"]
@@ -28,299 +34,353 @@ KEM_NAME_MAP = {
     "ML-KEM-512": "mlkem512",
 }
 
-ALGORITHM_NAME_MAP = {
-    "mldsa44": "ML-DSA-44",
-    "mldsa65": "ML-DSA-65",
-    "mldsa87": "ML-DSA-87",
-    "rsa:3072": "RSA-3072",
-    "rsa:7680": "RSA-7680",
-    "rsa:15360": "RSA-15360",
-    "mlkem512": "ML-KEM-512",
-    "mlkem768": "ML-KEM-768",
-    "mlkem1024": "ML-KEM-1024",
-    "P-256": "P-256",
-    "P-384": "P-384",
-    "P-521": "P-521"
-}
-
-def read_data(file_suffix: str) -> pd.DataFrame:
-    data = pd.DataFrame()
-    for provider in RESULT_PROVIDERS_FILE_MAP.keys():
-        for i in range(1, AMT_OF_MEASUREMENTS + 1):
-            csv_path = RESULTS_BASE_PATH / f"{provider}_{i}" / file_suffix
-            res = pd.read_csv(csv_path)
-            res['provider'] = RESULT_PROVIDERS_FILE_MAP[provider]
-            data = pd.concat([data, res], ignore_index=True)
-    return data
-
-def read_tls_data() -> pd.DataFrame:
-    data = read_data("results_tls.csv")
-    data = data.replace({"KEM": ALGORITHM_NAME_MAP, "SIG": ALGORITHM_NAME_MAP})
-    return data
-
-def read_kem_alg_perf_data() -> pd.DataFrame:
-    data = read_data("results_kem_alg.csv")
-    data = data.replace({"kem-algorithm": ALGORITHM_NAME_MAP})
-    return data
-
-def read_sig_alg_perf_data() -> pd.DataFrame:
-    data = read_data("results_sig_alg.csv")
-    data = data.replace({"sig-algorithm": ALGORITHM_NAME_MAP})
-    return data
-
-def get_tls_graph(nist_level: int, data: pd.DataFrame, ax):
-    data = data[data['nist_level'].astype(int) == int(nist_level)].copy()
-    data['label'] = data['KEM'].astype(str) + ' | ' + data['SIG'].astype(str)
-
-    summary = data.groupby(['label', 'provider'], as_index=False)['connections/s'].agg(['mean', 'std']).reset_index()
-
-    # Pivot summary to wide form so we can control bar positions precisely
-    pivot = summary.pivot(index='label', columns='provider', values='mean').fillna(0)
-    pivot_std  = summary.pivot(index='label', columns='provider', values='std').fillna(0)
-    labels = pivot.index.tolist()
-    # Use consistent provider ordering, filtering out any missing providers
-    providers = [p for p in PROVIDER_ORDER if p in pivot.columns]
-
-    n = len(labels)
-    m = len(providers)
-
-    x = np.arange(n)
+DEFAULT_OUTPUT_PATH = Path("./results/assets/")
+FIGURE_FORMATS = ["png", "svg", "pdf"]
+FIGURE_DPI = 100
+# Hash of the input data of every figure written to the output directory, unchanged figures aren't rendered again
+FIGURE_HASHES_FILE = ".figure_hashes.json"
+
+logging.basicConfig(level=logging.INFO)
+
+def read_tls_data(base_path: Path = RESULTS_BASE_PATH) -> pd.DataFrame:
+    return read_results("results_tls.csv", base_path)
+
+def read_kem_alg_perf_data(base_path: Path = RESULTS_BASE_PATH) -> pd.DataFrame:
+    return read_results("results_kem_alg.csv", base_path)
+
+def read_sig_alg_perf_data(base_path: Path = RESULTS_BASE_PATH) -> pd.DataFrame:
+    return read_results("results_sig_alg.csv", base_path)
+
+def read_tls_load_data(base_path: Path = RESULTS_BASE_PATH) -> pd.DataFrame:
+    return read_results("results_tls_load.csv", base_path)
+
+# Runs with an `openssl speed -multi` sweep have a row per process count,
+# the bar charts only compare the single process rows
+def single_process_rows(data: pd.DataFrame) -> pd.DataFrame:
+    if 'multi' not in data.columns:
+        return data
+    return data[data['multi'].isna() | (data['multi'] == 1)]
+
+# Labels in `order` first and in that order, the others after them as they come
+def ordered_labels(labels, order):
+    return [label for label in order if label in labels] + [label for label in labels if label not in order]
+
+def present_providers(providers):
+    # Use consistent provider ordering, providers without a fixed place come last
+    return ordered_labels(list(providers), PROVIDER_ORDER)
+
+def provider_pivot(data: pd.DataFrame, label_column: str, value_column: str, order=()) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Mean and std of value_column per label (rows) and provider (columns)."""
+    summary = data.groupby([label_column, 'provider'])[value_column].agg(['mean', 'std']).reset_index()
+    mean = summary.pivot(index=label_column, columns='provider', values='mean')
+    std = summary.pivot(index=label_column, columns='provider', values='std')
+    labels = ordered_labels(mean.index.tolist(), order)
+    return mean.reindex(labels).fillna(0), std.reindex(labels).fillna(0)
+
+def draw_grouped_bars(ax, series: list[tuple[pd.DataFrame, pd.DataFrame | None, str | None]], fmt: str):
+    """Bars grouped by label, one slot per provider and one bar per series within the slot.
+
+    Every series is (means, errors, hatch) with the labels as rows and the providers as columns, errors may be
+    None, a frame like the means or a pair of frames (below, above) for asymmetric error bars.
+    Returns the providers and their colors for the legend.
+    """
+    means = series[0][0]
+    labels = means.index.tolist()
+    providers = present_providers(means.columns)
+    x = np.arange(len(labels))
 
     # total width occupied by a group of bars (0..1)
     group_total_width = 0.90
-    single_width = group_total_width / max(m, 1)
-    inner_fill = 0.95  # fraction of single_width that is actual bar (rest is padding)
-    bar_width = single_width * inner_fill
+    slot_width = group_total_width / max(len(providers), 1)
+    bar_spacing = slot_width / len(series)
+    bar_width = bar_spacing * 0.95  # fraction of the spacing that is actual bar (rest is padding)
 
-    palette = sns.color_palette("colorblind", n_colors=len(providers))
+    palette = sns.color_palette("colorblind", n_colors=max(len(providers), 1))
     # plot each provider's bars with offsets so bars within the same label are side-by-side
     for i, provider in enumerate(providers):
-        offsets = x - (group_total_width / 2) + i * single_width + single_width / 2
-        values = pivot[provider].values
-        errs  = pivot_std[provider].values
-        bars =  ax.bar(
-            offsets, 
-            values, 
-            width=bar_width, 
-            label=provider, 
-            align='center', 
-            zorder=3,
-            color=palette[i],
-            yerr=errs, 
-            error_kw={'elinewidth':4, 'alpha':0.9},
-        )
-        ax.bar_label(bars, fmt='%.1f', padding=3)
+        slot_start = x - (group_total_width / 2) + i * slot_width
+        for j, (values, errors, hatch) in enumerate(series):
+            if isinstance(errors, tuple):
+                errors = np.vstack([errors[0][provider].values, errors[1][provider].values])
+            elif errors is not None:
+                errors = errors[provider].values
+            bars = ax.bar(
+                slot_start + j * bar_spacing + bar_spacing / 2,
+                values[provider].values,
+                width=bar_width,
+                label=provider if j == 0 else None,
+                align='center',
+                zorder=3,
+                color=palette[i],
+                hatch=hatch,
+                edgecolor="#ffffff" if hatch else None,
+                yerr=errors,
+                error_kw={'elinewidth': 4, 'alpha': 0.9},
+            )
+            ax.bar_label(bars, fmt=fmt, padding=3)
 
     ax.set_xticks(x)
     ax.set_xticklabels(labels, rotation=0, ha='center')
-    ax.set_xlabel('Schlüsselkapselungsverfahren | Signatur Algorithmus')
-    ax.set_ylabel('Verbindungen pro Sekunde')
-    ax.set_title(f'NIST level {nist_level}')
+    return providers, palette
 
+def style_value_axis(ax):
     # Grid customization (only horizontal lines)
     ax.set_axisbelow(True)
     ax.yaxis.grid(True, which='major', linestyle='--', linewidth=0.8, color='0.75')
     ax.yaxis.set_minor_locator(AutoMinorLocator(2))
     ax.yaxis.grid(True, which='minor', linestyle=':', linewidth=0.5, color='0.85', alpha=0.7)
     ax.xaxis.grid(False)
-    ax.margins(y=0.15)
-
 
-    # Increase legend text size and title size for readability
-    ax.legend(title="Anbieter", fontsize=9, title_fontsize=11, markerscale=1, handlelength=1.5, handletextpad=0.6)
-
-# Sort the pivot tables to match the KEM_ORDER
-def sort_pivot_by_order(pivot, order):
-    return pivot.reindex(order)
+def series_legend(ax, providers, palette, series_labels: list[tuple[str, str | None]]):
+    # Provider legend: colored patches + an explanation of the hatches of the series
+    provider_handles = [Patch(facecolor=palette[i], label=provider) for i, provider in enumerate(providers)]
+    series_handles = [Patch(facecolor='white', edgecolor='black', hatch=hatch, label=label) for label, hatch in series_labels]
+    ax.legend(handles=provider_handles + series_handles, title='Anbieter | Metrik', fontsize=11, title_fontsize=12, ncol=2)
+
+def combination_labels(data: pd.DataFrame) -> pd.DataFrame:
+    data = data.copy()
+    # Rows of a chain shape sweep share their SIG, the whole chain tells them apart
+    sig = data['chain'].fillna(data['SIG']) if 'chain' in data.columns else data['SIG']
+    data['label'] = data['KEM'].astype(str) + ' | ' + sig.astype(str)
+    return data
 
-# Update the get_kem_alg_graph function to sort by KEM_ORDER
-def get_kem_alg_graph(data: pd.DataFrame):
+def get_alg_scaling_graph(data: pd.DataFrame, alg_column: str, metrics: list[str]):
+    data = data.dropna(subset=['multi'])
+    summary = data.groupby([alg_column, 'provider', 'multi'], as_index=False)[metrics].mean()
 
-    # aggregate mean and std per (kem-algorithm, provider)
-    summary = data.groupby(['kem-algorithm', 'provider'], as_index=False)[['encaps/s', 'decaps/s']].agg(['mean', 'std']).reset_index()
-    summary.columns = ['_'.join(col).strip() if col[1] else col[0] for col in summary.columns.values]
-    summary.rename(columns={
-        'kem-algorithm_': 'kem-algorithm',
-        'provider_': 'provider',
-        'encaps/s_mean': 'encaps/s_mean',
-        'encaps/s_std': 'encaps/s_std',
-        'decaps/s_mean': 'decaps/s_mean',
-        'decaps/s_std': 'decaps/s_std',
-    }, inplace=True)
-
-    # pivot so rows = kem-algorithm, columns = provider
-    pivot_encap = summary.pivot(index='kem-algorithm', columns='provider', values='encaps/s_mean').fillna(0)
-    pivot_encap_std = summary.pivot(index='kem-algorithm', columns='provider', values='encaps/s_std').fillna(0)
-    pivot_decap = summary.pivot(index='kem-algorithm', columns='provider', values='decaps/s_mean').fillna(0)
-    pivot_decap_std = summary.pivot(index='kem-algorithm', columns='provider', values='decaps/s_std').fillna(0)
-
-    # Sort the pivot tables by KEM_ORDER
-    pivot_encap = sort_pivot_by_order(pivot_encap, KEM_ORDER)
-    pivot_encap_std = sort_pivot_by_order(pivot_encap_std, KEM_ORDER)
-    pivot_decap = sort_pivot_by_order(pivot_decap, KEM_ORDER)
-    pivot_decap_std = sort_pivot_by_order(pivot_decap_std, KEM_ORDER)
-
-    kem_labels = pivot_encap.index.tolist()
-    # Use consistent provider ordering, filtering out any missing providers
-    providers = [p for p in PROVIDER_ORDER if p in pivot_encap.columns]
-
-    n_kem = len(kem_labels)
-    n_prov = len(providers)
-    x = np.arange(n_kem)
-
-    # sizing: outer groups by KEM, inner groups by provider, two bars (encap+decap) per provider
-    group_total_width = 0.9
-    prov_group_width = group_total_width / max(n_prov, 1)
-    bar_width = prov_group_width * 0.45   # each metric bar
-    gap = prov_group_width * 0.025        # gap between encap and decap for same provider
+    fig, axes = plt.subplots(1, len(metrics), figsize=(6 * len(metrics), 6), constrained_layout=True)
+    for ax, metric in zip(axes, metrics):
+        sns.lineplot(data=summary, x='multi', y=metric, hue='provider', style=alg_column, hue_order=present_providers(summary['provider'].unique()), palette='colorblind', marker='o', ax=ax)
+        ax.set_xlabel('Prozesse (openssl speed -multi)')
+        ax.set_ylabel(metric)
+        ax.set_xticks(sorted(summary['multi'].unique()))
+        ax.set_axisbelow(True)
+        ax.yaxis.grid(True, which='major', linestyle='--', linewidth=0.8, color='0.75')
+    return fig
 
-    fig, ax = plt.subplots(figsize=(16, 8))
-    palette = sns.color_palette("colorblind", n_colors=n_prov)
-
-    # draw bars: for each provider, plot encap and decap for all KEM algorithms
-    for i, provider in enumerate(providers):
-        prov_center = x - (group_total_width / 2) + i * prov_group_width + prov_group_width / 2
-
-        encap_vals = pivot_encap[provider].values
-        encap_errs = pivot_encap_std[provider].values
-        decap_vals = pivot_decap[provider].values
-        decap_errs = pivot_decap_std[provider].values
-
-        encap_positions = prov_center - (bar_width / 2 + gap / 2)
-        decap_positions = prov_center + (bar_width / 2 + gap / 2)
-
-        # Plot encap bars (solid)
-        bars_enc = ax.bar(encap_positions, encap_vals, width=bar_width,
-                          color=palette[i], align='center', zorder=3,
-                          yerr=encap_errs, error_kw={'elinewidth':4, 'alpha':0.9})
-        # Plot decap bars (hatched, same color)
-        bars_dec = ax.bar(decap_positions, decap_vals, width=bar_width,
-                          color=palette[i], hatch='///', edgecolor="#ffffff", align='center', zorder=3,
-                          yerr=decap_errs, error_kw={'elinewidth':4, 'alpha':0.9})
-
-        # label bars
-        ax.bar_label(bars_enc, fmt='%.0f', padding=3)
-        ax.bar_label(bars_dec, fmt='%.0f', padding=3)
-
-    # xticks at group centers
-    ax.set_xticks(x)
-    ax.set_xticklabels(kem_labels, rotation=0, ha='center')
-    ax.set_xlabel('Schlüsselkapselungsverfahren')
-    ax.set_ylabel('Operationen pro Sekunde')
-
-    # Provider legend: colored patches + encap/decap explanation
-    from matplotlib.patches import Patch
-    provider_handles = [Patch(facecolor=palette[i], label=providers[i]) for i in range(len(providers))]
-    enc_handle = Patch(facecolor='white', edgecolor='black', label='Kapselung/s')
-    dec_handle = Patch(facecolor='white', edgecolor='black', hatch='///', label='Entkapselungen/s')
-    ax.legend(handles=provider_handles + [enc_handle, dec_handle], title='Anbieter | Metrik',
-              fontsize=11, title_fontsize=12, ncol=2)
+def get_tls_graph(nist_level: int, data: pd.DataFrame, ax):
+    data = combination_labels(data[data['nist_level'].astype(int) == int(nist_level)])
+    mean, std = provider_pivot(data, 'label', 'connections/s')
+    draw_grouped_bars(ax, [(mean, std, None)], '%.1f')
 
-    # Grid customization (only horizontal lines)
-    ax.set_axisbelow(True)
-    ax.yaxis.grid(True, which='major', linestyle='--', linewidth=0.8, color='0.75')
-    ax.yaxis.set_minor_locator(AutoMinorLocator(2))
-    ax.yaxis.grid(True, which='minor', linestyle=':', linewidth=0.5, color='0.85', alpha=0.7)
-    ax.xaxis.grid(False)
+    ax.set_xlabel('Schlüsselkapselungsverfahren | Signatur Algorithmus')
+    ax.set_ylabel('Verbindungen pro Sekunde')
+    ax.set_title(f'NIST level {nist_level}')
+    style_value_axis(ax)
+    ax.margins(y=0.15)
 
-def get_sig_alg_graph(data: pd.DataFrame):
-    # aggregate mean and std per (sig-algorithm, provider)
-    summary = data.groupby(['sig-algorithm', 'provider'], as_index=False)[['signs/s', 'verify/s']].agg(['mean', 'std']).reset_index()
-    summary.columns = ['_'.join(col).strip() if col[1] else col[0] for col in summary.columns.values]
-    summary.rename(columns={
-        'sig-algorithm_': 'sig-algorithm',
-        'provider_': 'provider',
-        'signs/s_mean': 'signs/s_mean',
-        'signs/s_std': 'signs/s_std',
-        'verify/s_mean': 'verify/s_mean',
-        'verify/s_std': 'verify/s_std',
-    }, inplace=True)
-
-    # pivot so rows = sig-algorithm, columns = provider
-    pivot_sign = summary.pivot(index='sig-algorithm', columns='provider', values='signs/s_mean').fillna(0)
-    pivot_sign_std = summary.pivot(index='sig-algorithm', columns='provider', values='signs/s_std').fillna(0)
-    pivot_verify = summary.pivot(index='sig-algorithm', columns='provider', values='verify/s_mean').fillna(0)
-    pivot_verify_std = summary.pivot(index='sig-algorithm', columns='provider', values='verify/s_std').fillna(0)
-
-    sig_labels = pivot_sign.index.tolist()
-    # Use consistent provider ordering, filtering out any missing providers
-    providers = [p for p in PROVIDER_ORDER if p in pivot_sign.columns]
-
-    n_sig = len(sig_labels)
-    n_prov = len(providers)
-    x = np.arange(n_sig)
-
-    # sizing: outer groups by SIG, inner groups by provider, two bars (encap+decap) per provider
-    group_total_width = 0.9
-    prov_group_width = group_total_width / max(n_prov, 1)
-    bar_width = prov_group_width * 0.45   # each metric bar
-    gap = prov_group_width * 0.025        # gap between encap and decap for same provider
+    # Increase legend text size and title size for readability
+    ax.legend(title="Anbieter", fontsize=9, title_fontsize=11, markerscale=1, handlelength=1.5, handletextpad=0.6)
 
+def get_alg_graph(data: pd.DataFrame, alg_column: str, metrics: list[tuple[str, str]], xlabel: str, order=()):
+    """Two bars per provider and algorithm, the first metric solid and the second hatched, e.g. encaps/s and decaps/s."""
     fig, ax = plt.subplots(figsize=(16, 8))
-    palette = sns.color_palette("colorblind", n_colors=n_prov)
+    hatches = [None, '///']
+    series = [(*provider_pivot(data, alg_column, metric, order), hatch) for (metric, _), hatch in zip(metrics, hatches)]
+    providers, palette = draw_grouped_bars(ax, series, '%.0f')
 
-    # draw bars: for each provider, plot encap and decap for all SIG algorithms
-    for i, provider in enumerate(providers):
-        prov_center = x - (group_total_width / 2) + i * prov_group_width + prov_group_width / 2
-
-        encap_vals = pivot_sign[provider].values
-        encap_errs = pivot_sign_std[provider].values
-        decap_vals = pivot_verify[provider].values
-        decap_errs = pivot_verify_std[provider].values
-
-        encap_positions = prov_center - (bar_width / 2 + gap / 2)
-        decap_positions = prov_center + (bar_width / 2 + gap / 2)
-
-        # Plot encap bars (solid)
-        bars_enc = ax.bar(encap_positions, encap_vals, width=bar_width,
-                          color=palette[i], align='center', zorder=3,
-                          yerr=encap_errs, error_kw={'elinewidth':4, 'alpha':0.9})
-        # Plot decap bars (hatched, same color)
-        bars_dec = ax.bar(decap_positions, decap_vals, width=bar_width,
-                          color=palette[i], hatch='///', edgecolor="#ffffff", align='center', zorder=3,
-                          yerr=decap_errs, error_kw={'elinewidth':4, 'alpha':0.9})
-
-        # label bars
-        ax.bar_label(bars_enc, fmt='%.0f', padding=3)
-        ax.bar_label(bars_dec, fmt='%.0f', padding=3)
-
-    # xticks at group centers
-    ax.set_xticks(x)
-    ax.set_xticklabels(sig_labels, rotation=0, ha='center')
-    ax.set_xlabel('Signatur Algorithmus')
+    ax.set_xlabel(xlabel)
     ax.set_ylabel('Operationen pro Sekunde')
+    series_legend(ax, providers, palette, [(label, hatch) for (_, label), hatch in zip(metrics, hatches)])
+    style_value_axis(ax)
+    return fig
 
-    # Provider legend: colored patches + encap/decap explanation
-    from matplotlib.patches import Patch
-    provider_handles = [Patch(facecolor=palette[i], label=providers[i]) for i in range(len(providers))]
-    enc_handle = Patch(facecolor='white', edgecolor='black', label='Signaturen/s')
-    dec_handle = Patch(facecolor='white', edgecolor='black', hatch='///', label='Verifikationen/s')
-    ax.legend(handles=provider_handles + [enc_handle, dec_handle], title='Anbieter | Metrik',
-              fontsize=11, title_fontsize=12, ncol=2)
+def get_kem_alg_graph(data: pd.DataFrame):
+    return get_alg_graph(data, 'kem-algorithm', [('encaps/s', 'Kapselung/s'), ('decaps/s', 'Entkapselungen/s')], 'Schlüsselkapselungsverfahren', KEM_ORDER)
 
-    # Grid customization (only horizontal lines)
-    ax.set_axisbelow(True)
-    ax.yaxis.grid(True, which='major', linestyle='--', linewidth=0.8, color='0.75')
-    ax.yaxis.set_minor_locator(AutoMinorLocator(2))
-    ax.yaxis.grid(True, which='minor', linestyle=':', linewidth=0.5, color='0.85', alpha=0.7)
-    ax.xaxis.grid(False)
+def get_sig_alg_graph(data: pd.DataFrame):
+    return get_alg_graph(data, 'sig-algorithm', [('signs/s', 'Signaturen/s'), ('verify/s', 'Verifikationen/s')], 'Signatur Algorithmus')
+
+def get_tls_cpu_graph(data: pd.DataFrame):
+    """CPU time per handshake of the server (solid) and, with --mtls, the client (hatched) per combination."""
+    columns = [(column, label) for column, label in [('server_cpu_us/handshake', 'Server'), ('client_cpu_us/handshake', 'Client')] if column in data.columns]
+    data = combination_labels(data.dropna(subset=[column for column, _ in columns], how='all'))
+    if data.empty:
+        return None
+
+    levels = sorted(data['nist_level'].astype(int).unique())
+    fig, axes = plt.subplots(len(levels), 1, figsize=(12, 5 * len(levels)), constrained_layout=True, squeeze=False)
+    hatches = [None, '///']
+    for ax, level in zip(axes[:, 0], levels):
+        level_data = data[data['nist_level'].astype(int) == level]
+        series = [(*provider_pivot(level_data, 'label', column), hatch) for (column, _), hatch in zip(columns, hatches)]
+        providers, palette = draw_grouped_bars(ax, series, '%.0f')
+        ax.set_xlabel('Schlüsselkapselungsverfahren | Signatur Algorithmus')
+        ax.set_ylabel('CPU-Zeit pro Handshake (µs)')
+        ax.set_title(f'NIST level {level}')
+        series_legend(ax, providers, palette, [(label, hatch) for (_, label), hatch in zip(columns, hatches)])
+        style_value_axis(ax)
+        ax.margins(y=0.15)
+    return fig
+
+def get_tls_load_latency_graph(data: pd.DataFrame):
+    """Median and p99 handshake latency over the concurrency of the load sweep, one line per combination and provider."""
+    if 'client_auth' in data.columns:
+        data = data[data['client_auth'].fillna(0) == 0]
+    data = combination_labels(data)
+    summary = data.groupby(['label', 'provider', 'concurrency'], as_index=False)[['p50_ms', 'p99_ms']].mean()
+
+    fig, axes = plt.subplots(1, 2, figsize=(16, 7), constrained_layout=True)
+    for ax, (metric, title) in zip(axes, [('p50_ms', 'Median'), ('p99_ms', 'p99')]):
+        sns.lineplot(data=summary, x='concurrency', y=metric, hue='provider', style='label', hue_order=present_providers(summary['provider'].unique()), palette='colorblind', marker='o', ax=ax)
+        ax.set_xscale('log', base=2)
+        ax.set_xlabel('Gleichzeitige Handshakes')
+        ax.set_ylabel('Handshake-Latenz (ms)')
+        ax.set_title(title)
+        ax.set_axisbelow(True)
+        ax.yaxis.grid(True, which='major', linestyle='--', linewidth=0.8, color='0.75')
+    return fig
+
+def get_alg_latency_graph(data: pd.DataFrame, alg_column: str, operations: list[str], xlabel: str, order=()):
+    """Median latency of every operation of the EVP benchmark, the error bars reach up to the p99 latency."""
+    operations = [operation for operation in operations if f'{operation}_p50_us' in data.columns]
+    data = data.dropna(subset=[f'{operation}_p50_us' for operation in operations], how='all')
+    if data.empty:
+        return None
+
+    fig, axes = plt.subplots(1, len(operations), figsize=(8 * len(operations), 7), constrained_layout=True, squeeze=False)
+    for ax, operation in zip(axes[0], operations):
+        p50, _ = provider_pivot(data, alg_column, f'{operation}_p50_us', order)
+        p99, _ = provider_pivot(data, alg_column, f'{operation}_p99_us', order)
+        draw_grouped_bars(ax, [(p50, (p50 * 0, (p99 - p50).clip(lower=0)), None)], '%.1f')
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel('Latenz pro Operation (µs), Median bis p99')
+        ax.set_title(operation)
+        ax.legend(title="Anbieter", fontsize=9, title_fontsize=11)
+        style_value_axis(ax)
+    return fig
+
+def render_tls_performance(tls_data: pd.DataFrame):
+    # TLS performance graphs, one below the other for every NIST level
+    levels = sorted(tls_data['nist_level'].astype(int).unique())
+    fig, axes = plt.subplots(len(levels), 1, figsize=(10, 5 * len(levels)), constrained_layout=True, squeeze=False)
+    for ax, level in zip(axes[:, 0], levels):
+        get_tls_graph(level, tls_data, ax)
+    return fig
+
+def render_kem_alg_performance(kem_alg_perf_data: pd.DataFrame):
+    return get_kem_alg_graph(single_process_rows(kem_alg_perf_data))
+
+def render_sig_alg_performance(sig_alg_perf_data: pd.DataFrame):
+    return get_sig_alg_graph(single_process_rows(sig_alg_perf_data))
+
+@dataclass(frozen=True)
+class FigureSpec:
+    # File name of the figure without the format
+    name: str
+    # Result files the figure is drawn from, passed to render in this order
+    inputs: tuple[str, ...]
+    # Returns the figure, or None if the data has nothing to draw
+    render: Callable[..., plt.Figure | None]
+    args: tuple = ()
+
+def figure_specs(data: dict[str, pd.DataFrame]) -> list[FigureSpec]:
+    """The figures the data of the run is enough for."""
+    tls, kem, sig, load = (data[name] for name in ["results_tls.csv", "results_kem_alg.csv", "results_sig_alg.csv", "results_tls_load.csv"])
+    specs = []
+    if not tls.empty:
+        specs.append(FigureSpec("tls-performance", ("results_tls.csv",), render_tls_performance))
+        if {'server_cpu_us/handshake', 'client_cpu_us/handshake'} & set(tls.columns):
+            specs.append(FigureSpec("tls-cpu", ("results_tls.csv",), get_tls_cpu_graph))
+    if not kem.empty:
+        specs.append(FigureSpec("kem-alg-performance", ("results_kem_alg.csv",), render_kem_alg_performance))
+        if 'multi' in kem.columns:
+            specs.append(FigureSpec("kem-alg-scaling", ("results_kem_alg.csv",), get_alg_scaling_graph, ('kem-algorithm', ['keygens/s', 'encaps/s', 'decaps/s'])))
+        if any(column.endswith('_p50_us') for column in kem.columns):
+            specs.append(FigureSpec("kem-alg-latency", ("results_kem_alg.csv",), get_alg_latency_graph, ('kem-algorithm', ['keygen', 'encaps', 'decaps'], 'Schlüsselkapselungsverfahren', KEM_ORDER)))
+    if not sig.empty:
+        specs.append(FigureSpec("sig-alg-performance", ("results_sig_alg.csv",), render_sig_alg_performance))
+        if 'multi' in sig.columns:
+            specs.append(FigureSpec("sig-alg-scaling", ("results_sig_alg.csv",), get_alg_scaling_graph, ('sig-algorithm', ['keygens/s', 'signs/s', 'verify/s'])))
+        if any(column.endswith('_p50_us') for column in sig.columns):
+            specs.append(FigureSpec("sig-alg-latency", ("results_sig_alg.csv",), get_alg_latency_graph, ('sig-algorithm', ['keygen', 'sign', 'verify'], 'Signatur Algorithmus')))
+    if not load.empty:
+        specs.append(FigureSpec("tls-load-latency", ("results_tls_load.csv",), get_tls_load_latency_graph))
+    return specs
+
+def input_hash(spec: FigureSpec, data: dict[str, pd.DataFrame], figure_format: str) -> str:
+    """Changes with the input data of the figure, its arguments, the format and the plotting code."""
+    digest = hashlib.sha256()
+    digest.update(Path(__file__).read_bytes())
+    digest.update(repr((spec.name, spec.args, figure_format, FIGURE_DPI)).encode())
+    for name in spec.inputs:
+        digest.update(repr(list(data[name].columns)).encode())
+        digest.update(pd.util.hash_pandas_object(data[name], index=False).values.tobytes())
+    return digest.hexdigest()
+
+def render_figure(spec: FigureSpec, inputs: list[pd.DataFrame], path: Path) -> bool:
+    """Render a figure to path, False if there was nothing to draw. Runs in a worker process."""
+    fig = spec.render(*inputs, *spec.args)
+    if fig is None:
+        return False
+    fig.savefig(path, dpi=FIGURE_DPI, bbox_inches='tight')
+    plt.close(fig)
+    return True
+
+def render_figures(specs: list[FigureSpec], data: dict[str, pd.DataFrame], output_path: Path, figure_format: str, jobs: int, force: bool):
+    """Render the figures whose input changed since they were last written, in parallel."""
+    output_path.mkdir(parents=True, exist_ok=True)
+    hashes_path = output_path / FIGURE_HASHES_FILE
+    hashes = json.loads(hashes_path.read_text()) if hashes_path.is_file() else {}
+
+    pending = []
+    for spec in specs:
+        path = output_path / f"{spec.name}.{figure_format}"
+        figure_hash = input_hash(spec, data, figure_format)
+        if not force and path.is_file() and hashes.get(path.name) == figure_hash:
+            logging.info(f"Skipping {path}, its data didn't change")
+            continue
+        pending.append((spec, path, figure_hash))
+    if not pending:
+        return
+
+    # Figures are independent of each other, every worker renders whole figures
+    with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as executor:
+        futures = [
+            executor.submit(render_figure, spec, [data[name] for name in spec.inputs], path)
+            for spec, path, _ in pending
+        ]
+        for (spec, path, figure_hash), future in zip(pending, futures):
+            if future.result():
+                hashes[path.name] = figure_hash
+                logging.info(f"Rendered {path}")
+            else:
+                logging.info(f"Nothing to draw for {spec.name}")
+
+    hashes_path.write_text(json.dumps(hashes, indent=2, sort_keys=True))
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Render the figures of the measured results")
+    parser.add_argument("--results", type=Path, default=RESULTS_BASE_PATH, help=f"Directory of the <provider>_<n> run directories (default: {RESULTS_BASE_PATH})")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT_PATH, help=f"Directory the figures are written to (default: {DEFAULT_OUTPUT_PATH})")
+    parser.add_argument("--format", choices=FIGURE_FORMATS, default=FIGURE_FORMATS[0], help="File format of the figures")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Number of figures rendered at once (default: number of CPUs)")
+    parser.add_argument("--force", action="store_true", help="Render every figure, even if its data didn't change")
+    parser.add_argument("--show", action="store_true", help="Show the figures in a window instead of writing them to files")
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs has to be positive")
+    return args
 
 if __name__ == "__main__":
-
-    # TLS performance graphs for different NIST levels
-    fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(10, 15), constrained_layout=True)
-    tls_data = read_tls_data()
-    get_tls_graph(1, tls_data, ax1)
-    get_tls_graph(3, tls_data, ax2)
-    get_tls_graph(5, tls_data, ax3)
-
-    kem_alg_perf_data = read_kem_alg_perf_data()
-    get_kem_alg_graph(kem_alg_perf_data)
-
-    sig_alg_perf_data = read_sig_alg_perf_data()
-    get_sig_alg_graph(sig_alg_perf_data)
-    print(sig_alg_perf_data)
-
-    plt.tight_layout()
-    plt.subplots_adjust(hspace=0.7)
-    plt.show()
+    args = parse_args()
+    started_at = perf_counter()
+
+    data = {
+        "results_tls.csv": read_tls_data(args.results),
+        "results_kem_alg.csv": read_kem_alg_perf_data(args.results),
+        "results_sig_alg.csv": read_sig_alg_perf_data(args.results),
+        "results_tls_load.csv": read_tls_load_data(args.results)
+    }
+    specs = figure_specs(data)
+
+    if args.show:
+        for spec in specs:
+            spec.render(*[data[name] for name in spec.inputs], *spec.args)
+        plt.show()
+    else:
+        # No display needed, also for the worker processes
+        os.environ["MPLBACKEND"] = "Agg"
+        matplotlib.use("Agg")
+        render_figures(specs, data, args.output, args.format, args.jobs, args.force)
+        logging.info(f"Figures are up to date in {args.output} after {perf_counter() - started_at:.1f}s")
@@ -0,0 +1,161 @@
+import re
+import json
+import hashlib
+
+from pathlib import Path
+
+import pandas as pd
+
+# Every <provider>_<n> directory below is read
+RESULTS_BASE_PATH = Path("./results/raw_data/")
+RESULT_PROVIDERS_FILE_MAP = {
+    "oqs": "Open Quantum Safe",
+    "pqs": "PQShield",
+    "ossl35": "OpenSSL 3.5"
+}
+
+ALGORITHM_NAME_MAP = {
+    "mldsa44": "ML-DSA-44",
+    "mldsa65": "ML-DSA-65",
+    "mldsa87": "ML-DSA-87",
+    "rsa:3072": "RSA-3072",
+    "rsa:7680": "RSA-7680",
+    "rsa:15360": "RSA-15360",
+    "mlkem512": "ML-KEM-512",
+    "mlkem768": "ML-KEM-768",
+    "mlkem1024": "ML-KEM-1024",
+    "P-256": "P-256",
+    "P-384": "P-384",
+    "P-521": "P-521"
+}
+
+# The columns holding algorithm names of every result file, mapped through ALGORITHM_NAME_MAP
+NAME_COLUMNS = {
+    "results_tls.csv": ["KEM", "SIG"],
+    "results_tls_load.csv": ["KEM", "SIG"],
+    "results_tls_timeseries.csv": ["KEM", "SIG"],
+    "results_tls_bulk.csv": ["KEM", "SIG"],
+    "results_tls_network.csv": ["KEM", "SIG"],
+    "results_tls_bytes.csv": ["KEM", "SIG"],
+    "results_kem_alg.csv": ["kem-algorithm"],
+    "results_sig_alg.csv": ["sig-algorithm"]
+}
+
+# Run directories are named <provider>_<n>, e.g. oqs_3
+RUN_DIRECTORY_REGEX = r"^(?P<provider>.+)_(?P<run>\d+)$"
+CACHE_DIRECTORY = ".cache"
+# Part of every manifest, bump it when the layout of the cached tables changes
+CACHE_VERSION = 1
+
+
+def discover_run_directories(base_path: Path) -> list[tuple[str, int, Path]]:
+    """All (provider, run number, directory) below base_path, sorted by provider and run."""
+    runs = []
+    for path in base_path.iterdir() if base_path.is_dir() else []:
+        match = re.match(RUN_DIRECTORY_REGEX, path.name)
+        if path.is_dir() and match:
+            runs.append((match.group("provider"), int(match.group("run")), path))
+    return sorted(runs, key=lambda run: (run[0], run[1]))
+
+
+def file_signature(path: Path) -> list[int]:
+    """Changes whenever a csv file is rewritten, without reading it."""
+    stat = path.stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def normalize_dtypes(data: pd.DataFrame, text_columns: list[str]) -> pd.DataFrame:
+    """Turn the columns holding only numbers into numbers, except for text_columns.
+
+    The csv files of different runs don't always agree, e.g. a column that is empty in one run is read as float there
+    and as text in another, so the columns are normalized once after all runs are combined.
+    """
+    for column in data.columns:
+        if column not in text_columns and not pd.api.types.is_numeric_dtype(data[column]):
+            numeric = pd.to_numeric(data[column], errors="coerce")
+            if numeric.notna().sum() == data[column].notna().sum():
+                data[column] = numeric
+    return data
+
+
+class ResultCache:
+    """Consolidated Parquet cache of the csv files of all run directories.
+
+    Every result file (e.g. results_tls.csv) gets its own table in `<base_path>/.cache`, next to a manifest
+    of the files it was built from. On load only the run directories whose file appeared, changed or
+    disappeared since are re-read, the names are mapped once when a file is read.
+    """
+
+    def __init__(self, base_path: Path, provider_names: dict[str, str], name_map: dict[str, str]):
+        self.base_path = base_path
+        self.cache_path = base_path / CACHE_DIRECTORY
+        self.provider_names = provider_names
+        self.name_map = name_map
+
+    def _fingerprint(self, name_columns: list[str]) -> str:
+        """Cached tables are only valid for the mapping they were built with."""
+        settings = {"version": CACHE_VERSION, "providers": self.provider_names, "names": self.name_map, "name_columns": name_columns}
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+    def _read_run(self, provider: str, run: int, path: Path, name_columns: list[str]) -> pd.DataFrame:
+        data = pd.read_csv(path)
+        data["provider"] = self.provider_names.get(provider, provider)
+        data["run"] = run
+        data["run_directory"] = path.parent.name
+        for column in name_columns:
+            if column in data.columns:
+                data[column] = data[column].replace(self.name_map)
+        return data
+
+    def load(self, file_name: str, name_columns: list[str]) -> pd.DataFrame:
+        """All rows of file_name of every run directory, tagged with provider, run and run_directory."""
+        table_path = self.cache_path / f"{Path(file_name).stem}.parquet"
+        manifest_path = table_path.with_suffix(".json")
+
+        runs = {
+            path.name: (provider, run, path / file_name)
+            for provider, run, path in discover_run_directories(self.base_path)
+            if (path / file_name).is_file()
+        }
+        signatures = {name: file_signature(path) for name, (_, _, path) in runs.items()}
+
+        fingerprint = self._fingerprint(name_columns)
+        cached_signatures = {}
+        cached = None
+        if manifest_path.is_file() and table_path.is_file():
+            manifest = json.loads(manifest_path.read_text())
+            if manifest.get("fingerprint") == fingerprint:
+                cached_signatures = manifest["files"]
+                cached = pd.read_parquet(table_path)
+
+        unchanged = {name for name, signature in signatures.items() if cached_signatures.get(name) == signature}
+        if cached is not None and unchanged == set(signatures) == set(cached_signatures):
+            return cached
+
+        frames = []
+        if cached is not None:
+            frames.append(cached[cached["run_directory"].isin(unchanged)])
+        frames += [
+            self._read_run(provider, run, path, name_columns)
+            for name, (provider, run, path) in runs.items() if name not in unchanged
+        ]
+        if not frames:
+            return pd.DataFrame()
+
+        # A single concat, concatenating run by run copies all earlier rows again every time
+        data = pd.concat(frames, ignore_index=True)
+        data = normalize_dtypes(data, name_columns + ["provider", "run_directory"])
+        data = data.sort_values(["provider", "run"], kind="stable", ignore_index=True)
+
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+        temporary_path = table_path.with_suffix(".parquet.tmp")
+        data.to_parquet(temporary_path, index=False)
+        temporary_path.replace(table_path)
+        manifest_path.write_text(json.dumps({"fingerprint": fingerprint, "files": signatures}, indent=2))
+        return data
+
+
+def read_results(file_name: str, base_path: Path = RESULTS_BASE_PATH) -> pd.DataFrame:
+    """All rows of a result file below base_path, with the display names of the providers and algorithms."""
+    cache = ResultCache(base_path, RESULT_PROVIDERS_FILE_MAP, ALGORITHM_NAME_MAP)
+    return cache.load(file_name, NAME_COLUMNS.get(file_name, []))
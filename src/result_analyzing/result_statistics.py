@@ -0,0 +1,117 @@
+import warnings
+
+import numpy as np
+
+from dataclasses import dataclass
+
+
+DEFAULT_RESAMPLES = 10_000
+DEFAULT_CONFIDENCE = 0.95
+# Upper bound of the floats drawn at once while bootstrapping, the groups are resampled in chunks below it
+MAX_BOOTSTRAP_VALUES = 20_000_000
+
+
+@dataclass
+class Comparisons:
+    """Baseline against candidate for a batch of groups, every field has one entry per group.
+
+    `change` is the relative difference of the candidate mean to the baseline mean, e.g. -0.1 for 10% less.
+    The confidence interval and the p-value of the change come from resampling both groups, the p-value is twice the
+    fraction of resamples on the other side of zero than the observed change. Groups with fewer than two samples on
+    either side have no interval, effect size or p-value (NaN).
+    """
+    baseline_n: np.ndarray
+    candidate_n: np.ndarray
+    baseline_mean: np.ndarray
+    candidate_mean: np.ndarray
+    baseline_ci: np.ndarray
+    candidate_ci: np.ndarray
+    change: np.ndarray
+    change_ci: np.ndarray
+    # Hedges' g, the difference of the means in pooled standard deviations, corrected for small samples
+    effect_size: np.ndarray
+    p_value: np.ndarray
+
+
+def pad_samples(groups: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """Stack groups of different sizes into a NaN padded matrix, returns it with the size of every group."""
+    sizes = np.array([len(group) for group in groups], dtype=np.int64)
+    padded = np.full((len(groups), max(sizes.max(initial=0), 1)), np.nan)
+    for row, group in enumerate(groups):
+        padded[row, :len(group)] = group
+    return padded, sizes
+
+
+def bootstrap_means(padded: np.ndarray, sizes: np.ndarray, resamples: int, rng: np.random.Generator) -> np.ndarray:
+    """Means of `resamples` resamples with replacement of every group, shape (groups, resamples).
+
+    Indices are drawn below the size of each group, so the padding is never picked.
+    """
+    means = np.empty((len(sizes), resamples))
+    chunk = max(1, MAX_BOOTSTRAP_VALUES // (resamples * padded.shape[1]))
+    for start in range(0, len(sizes), chunk):
+        rows = slice(start, start + chunk)
+        chunk_sizes = sizes[rows]
+        indices = (rng.random((len(chunk_sizes), resamples, padded.shape[1])) * chunk_sizes[:, None, None]).astype(np.int64)
+        values = np.take_along_axis(padded[rows][:, None, :], indices, axis=2)
+        # Only the first `size` draws of a group form its resample
+        used = np.arange(padded.shape[1]) < chunk_sizes[:, None, None]
+        means[rows] = np.where(used, values, 0).sum(axis=2) / np.maximum(chunk_sizes, 1)[:, None]
+    return means
+
+
+def hedges_g(baseline: np.ndarray, baseline_n: np.ndarray, candidate: np.ndarray, candidate_n: np.ndarray) -> np.ndarray:
+    degrees_of_freedom = baseline_n + candidate_n - 2
+    # Groups of a single sample have no variance, they are reported as NaN
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        pooled_variance = (
+            (baseline_n - 1) * np.nanvar(baseline, axis=1, ddof=1) + (candidate_n - 1) * np.nanvar(candidate, axis=1, ddof=1)
+        ) / degrees_of_freedom
+        cohens_d = (np.nanmean(candidate, axis=1) - np.nanmean(baseline, axis=1)) / np.sqrt(pooled_variance)
+        # Identical constant samples have no spread and no effect
+        cohens_d = np.where(pooled_variance == 0, np.where(cohens_d == 0, 0, np.sign(cohens_d) * np.inf), cohens_d)
+        return cohens_d * (1 - 3 / (4 * degrees_of_freedom - 1))
+
+
+def compare_groups(
+    baseline: list[np.ndarray],
+    candidate: list[np.ndarray],
+    resamples: int = DEFAULT_RESAMPLES,
+    confidence: float = DEFAULT_CONFIDENCE,
+    rng: np.random.Generator | None = None
+) -> Comparisons:
+    """Compare baseline[i] with candidate[i] for every i, all groups are resampled at once."""
+    rng = rng if rng is not None else np.random.default_rng()
+    baseline_padded, baseline_n = pad_samples(baseline)
+    candidate_padded, candidate_n = pad_samples(candidate)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        baseline_mean = np.nanmean(baseline_padded, axis=1)
+        candidate_mean = np.nanmean(candidate_padded, axis=1)
+        change = candidate_mean / baseline_mean - 1
+
+        baseline_means = bootstrap_means(baseline_padded, baseline_n, resamples, rng)
+        candidate_means = bootstrap_means(candidate_padded, candidate_n, resamples, rng)
+        changes = candidate_means / baseline_means - 1
+
+    tail = (1 - confidence) / 2
+    quantiles = [tail, 1 - tail]
+    baseline_ci = np.quantile(baseline_means, quantiles, axis=1).T
+    candidate_ci = np.quantile(candidate_means, quantiles, axis=1).T
+    change_ci = np.quantile(changes, quantiles, axis=1).T
+
+    # Two-sided: how often the resampled change falls on the other side of zero than the observed one
+    below = (changes <= 0).mean(axis=1)
+    above = (changes >= 0).mean(axis=1)
+    p_value = np.minimum(1, 2 * np.where(change > 0, below, above))
+
+    effect_size = hedges_g(baseline_padded, baseline_n, candidate_padded, candidate_n)
+
+    insufficient = (baseline_n < 2) | (candidate_n < 2)
+    for values in (baseline_ci, candidate_ci, change_ci, effect_size, p_value):
+        values[insufficient] = np.nan
+
+    return Comparisons(
+        baseline_n, candidate_n, baseline_mean, candidate_mean, baseline_ci, candidate_ci, change, change_ci, effect_size, p_value
+    )
@@ -0,0 +1,163 @@
+import csv
+import json
+import sqlite3
+import logging
+import threading
+
+from pathlib import Path
+from datetime import datetime, timezone
+from dataclasses import dataclass, asdict
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    settings TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS measurements (
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    kind TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    openssl_build TEXT NOT NULL,
+    nist_level INTEGER NOT NULL,
+    kem TEXT NOT NULL,
+    sig TEXT NOT NULL,
+    repetition INTEGER NOT NULL,
+    -- Position of the row for kinds with several rows per measurement (time series, load sweep)
+    item INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (run_id, kind, provider, openssl_build, nist_level, kem, sig, repetition, item)
+);
+"""
+
+
+@dataclass(frozen=True)
+class ResultKey:
+    """Identifies one measurement of a campaign. Algorithm benchmarks use nist_level 0 and the algorithm as kem or sig."""
+    run_id: str
+    provider: str
+    openssl_build: str
+    nist_level: int
+    kem: str
+    sig: str
+    repetition: int
+
+
+class ResultStore:
+    """SQLite backed store for all measurements, so interrupted campaigns can be resumed.
+
+    Every measurement row is stored as a json object in the column order of the csv files, the csv
+    layouts read by `generate_graphs.py` are produced by exporting from the store.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        # Combinations running in parallel share the connection
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def start_run(self, run_id: str, settings: dict) -> bool:
+        """Register run_id, returns False if the run already exists and is resumed."""
+        with self._lock, self._connection:
+            existing = self._connection.execute("SELECT settings FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if existing is not None:
+                if json.loads(existing[0]) != settings:
+                    logging.warning(f"Resuming run {run_id} with different settings than it was started with")
+                return False
+
+            self._connection.execute(
+                "INSERT INTO runs (run_id, created_at, settings) VALUES (?, ?, ?)",
+                (run_id, datetime.now(timezone.utc).isoformat(), json.dumps(settings))
+            )
+            return True
+
+    def latest_run_id(self) -> str | None:
+        with self._lock:
+            row = self._connection.execute("SELECT run_id FROM runs ORDER BY created_at DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def is_complete(self, kind: str, key: ResultKey) -> bool:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM measurements WHERE kind = :kind AND run_id = :run_id AND provider = :provider "
+                "AND openssl_build = :openssl_build AND nist_level = :nist_level AND kem = :kem AND sig = :sig "
+                "AND repetition = :repetition LIMIT 1",
+                {"kind": kind, **asdict(key)}
+            ).fetchone()
+        return row is not None
+
+    def save(self, key: ResultKey, rows: dict[str, list[dict]]):
+        """Store the rows of every kind measured for key in a single transaction.
+
+        The primary kind of a measurement should be passed last, so a crash can never leave it marked
+        complete while its secondary rows are missing.
+        """
+        created_at = datetime.now(timezone.utc).isoformat()
+        with self._lock, self._connection:
+            for kind, kind_rows in rows.items():
+                self._connection.execute(
+                    "DELETE FROM measurements WHERE kind = :kind AND run_id = :run_id AND provider = :provider "
+                    "AND openssl_build = :openssl_build AND nist_level = :nist_level AND kem = :kem AND sig = :sig "
+                    "AND repetition = :repetition",
+                    {"kind": kind, **asdict(key)}
+                )
+                self._connection.executemany(
+                    "INSERT INTO measurements (run_id, kind, provider, openssl_build, nist_level, kem, sig, repetition, item, data, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (key.run_id, kind, key.provider, key.openssl_build, key.nist_level, key.kem, key.sig, key.repetition, item, json.dumps(row), created_at)
+                        for item, row in enumerate(kind_rows)
+                    ]
+                )
+
+    def rows(self, run_id: str, kind: str, provider: str | None = None, repetition: int | None = None, key_columns: bool = False) -> list[dict]:
+        """The rows of a kind, with key_columns each row starts with the provider and repetition it belongs to."""
+        query = "SELECT provider, repetition, data FROM measurements WHERE run_id = ? AND kind = ?"
+        params: list = [run_id, kind]
+        if provider is not None:
+            query += " AND provider = ?"
+            params.append(provider)
+        if repetition is not None:
+            query += " AND repetition = ?"
+            params.append(repetition)
+        # rowid keeps the order the measurements were taken in
+        query += " ORDER BY rowid"
+
+        with self._lock:
+            result = self._connection.execute(query, params).fetchall()
+        if key_columns:
+            return [{"provider": row_provider, "repetition": row_repetition, **json.loads(data)} for row_provider, row_repetition, data in result]
+        return [json.loads(data) for _, _, data in result]
+
+    def providers_and_repetitions(self, run_id: str) -> list[tuple[str, int]]:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT DISTINCT provider, repetition FROM measurements WHERE run_id = ? ORDER BY provider, repetition",
+                (run_id,)
+            ).fetchall()
+
+    def export_csv(self, path: Path, run_id: str, kind: str, provider: str | None = None, repetition: int | None = None, key_columns: bool = False) -> bool:
+        """Write the rows of a kind into a csv file, returns False if there was nothing to export.
+
+        Without rows an existing file at path is removed, so it can't be mistaken for a result of this run.
+        """
+        rows = self.rows(run_id, kind, provider, repetition, key_columns)
+        if not rows:
+            path.unlink(missing_ok=True)
+            return False
+
+        # Union of all columns, in the order they first appear
+        fieldnames = list(dict.fromkeys(column for row in rows for column in row))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", newline="") as result_file:
+            writer = csv.DictWriter(result_file, fieldnames=fieldnames, lineterminator="\n")
+            writer.writeheader()
+            writer.writerows(rows)
+        return True
@@ -0,0 +1,42 @@
+import logging
+import subprocess
+
+from contextlib import AbstractContextManager, ExitStack
+from typing import Callable, Hashable
+
+
+class ServerPool:
+    """Keeps servers running across measurements, so every server is only started once.
+
+    A server is started on first use by a factory returning a context manager that yields the server
+    process, e.g. `start_server`, and restarted if it exited since it was last used. Closing the
+    pool stops all of its servers.
+    """
+
+    def __init__(self):
+        self._servers: dict[Hashable, tuple[subprocess.Popen, ExitStack]] = {}
+
+    def __enter__(self) -> "ServerPool":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self, key: Hashable, start: Callable[[], AbstractContextManager[subprocess.Popen]]) -> subprocess.Popen:
+        if key in self._servers:
+            process, stack = self._servers.pop(key)
+            if process.poll() is None:
+                self._servers[key] = (process, stack)
+                return process
+            logging.warning(f"Server {key} exited with code {process.returncode}, restarting it")
+            stack.close()
+
+        stack = ExitStack()
+        process = stack.enter_context(start())
+        self._servers[key] = (process, stack)
+        return process
+
+    def close(self):
+        while self._servers:
+            _, (_, stack) = self._servers.popitem()
+            stack.close()
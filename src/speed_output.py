@@ -0,0 +1,59 @@
+import re
+
+from dataclasses import dataclass
+
+
+# Header of the KEM table, e.g. "keygen    encaps    decaps keygens/s  encaps/s  decaps/s"
+KEM_HEADER_REGEX = r"keygens/s\s+encaps/s\s+decaps/s"
+# Header of the signature table, e.g. "keygen     signs    verify keygens/s    sign/s  verify/s"
+SIG_HEADER_REGEX = r"keygens/s\s+signs?/s\s+verify/s"
+# A table row: the algorithm name, three times per operation and three operations per second
+TABLE_ROW_REGEX = (
+    r"^\s*(?P<name>\S.*?)\s+"
+    r"(?P<time_1>\d+(?:\.\d+)?)s\s+(?P<time_2>\d+(?:\.\d+)?)s\s+(?P<time_3>\d+(?:\.\d+)?)s\s+"
+    r"(?P<rate_1>\d+(?:\.\d+)?)\s+(?P<rate_2>\d+(?:\.\d+)?)\s+(?P<rate_3>\d+(?:\.\d+)?)\s*$"
+)
+
+
+@dataclass
+class SpeedResult:
+    name: str
+    # "kem" for keygen/encaps/decaps, "sig" for keygen/sign/verify
+    table: str
+    seconds_per_operation: tuple[float, float, float]
+    operations_per_second: tuple[float, float, float]
+
+
+def normalize_algorithm_name(name: str) -> str:
+    """Providers print the names differently (mlkem512, ML-KEM-512), compare them without case and separators."""
+    return re.sub(r"[^0-9a-z]", "", name.lower())
+
+
+def parse_speed_output(output: str) -> dict[str, SpeedResult]:
+    """Parse every row of the KEM and signature tables printed by `openssl speed`, keyed by normalized name."""
+    results = {}
+    table = None
+    for line in output.splitlines():
+        if re.search(KEM_HEADER_REGEX, line):
+            table = "kem"
+            continue
+        if re.search(SIG_HEADER_REGEX, line):
+            table = "sig"
+            continue
+        if table is None:
+            continue
+
+        match = re.match(TABLE_ROW_REGEX, line)
+        if match is None:
+            # Any other line ends the table
+            table = None
+            continue
+
+        name = match.group("name").strip()
+        results[normalize_algorithm_name(name)] = SpeedResult(
+            name,
+            table,
+            tuple(float(match.group(f"time_{i}")) for i in range(1, 4)),
+            tuple(float(match.group(f"rate_{i}")) for i in range(1, 4))
+        )
+    return results